@@ -0,0 +1,33 @@
+# ------------------------------------------------------------------------------------------------
+# Runtime cache directory
+# ------------------------------------------------------------------------------------------------
+# Files generated at runtime (router index, prompt snapshots, policy facts) are written under
+# CACHE_DIR, never into the installed package, so read-only deploys work. Writes go through
+# `atomic_write_json`: a unique temporary file in the same directory, then os.replace, so
+# concurrent workers never read a partial file.
+# ------------------------------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+from typing import Any
+
+CACHE_DIR = os.getenv("GAIDO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "gaido"))
+
+
+def cache_path(*parts: str) -> str:
+    return os.path.join(CACHE_DIR, *parts)
+
+
+def atomic_write_json(path: str, payload: Any, **dump_kwargs) -> None:
+    """Write `payload` as JSON to `path` atomically; raises OSError when the directory is not writable."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,201 @@
+# ------------------------------------------------------------------------------------------------
+# Candidate scoring for the final recommendation
+# ------------------------------------------------------------------------------------------------
+# Scores every plan in the policy facts table against the user profile, then sends only the
+# top-N candidates (with their compact facts) to the final recommendation LLM call.
+#
+# The facts are turned into NumPy feature columns once per table load, so scoring all plans is a
+# handful of vector operations:
+#   - eligibility: every insured age must be within the plan's entry-age limits (hard filter),
+#   - family fit: floater availability when more than one member is insured,
+#   - pre-existing conditions: shorter PED waiting periods score higher,
+#   - maternity: coverage and a short maternity waiting period when the user needs it,
+#   - budget: premium tier against the stated budget; co-payment is a plus on a tight budget,
+#   - quality: claim settlement ratio, restore benefit and no room-rent cap for everyone.
+# Ties are broken by policy name, so the same profile always yields the same shortlist.
+# ------------------------------------------------------------------------------------------------
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from functions.feature_rules import preference_text
+from functions.policy_facts import ATTRIBUTE_LABELS, PolicyFacts, policy_facts
+
+TOP_N = 5
+
+WEIGHTS = {
+    "family": 1.0,
+    "pre_existing": 2.0,
+    "maternity": 2.0,
+    "budget": 1.5,
+    "claim_settlement": 1.0,
+    "restore": 0.5,
+    "room_rent": 0.5,
+}
+PREMIUM_TIERS = {"budget": 0, "mid": 1, "premium": 2}
+BUDGET_LEVELS = {"low": 0, "medium": 1, "high": 2}
+PED_WAIT_HORIZON_MONTHS = 48.0  # waiting periods at or beyond this score 0
+MATERNITY_WAIT_HORIZON_MONTHS = 48.0
+CSR_FLOOR = 80.0  # claim settlement ratios at or below this score 0
+
+_MATERNITY_NEED = re.compile(r"maternity|pregnan|baby|child ?birth|deliver(y|ies)|start(ing)? a family|ivf|fertility", re.I)
+_LOW_BUDGET = re.compile(r"\b(low|tight|limited|cheap|cheapest|affordable|economical|budget[- ]friendly|low[- ]cost)\b", re.I)
+_HIGH_BUDGET = re.compile(r"\b(high|premium|no budget|not a concern|flexible|comprehensive|best coverage)\b", re.I)
+
+
+@dataclass
+class Candidate:
+    policy_name: str
+    score: float
+    reasons: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ProfileNeeds:
+    ages: List[int]
+    members: int
+    pre_existing: bool
+    maternity: bool
+    budget: Optional[int]  # BUDGET_LEVELS value, None when unknown
+
+
+def _flatten(values) -> List:
+    flat = []
+    for item in values or []:
+        flat.extend(item if isinstance(item, list) else [item])
+    return flat
+
+
+def profile_needs(state) -> ProfileNeeds:
+    """The scoring inputs derived from a UserProfile."""
+    ages = [int(a) for a in _flatten(state.age) if str(a).isdigit()]
+    members = max(len(_flatten(state.family_members)), len(ages), 1)
+    wants = preference_text(state)
+
+    budget = None
+    budget_text = f"{state.budget_range or ''} {wants}"
+    if (state.budget_range or "").lower() in BUDGET_LEVELS:
+        budget = BUDGET_LEVELS[state.budget_range.lower()]
+    elif _LOW_BUDGET.search(budget_text):
+        budget = BUDGET_LEVELS["low"]
+    elif _HIGH_BUDGET.search(budget_text):
+        budget = BUDGET_LEVELS["high"]
+
+    return ProfileNeeds(
+        ages=ages,
+        members=members,
+        pre_existing=bool(state.has_pre_existing_conditions or _flatten(state.pre_existing_conditions)),
+        maternity=bool(_MATERNITY_NEED.search(wants)),
+        budget=budget,
+    )
+
+
+class FeatureMatrix:
+    """Policy facts as aligned NumPy columns (NaN = unknown)."""
+
+    def __init__(self, facts: Dict[str, PolicyFacts]):
+        self.names = sorted(facts)
+        rows = [facts[name] for name in self.names]
+
+        def column(getter) -> np.ndarray:
+            return np.array([np.nan if getter(f) is None else float(getter(f)) for f in rows], dtype=np.float64)
+
+        self.min_entry_age = column(lambda f: f.min_entry_age)
+        self.max_entry_age = column(lambda f: f.max_entry_age)
+        self.floater = column(lambda f: f.family_floater)
+        self.ped_wait = column(lambda f: f.ped_waiting_months)
+        self.maternity = column(lambda f: f.maternity_covered)
+        self.maternity_wait = column(lambda f: f.maternity_waiting_months)
+        self.co_pay = column(lambda f: f.co_payment_percent)
+        self.csr = column(lambda f: f.claim_settlement_ratio)
+        self.restore = column(lambda f: f.restore_available)
+        self.room_rent_capped = column(lambda f: f.room_rent_capped)
+        self.premium_tier = column(lambda f: PREMIUM_TIERS.get((f.premium_tier or "").lower()))
+
+
+_matrix: Optional[FeatureMatrix] = None
+_matrix_source: Optional[int] = None
+_matrix_lock = threading.Lock()
+
+
+def _feature_matrix() -> Optional[FeatureMatrix]:
+    global _matrix, _matrix_source
+    facts = policy_facts.all()
+    if not facts:
+        return None
+    with _matrix_lock:
+        if _matrix is None or _matrix_source != id(facts):
+            _matrix, _matrix_source = FeatureMatrix(facts), id(facts)
+        return _matrix
+
+
+def _known(values: np.ndarray, default: float) -> np.ndarray:
+    return np.where(np.isnan(values), default, values)
+
+
+def score_candidates(state, top_n: int = TOP_N) -> List[Candidate]:
+    """Top `top_n` plans for the profile, best first. Empty when the facts table is empty."""
+    m = _feature_matrix()
+    if m is None:
+        return []
+    needs = profile_needs(state)
+    n = len(m.names)
+    components: List[Tuple[str, np.ndarray]] = []
+
+    # Eligibility: unknown limits do not exclude a plan
+    eligible = np.ones(n, dtype=bool)
+    if needs.ages:
+        eligible &= _known(m.max_entry_age, np.inf) >= max(needs.ages)
+        adult_ages = [a for a in needs.ages if a >= 18] or needs.ages
+        eligible &= _known(m.min_entry_age, 0) <= min(adult_ages)
+
+    if needs.members > 1:
+        components.append(("family", WEIGHTS["family"] * _known(m.floater, 0.5)))
+    if needs.pre_existing:
+        ped = np.clip(1 - _known(m.ped_wait, PED_WAIT_HORIZON_MONTHS / 2) / PED_WAIT_HORIZON_MONTHS, 0, 1)
+        components.append(("pre_existing", WEIGHTS["pre_existing"] * ped))
+    if needs.maternity:
+        wait = np.clip(1 - _known(m.maternity_wait, MATERNITY_WAIT_HORIZON_MONTHS) / MATERNITY_WAIT_HORIZON_MONTHS, 0, 1)
+        components.append(("maternity", WEIGHTS["maternity"] * _known(m.maternity, 0.3) * (0.5 + 0.5 * wait)))
+    if needs.budget is not None:
+        tier = _known(m.premium_tier, 1)
+        fit = 1 - np.abs(tier - needs.budget) / 2
+        if needs.budget == BUDGET_LEVELS["low"]:
+            fit = fit + 0.2 * (_known(m.co_pay, 0) > 0)
+        else:
+            fit = fit - 0.2 * np.clip(_known(m.co_pay, 0) / 20, 0, 1)
+        components.append(("budget", WEIGHTS["budget"] * np.clip(fit, 0, 1)))
+
+    csr = np.clip((_known(m.csr, CSR_FLOOR + 5) - CSR_FLOOR) / (100 - CSR_FLOOR), 0, 1)
+    components.append(("claim_settlement", WEIGHTS["claim_settlement"] * csr))
+    components.append(("restore", WEIGHTS["restore"] * _known(m.restore, 0.5)))
+    components.append(("room_rent", WEIGHTS["room_rent"] * (1 - _known(m.room_rent_capped, 0.5))))
+
+    parts = np.vstack([values for _, values in components])
+    total = np.where(eligible, parts.sum(axis=0), -np.inf)
+    # Stable sort on the negated score keeps the alphabetical order of self.names on ties
+    order = np.argsort(-total, kind="stable")[:top_n]
+
+    candidates = []
+    for i in order:
+        if not np.isfinite(total[i]):
+            break
+        strongest = sorted(components, key=lambda c: -c[1][i])[:2]
+        candidates.append(Candidate(m.names[i], round(float(total[i]), 3), [label for label, _ in strongest]))
+    return candidates
+
+
+def candidate_facts(candidates: List[Candidate]) -> str:
+    """Compact fact lines for the shortlisted plans, for the recommendation prompt."""
+    lines = []
+    for candidate in candidates:
+        facts = policy_facts.get(candidate.policy_name)
+        if facts is None:
+            continue
+        details = "; ".join(f"{label}: {getattr(facts, attr)}" for attr, label in ATTRIBUTE_LABELS)
+        lines.append(f"{candidate.policy_name.replace('_', ' ')} (insurer: {facts.insurer}) - {details}")
+    return "\n".join(lines)
@@ -0,0 +1,119 @@
+# ------------------------------------------------------------------------------------------------
+# Policy comparison engine (map-reduce)
+# ------------------------------------------------------------------------------------------------
+# Map: each policy is reduced to a fixed set of comparable attributes. Policies in the offline
+#      facts table (functions/policy_facts.py) are read from it; the rest are extracted from
+#      their summaries by structured LLM calls that run in parallel and are cached per
+#      (policy, summary), so they are shared across users and turns.
+# Reduce: the attributes are rendered into a comparison table locally, and one small LLM call
+#      writes the narrative for the user's profile. The merge prompt holds only the compact
+#      attributes, so its size grows slowly with the number of policies compared.
+# ------------------------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from functions.policy_facts import ATTRIBUTE_LABELS, PolicyAttributes, policy_facts
+from functions.prereq import llm
+from functions.prompts import policy_attribute_extraction_prompt, comparison_merge_prompt
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_MAX_CONCURRENCY = 6
+ATTRIBUTE_CACHE_SIZE = 256
+
+
+# Table rows: (attribute, label)
+TABLE_ROWS = ATTRIBUTE_LABELS
+
+_attribute_extractor = None
+_cache: "OrderedDict[Tuple[str, str], PolicyAttributes]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _extractor():
+    global _attribute_extractor
+    if _attribute_extractor is None:
+        _attribute_extractor = policy_attribute_extraction_prompt | llm.with_structured_output(PolicyAttributes)
+    return _attribute_extractor
+
+
+def _cache_key(policy_name: str, summary: str) -> Tuple[str, str]:
+    return policy_name, hashlib.sha1(summary.encode("utf-8")).hexdigest()
+
+
+def extract_attributes(summaries: Dict[str, str]) -> Dict[str, PolicyAttributes]:
+    """Map step: attributes for every policy, extracting the uncached ones in one parallel batch."""
+    attributes: Dict[str, PolicyAttributes] = dict(policy_facts.get_many(list(summaries)))
+    missing: List[str] = []
+    with _cache_lock:
+        for name, summary in summaries.items():
+            if name in attributes:
+                continue
+            key = _cache_key(name, summary)
+            if key in _cache:
+                _cache.move_to_end(key)
+                attributes[name] = _cache[key]
+            else:
+                missing.append(name)
+
+    if missing:
+        results = _extractor().batch(
+            [{"policy_name": name, "summary": summaries[name]} for name in missing],
+            config={"max_concurrency": EXTRACTION_MAX_CONCURRENCY},
+            return_exceptions=True,
+        )
+        with _cache_lock:
+            for name, result in zip(missing, results):
+                if isinstance(result, Exception) or result is None:
+                    logger.warning("Attribute extraction failed for %s: %s", name, result)
+                    continue
+                attributes[name] = result
+                _cache[_cache_key(name, summaries[name])] = result
+                while len(_cache) > ATTRIBUTE_CACHE_SIZE:
+                    _cache.popitem(last=False)
+
+    logger.info("Policy attributes: %d stored or cached, %d extracted", len(summaries) - len(missing), len(missing))
+    # Keep the caller's policy order
+    return {name: attributes[name] for name in summaries if name in attributes}
+
+
+def _cell(value: str) -> str:
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def render_table(attributes: Dict[str, PolicyAttributes]) -> str:
+    """Markdown table with one column per policy."""
+    names = list(attributes)
+    lines = [
+        "| Feature | " + " | ".join(_cell(n.replace("_", " ")) for n in names) + " |",
+        "|---" * (len(names) + 1) + "|",
+    ]
+    for field_name, label in TABLE_ROWS:
+        lines.append(f"| {label} | " + " | ".join(_cell(getattr(attributes[n], field_name)) for n in names) + " |")
+    return "\n".join(lines)
+
+
+def _facts_block(attributes: Dict[str, PolicyAttributes]) -> str:
+    blocks = []
+    for name, attrs in attributes.items():
+        facts = "; ".join(f"{label}: {getattr(attrs, field_name)}" for field_name, label in TABLE_ROWS)
+        blocks.append(f"{name}: {facts}")
+    return "\n".join(blocks)
+
+
+def compare_policies(user_profile: str, query: str, summaries: Dict[str, str]) -> str:
+    """Map-reduce comparison of the given {policy_name: summary}; returns table + narrative."""
+    attributes = extract_attributes(summaries)
+    if not attributes:
+        return "I couldn't find enough information about these policies to compare them."
+
+    narrative = llm.invoke(comparison_merge_prompt.format_messages(
+        user_profile=user_profile,
+        query=query,
+        policy_facts=_facts_block(attributes),
+    )).content
+    return f"{render_table(attributes)}\n\n{narrative}"
@@ -0,0 +1,299 @@
+# ------------------------------------------------------------------------------------------------
+# Feature recommendation rules
+# ------------------------------------------------------------------------------------------------
+# `feature_guidelines` (functions/prompts.py) stays the single source of the persona -> features
+# table. It is parsed into FeatureRule records at import, and each persona gets a machine-readable
+# condition over ProfileSignals (PERSONA_CONDITIONS). A profile's feature recommendation is the
+# merge of every matching rule, evaluated locally with an explain trace; only profiles matching
+# no rule are sent to the LLM (fx.get_feature_recommendation).
+#
+# Conditions are {signal: expected} where expected is a value (equality) or an (op, value) pair
+# with op in <, <=, >, >=, ==, !=.
+# ------------------------------------------------------------------------------------------------
+
+import logging
+import operator
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from functions.prompts import feature_guidelines
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FeatureRule:
+    category: str
+    persona: str
+    needs: str
+    must_have: List[str] = field(default_factory=list)
+    good_to_have: List[str] = field(default_factory=list)
+    condition: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ProfileSignals:
+    youngest_adult_age: Optional[int]
+    oldest_age: Optional[int]
+    members: int
+    couple: bool
+    has_kids: bool
+    has_parents: bool
+    pre_existing: bool
+    chronic: bool
+    cardiac: bool
+    maternity: bool
+    budget: Optional[str]  # "low", "medium", "high" or None
+    family_history: bool
+    mental_health: bool
+    value_seeker: bool
+    comprehensive: bool
+    claims_anxiety: bool
+    coverage_anxiety: bool
+    wellness: bool
+    travel: bool
+    self_employed: bool
+
+
+# ------------------------------------------------------------------------------------------------
+# Profile signals
+# ------------------------------------------------------------------------------------------------
+
+_AFFIRMATIVE = re.compile(r"^\s*(yes|yeah|yep|sure|definitely|absolutely|of course|y)\b", re.I)
+_NEGATIVE = re.compile(r"^\s*(no|nope|nah|not really|never|n)\b", re.I)
+
+_PATTERNS = {
+    "spouse": re.compile(r"\b(spouse|wife|husband|partner)\b", re.I),
+    "kid": re.compile(r"\b(kids?|child(ren)?|son|daughter|baby)\b", re.I),
+    "parent": re.compile(r"\b(father|mother|parents?|mom|dad|in[- ]laws?)\b", re.I),
+    "chronic": re.compile(r"diabet|sugar|\bbp\b|blood pressure|hypertension|asthma|thyroid|cholesterol", re.I),
+    "cardiac": re.compile(r"heart|cardiac|bypass|angioplasty|stent", re.I),
+    "maternity": re.compile(r"maternity|pregnan|baby|child ?birth|deliver(y|ies)|start(ing)? a family|ivf|fertility", re.I),
+    "low_budget": re.compile(r"\b(low|tight|limited|cheap|cheapest|affordable|economical|budget[- ]friendly|low[- ]cost)\b", re.I),
+    "high_budget": re.compile(r"\b(high|no budget|not a concern|money is not)\b", re.I),
+    "family_history": re.compile(r"family history|runs in (the|my) family|hereditary|genetic", re.I),
+    "mental_health": re.compile(r"mental|anxiety disorder|depression|therapy|psychiatr|counsel", re.I),
+    "value_seeker": re.compile(r"unlimited|flexib|value for money|best value|savvy", re.I),
+    "comprehensive": re.compile(r"comprehensive|best (features|coverage)|everything covered|all features", re.I),
+    "claims_anxiety": re.compile(r"claim(s)? (settlement|rejection|rejected|process|hassle|support)|trust|reliab", re.I),
+    "coverage_anxiety": re.compile(r"\b1 ?cr|crore|high (cover|coverage|sum insured)|maximum (cover|coverage)|never run out", re.I),
+    "wellness": re.compile(r"gym|fitness|workout|healthy lifestyle|steps|yoga|running|wellness", re.I),
+    "travel": re.compile(r"travel|abroad|international|global|overseas", re.I),
+    "self_employed": re.compile(r"self[- ]employed|freelanc|\bgig\b|business owner|own business|consultant", re.I),
+}
+
+
+def _flatten(values) -> List:
+    flat = []
+    for item in values or []:
+        flat.extend(item if isinstance(item, list) else [item])
+    return flat
+
+
+def preference_text(state) -> str:
+    """
+    The user's stated preferences as one string. A yes-answer keeps the question ("Do you travel
+    often?" -> travel), a no-answer drops it, anything else keeps the answer text.
+    """
+    parts = [state.specific_benefits or ""]
+    for pref in state.preferences_data:
+        if not isinstance(pref, dict):
+            continue
+        response = str(pref.get("response") or "")
+        if not response:
+            continue
+        if _AFFIRMATIVE.match(response):
+            parts.append(f"{pref.get('question', '')} {response}")
+        elif not _NEGATIVE.match(response) or len(response.split()) > 3:
+            parts.append(response)
+    return " ".join(p for p in parts if p)
+
+
+def profile_signals(state) -> ProfileSignals:
+    ages = [int(a) for a in _flatten(state.age) if str(a).isdigit()]
+    family = " ".join(str(m) for m in _flatten(state.family_members))
+    conditions = " ".join(str(c) for c in _flatten(state.pre_existing_conditions))
+    wants = preference_text(state)
+
+    budget = (state.budget_range or "").lower() or None
+    if budget not in ("low", "medium", "high"):
+        budget_text = f"{state.budget_range or ''} {wants}"
+        budget = "low" if _PATTERNS["low_budget"].search(budget_text) else (
+            "high" if _PATTERNS["high_budget"].search(budget_text) else None
+        )
+
+    adults = [a for a in ages if a >= 18] or ages
+    return ProfileSignals(
+        youngest_adult_age=min(adults) if adults else None,
+        oldest_age=max(ages) if ages else None,
+        members=max(len(_flatten(state.family_members)), len(ages), 1),
+        couple=bool(_PATTERNS["spouse"].search(family)),
+        has_kids=bool(_PATTERNS["kid"].search(family)) or any(a < 18 for a in ages),
+        has_parents=bool(_PATTERNS["parent"].search(family)),
+        pre_existing=bool(state.has_pre_existing_conditions or conditions.strip()),
+        chronic=bool(_PATTERNS["chronic"].search(conditions)),
+        cardiac=bool(_PATTERNS["cardiac"].search(conditions)),
+        maternity=bool(_PATTERNS["maternity"].search(wants)),
+        budget=budget,
+        family_history=bool(_PATTERNS["family_history"].search(wants)),
+        mental_health=bool(_PATTERNS["mental_health"].search(f"{wants} {conditions}")),
+        value_seeker=bool(_PATTERNS["value_seeker"].search(wants)),
+        comprehensive=bool(_PATTERNS["comprehensive"].search(wants)),
+        claims_anxiety=bool(_PATTERNS["claims_anxiety"].search(wants)),
+        coverage_anxiety=bool(_PATTERNS["coverage_anxiety"].search(wants)),
+        wellness=bool(_PATTERNS["wellness"].search(wants)),
+        travel=bool(_PATTERNS["travel"].search(wants)),
+        self_employed=bool(_PATTERNS["self_employed"].search(wants)),
+    )
+
+
+# ------------------------------------------------------------------------------------------------
+# Rules
+# ------------------------------------------------------------------------------------------------
+
+# Persona heading prefix (as written in feature_guidelines) -> condition
+PERSONA_CONDITIONS: Dict[str, Dict[str, Any]] = {
+    "Young Single": {"members": 1, "oldest_age": ("<", 25), "pre_existing": False},
+    "Young couple just started their family": {"couple": True, "maternity": True},
+    "Families with kids": {"has_kids": True},
+    "Middle age couples": {"couple": True, "oldest_age": (">=", 40), "youngest_adult_age": ("<", 60)},
+    "Elderly Parents": {"has_parents": True},
+    "Senior Citizens": {"has_parents": False, "oldest_age": (">=", 60)},
+    "Chronic Illness": {"chronic": True},
+    "Cardiac Disease Patients": {"cardiac": True},
+    "High risk applicants": {"pre_existing": True, "oldest_age": (">=", 50)},
+    "Family history of critical illness": {"family_history": True},
+    "Mental Health Support seeker": {"mental_health": True},
+    "Affordability focussed": {"budget": "low"},
+    "Want great coverage without high costs": {"value_seeker": True},
+    "Comprehensive coverage seekers": {"comprehensive": True},
+    "Peace of mind, driven by claims anxiety": {"claims_anxiety": True},
+    "Peace of mind, driven by coverage anxiety": {"coverage_anxiety": True},
+    "Healthy lifestyle Focussed": {"wellness": True},
+    "Travel often": {"travel": True},
+    "Self employed and gig workers": {"self_employed": True},
+}
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq, "!=": operator.ne}
+
+
+def _field(block: str, label: str) -> str:
+    match = re.search(rf"\*\*{re.escape(label)}:\*\*\s*(.+)", block)
+    return match.group(1).strip() if match else ""
+
+
+def _bullets(block: str, label: str) -> List[str]:
+    match = re.search(rf"\*\*{re.escape(label)}:\*\*(.*?)(?=\n\*\*|\Z)", block, re.S)
+    if not match:
+        return []
+    return [line.strip()[2:].strip() for line in match.group(1).splitlines() if line.strip().startswith("* ")]
+
+
+def parse_guidelines(text: str) -> List[FeatureRule]:
+    """FeatureRule records from the feature_guidelines markdown, with their conditions attached."""
+    rules = []
+    for block in text.split("\n---"):
+        persona = _field(block, "Situation/ Persona")
+        if not persona:
+            continue
+        condition = next((c for prefix, c in PERSONA_CONDITIONS.items() if persona.startswith(prefix)), None)
+        if condition is None:
+            logger.warning("No condition for feature persona %r; it is left to the LLM", persona)
+            continue
+        rules.append(FeatureRule(
+            category=_field(block, "Category"),
+            persona=persona,
+            needs=_field(block, "Needs"),
+            must_have=_bullets(block, "Must have Features"),
+            good_to_have=_bullets(block, "Good to have features"),
+            condition=condition,
+        ))
+    return rules
+
+
+FEATURE_RULES: List[FeatureRule] = parse_guidelines(feature_guidelines)
+
+
+# ------------------------------------------------------------------------------------------------
+# Evaluation
+# ------------------------------------------------------------------------------------------------
+
+@dataclass
+class RuleTrace:
+    persona: str
+    matched: bool
+    checks: List[Tuple[str, str, Any, bool]]  # (signal, expectation, actual, passed)
+
+
+def _check(actual: Any, expected: Any) -> Tuple[str, bool]:
+    if isinstance(expected, tuple):
+        op, value = expected
+        return f"{op} {value}", actual is not None and _OPS[op](actual, value)
+    return f"== {expected}", actual == expected
+
+
+def evaluate(signals: ProfileSignals, rules: List[FeatureRule] = FEATURE_RULES) -> Tuple[List[FeatureRule], List[RuleTrace]]:
+    """Rules matching the signals, plus the trace of every check."""
+    values = asdict(signals)
+    matched, trace = [], []
+    for rule in rules:
+        checks = []
+        for signal, expected in rule.condition.items():
+            expectation, passed = _check(values[signal], expected)
+            checks.append((signal, expectation, values[signal], passed))
+        ok = all(passed for *_, passed in checks)
+        trace.append(RuleTrace(rule.persona, ok, checks))
+        if ok:
+            matched.append(rule)
+    return matched, trace
+
+
+_MIN_COVER = re.compile(r"^Min (\d+) lakh", re.I)
+
+
+def _merge(items: List[str], exclude: Optional[set] = None) -> List[str]:
+    """Unique items in order; of several 'Min N lakh ...' covers only the highest is kept."""
+    exclude = exclude or set()
+    covers = [(int(m.group(1)), item) for item in items if (m := _MIN_COVER.match(item))]
+    best_cover = max(covers)[1] if covers else None
+    merged = []
+    for item in items:
+        if _MIN_COVER.match(item) and item != best_cover:
+            continue
+        if item not in merged and item not in exclude:
+            merged.append(item)
+    return merged
+
+
+def format_recommendation(rules: List[FeatureRule]) -> str:
+    must = _merge([f for rule in rules for f in rule.must_have])
+    good = _merge([f for rule in rules for f in rule.good_to_have], exclude=set(must))
+    lines = ["**Matching personas:** " + "; ".join(rule.persona for rule in rules), "", "**Must have Features:**"]
+    lines += [f"* {feature}" for feature in must]
+    if good:
+        lines += ["", "**Good to have features:**"] + [f"* {feature}" for feature in good]
+    return "\n".join(lines)
+
+
+def explain(state) -> List[RuleTrace]:
+    """Per-rule trace of which conditions the profile passed or failed."""
+    return evaluate(profile_signals(state))[1]
+
+
+def recommend_features(state, user_profile: str) -> str:
+    """
+    Feature recommendation from the rules. Only when no rule matches is the LLM used, and its
+    answer is shared by every profile with the same feature signature.
+    """
+    matched, trace = evaluate(profile_signals(state))
+    if matched:
+        logger.info("Feature rules matched: %s", ", ".join(rule.persona for rule in matched))
+        return format_recommendation(matched)
+    logger.info("No feature rule matched; asking the LLM")
+    logger.debug("Feature rule trace: %s", trace)
+    from functions.fx import get_feature_recommendation
+    from functions.profile_cache import feature_recommendation_cache, feature_signature
+    return feature_recommendation_cache.get_or_compute(
+        feature_signature(state), lambda: get_feature_recommendation(user_profile)
+    )
@@ -6,7 +6,6 @@ sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..")))
 
 
 # Prerequisites:
-from langchain import hub as prompts
 
 from functions.prereq import llm, vectorstore, embeddings
 # # from functions.prompts import Query_Rephrase_prompt_template
@@ -53,20 +52,30 @@ from functions.prompts import feature_guidelines, initial_recommendation_guideli
 # Policy Router
 # ------------------------------------------------------------------------------------------------
 from functions.prereq import RoutePolicy
+from functions import providers
 
-policy_router = llm.with_structured_output(RoutePolicy)
+providers.register("policy_router", lambda: providers.get("llm_gemini").with_structured_output(RoutePolicy))
+policy_router = providers.lazy("policy_router")
 
-policy_routing_prompt = prompts.pull("policy_routing_prompt")
-policy_router_chain = policy_routing_prompt | policy_router
+from functions.prompt_registry import get_prompt
 
-def route_policy_query(question):
+def llm_route_policy_query(question):
     try:
+        policy_router_chain = get_prompt("policy_routing_prompt") | policy_router
         routing_result = policy_router_chain.invoke({"question": question})
         return routing_result.policy_name  # Now a list
     except Exception:
         return ["General Insurance"]
 
 
+from functions.policy_router import embedding_policy_router
+
+def route_policy_query(question):
+    # Aliases and the cached embedding index answer most questions; the LLM router is the fallback.
+    # Results are cached per question, so policy_info_node and RAG_tool share one routing.
+    return embedding_policy_router.route(question, fallback=llm_route_policy_query)
+
+
 
 # ------------------------------------------------------------------------------------------------  
 # RAG Tool
@@ -78,74 +87,214 @@ from langchain_cohere import CohereRerank
 from langchain_core.runnables import RunnablePassthrough, RunnableParallel
 from langchain_core.output_parsers import StrOutputParser
 from langchain.globals import set_llm_cache
-from langchain_mongodb.cache import MongoDBAtlasSemanticCache
-from langchain import hub as prompts
+from langchain_core.caches import BaseCache
+from functions import providers
 
 
 mongodb_atlas_uri = os.getenv("MONGODB_ATLAS_CLUSTER_URI")
 COLLECTION_NAME="GAIDO_CACHE"
 DATABASE_NAME="Gaido_cache_DB"
 
-set_llm_cache(MongoDBAtlasSemanticCache(
-    embedding=embeddings,
-    connection_string=mongodb_atlas_uri,
-    collection_name=COLLECTION_NAME,
-    database_name=DATABASE_NAME,
-))
+def _build_semantic_cache():
+    from langchain_mongodb.cache import MongoDBAtlasSemanticCache
+    return MongoDBAtlasSemanticCache(
+        embedding=providers.get("embeddings"),
+        connection_string=mongodb_atlas_uri,
+        collection_name=COLLECTION_NAME,
+        database_name=DATABASE_NAME,
+    )
+
+providers.register("semantic_cache", _build_semantic_cache)
+
+
+class LazySemanticCache(BaseCache):
+    """Global LLM cache that connects to MongoDB Atlas on the first lookup rather than at import."""
+
+    def lookup(self, prompt, llm_string):
+        return providers.get("semantic_cache").lookup(prompt, llm_string)
+
+    def update(self, prompt, llm_string, return_val):
+        return providers.get("semantic_cache").update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs):
+        return providers.get("semantic_cache").clear(**kwargs)
+
+    async def alookup(self, prompt, llm_string):
+        return await providers.get("semantic_cache").alookup(prompt, llm_string)
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        return await providers.get("semantic_cache").aupdate(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs):
+        return await providers.get("semantic_cache").aclear(**kwargs)
+
+
+set_llm_cache(LazySemanticCache())
 
 cohere_api = os.environ.get("COHERE_API_KEY")
 os.environ["COHERE_API_KEY"] = cohere_api
 
-def create_rag_chain(vectorstore):
-    def retrieve_with_policy_filter(question):
-        policy_name = route_policy_query(question)
-        
-        # Retrieve documents filtered by policy name
+# Retrieval makes one multi-policy search (one embedding, one RPC), then reranks each policy's
+# chunks concurrently; a rerank that misses the timeout is dropped so one slow policy cannot
+# hold up the answer for the others.
+RETRIEVAL_MAX_CONCURRENCY = int(os.getenv("GAIDO_RETRIEVAL_CONCURRENCY", "4"))
+RETRIEVAL_BRANCH_TIMEOUT = float(os.getenv("GAIDO_RETRIEVAL_TIMEOUT", "10"))
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from langchain_core.runnables import RunnableLambda
+from functions.prereq import multi_policy_search
+
+logger = logging.getLogger(__name__)
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_CONCURRENCY, thread_name_prefix="rag-retrieval")
+
+
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+from functions.rag_sufficiency import (
+    SUFFICIENT, INSUFFICIENT, UNCERTAIN, assess_answer, assess_retrieval, flatten, retrieval_score,
+)
+
+
+@dataclass
+class RAGAnswer:
+    answer: Optional[str]  # None when retrieval was too weak to be worth generating from
+    sufficient: bool
+    stage: str  # what decided sufficiency: "retrieval", "answer" or "llm_judge"
+    score: float
+
+
+class RAGPipeline:
+    """
+    Policy-document RAG built once per process: the hub prompt, the Cohere reranker (and its
+    HTTP client) and the chain are created in __init__ and shared by every call.
+    """
+
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
         # Rerank using Cohere
-        reranker = CohereRerank(
+        self.reranker = CohereRerank(
             model="rerank-english-v3.0",
             top_n=2  # Final refined results
         )
-        # filtered_docs = []
+        # Prompt Template
+        self.prompt_template = get_prompt("rag_prompt_template")
+        # Generation from already-retrieved context
+        self.generate = self.prompt_template | llm | StrOutputParser()
+        # RAG Chain
+        self.chain = (
+            RunnableParallel({
+                "context": RunnableLambda(self.retrieve, afunc=self.aretrieve),
+                "question": RunnablePassthrough(),
+                "chat_history": RunnablePassthrough()
+            })
+            | self.generate
+        )
+
+    def _search_policies(self, question, policy_name, similarities=None):
+        # k=5 per policy to allow reranking
+        # Reuse the embedding computed while routing the question
+        grouped = multi_policy_search(
+            question, policy_name, k=5, query_embedding=embedding_policy_router.query_embedding(question)
+        )
+        if similarities is not None:
+            similarities.extend(score for policy in policy_name for _, score in grouped.get(policy, []))
+        return [[doc for doc, _ in grouped.get(policy, [])] for policy in policy_name]
+
+    def retrieve(self, question, similarities=None):
+        """Return one list of reranked documents per routed policy."""
+        policy_name = route_policy_query(question)
+        candidates = self._search_policies(question, policy_name, similarities)
+        futures = [retrieval_executor.submit(self.reranker.compress_documents, docs, question) for docs in candidates]
+        wait(futures, timeout=RETRIEVAL_BRANCH_TIMEOUT)
+
         final_docs = []
-        for policy in policy_name:
-            filtered_docs = vectorstore.similarity_search(
-                question, 
-                k=5,  # Retrieve more initially to allow reranking
-                filter={"Policy_Name": policy}
-            )
-            reranked_docs = reranker.compress_documents(filtered_docs, question)
-            final_docs.append(reranked_docs)
-        
-        reranked_docs = final_docs
-        
-        return reranked_docs  # Return the top 4 ranked documents
+        for policy, future in zip(policy_name, futures):
+            if not future.done():
+                future.cancel()
+                logger.warning("Rerank for %s timed out after %ss", policy, RETRIEVAL_BRANCH_TIMEOUT)
+            elif future.exception() is not None:
+                logger.warning("Rerank for %s failed: %s", policy, future.exception())
+            else:
+                final_docs.append(future.result())
+        return final_docs
+
+    async def aretrieve(self, question):
+        policy_name = await asyncio.to_thread(route_policy_query, question)
+        candidates = await asyncio.to_thread(self._search_policies, question, policy_name)
+        semaphore = asyncio.Semaphore(RETRIEVAL_MAX_CONCURRENCY)
+
+        async def branch(policy, docs):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self.reranker.acompress_documents(docs, question), RETRIEVAL_BRANCH_TIMEOUT)
+                except Exception as e:
+                    logger.warning("Rerank for %s failed: %r", policy, e)
+                    return None
+
+        results = await asyncio.gather(*(branch(policy, docs) for policy, docs in zip(policy_name, candidates)))
+        return [docs for docs in results if docs is not None]
+
+    def invoke(self, question: str) -> str:
+        return self.chain.invoke(question)
+
+    def answer(self, question: str) -> RAGAnswer:
+        """
+        Answer from the policy documents and say whether the answer is good enough to show.
+        Weak retrievals return without generating; only the gray zone reaches the LLM judge.
+        """
+        similarities: List[float] = []
+        documents = self.retrieve(question, similarities)
+        flat_documents = flatten(documents)
+        score = retrieval_score(question, flat_documents, similarities)
+        verdict = assess_retrieval(score)
+        logger.info("Retrieval score %.2f (%s)", score, verdict)
+        if verdict == INSUFFICIENT:
+            return RAGAnswer(None, False, "retrieval", score)
+
+        answer = self.generate.invoke({"context": documents, "question": question, "chat_history": question})
+        if verdict == SUFFICIENT:
+            return RAGAnswer(answer, True, "retrieval", score)
+
+        verdict = assess_answer(answer, flat_documents)
+        if verdict != UNCERTAIN:
+            return RAGAnswer(answer, verdict == SUFFICIENT, "answer", score)
+        return RAGAnswer(answer, evaluate_rag_response(question, answer), "llm_judge", score)
+
+    async def ainvoke(self, question: str) -> str:
+        return await self.chain.ainvoke(question)
+
+    def batch(self, questions: List[str]) -> List[str]:
+        return self.chain.batch(questions, config={"max_concurrency": RETRIEVAL_MAX_CONCURRENCY})
+
+    async def abatch(self, questions: List[str]) -> List[str]:
+        return await self.chain.abatch(questions, config={"max_concurrency": RETRIEVAL_MAX_CONCURRENCY})
+
+
+_rag_pipeline = None
+_rag_pipeline_lock = threading.Lock()
+
+
+def get_rag_pipeline() -> RAGPipeline:
+    """Return the process-wide RAGPipeline, building it on first use."""
+    global _rag_pipeline
+    if _rag_pipeline is None:
+        with _rag_pipeline_lock:
+            if _rag_pipeline is None:
+                _rag_pipeline = RAGPipeline(vectorstore)
+    return _rag_pipeline
 
-    
-    # Prompt Template
-    prompt_template = prompts.pull("rag_prompt_template")
-    
-    # RAG Chain
-    rag_chain = (
-        RunnableParallel({
-            "context": retrieve_with_policy_filter,
-            "question": RunnablePassthrough(),
-            "chat_history": RunnablePassthrough()
-        })
-        | prompt_template
-        | llm
-        | StrOutputParser()
-    )
-    
-    return rag_chain
+
+def create_rag_chain(vectorstore):
+    return RAGPipeline(vectorstore).chain
 
 
 @tool
 def RAG_tool(query: str):
     """Retrieve answers from the knowledge base containing insurance policy documents. Primarily used to respond to user queries based on stored information."""
-    chain = create_rag_chain(vectorstore)
-    response = chain.invoke(query,{'chat_history': []})
-    return response
+    return get_rag_pipeline().invoke(query)
 
 # ------------------------------------------------------------------------------------------------
 # Web search tool
@@ -183,16 +332,115 @@ def web_search_tool(query: str) -> str:
     except Exception as e:
         return f"Error performing web search: {str(e)}"
 
+# ------------------------------------------------------------------------------------------------
+# Policy questions: RAG with web search fallback
+# ------------------------------------------------------------------------------------------------
+# With GAIDO_SPECULATIVE_WEB_SEARCH=1, a question whose policy routing was not confident starts
+# the web search alongside RAG, so an insufficient RAG answer costs max(RAG, web) instead of the
+# sum. The web result is discarded when RAG is sufficient (it is cancelled if it has not started).
+# Speculative spend is tracked per conversation turn (graph thread id + turn number); a search is
+# only launched while the turn's running total plus its estimated cost stays within the budget,
+# and the estimate is refunded when a speculative search is cancelled before it starts.
+# Single-fact questions about named policies are answered from the policy facts table first.
+
+from collections import OrderedDict
+
+from functions.policy_facts import policy_facts
+from my_agent.utils.background import current_thread_id
+
+SPECULATIVE_WEB_SEARCH = os.getenv("GAIDO_SPECULATIVE_WEB_SEARCH", "").lower() in ("1", "true", "yes")
+SPECULATION_MAX_ROUTE_CONFIDENCE = 0.85  # speculate only below this routing confidence
+WEB_SEARCH_COST_ESTIMATE = float(os.getenv("GAIDO_WEB_SEARCH_COST", "0.035"))  # USD per gpt-4.1 web search call
+SPECULATION_TURN_BUDGET = float(os.getenv("GAIDO_SPECULATION_BUDGET", "0.05"))  # USD of speculative spend per turn
+
+SPECULATION_LEDGER_SIZE = 1024  # turns whose spend is remembered
+
+speculation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="web-speculation")
+
+
+class SpeculationLedger:
+    """Running total of speculative web-search spend per (thread id, turn)."""
+
+    def __init__(self, budget: float = SPECULATION_TURN_BUDGET, max_turns: int = SPECULATION_LEDGER_SIZE):
+        self.budget = budget
+        self.max_turns = max_turns
+        self._spent: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, turn: tuple, cost: float) -> bool:
+        """Add `cost` to the turn's total, or refuse if that would exceed the budget."""
+        with self._lock:
+            spent = self._spent.get(turn, 0.0)
+            if spent + cost > self.budget:
+                return False
+            self._spent[turn] = spent + cost
+            self._spent.move_to_end(turn)
+            while len(self._spent) > self.max_turns:
+                self._spent.popitem(last=False)
+            return True
+
+    def refund(self, turn: tuple, cost: float) -> None:
+        with self._lock:
+            if turn in self._spent:
+                self._spent[turn] = max(0.0, self._spent[turn] - cost)
+
+
+speculation_ledger = SpeculationLedger()
+
+
+def answer_policy_question(question: str, turn: Optional[int] = None):
+    """
+    Answer from the policy documents, falling back to web search. Returns (answer, source).
+    `turn` (e.g. the state's interaction_count) scopes the speculative-search budget.
+    """
+    fact = policy_facts.answer_fact(question)
+    if fact is not None:
+        logger.info("Answered from the policy facts table")
+        return fact, "our database"
+
+    confidence = embedding_policy_router.confidence(question)
+    budget_key = (current_thread_id(), turn)
+    speculate = (
+        SPECULATIVE_WEB_SEARCH
+        and (confidence is None or confidence < SPECULATION_MAX_ROUTE_CONFIDENCE)
+        and speculation_ledger.reserve(budget_key, WEB_SEARCH_COST_ESTIMATE)
+    )
+    web_future = speculation_executor.submit(web_search_tool.invoke, question) if speculate else None
+    if speculate:
+        logger.info("Speculative web search started (route confidence %s)", confidence)
+
+    try:
+        rag = get_rag_pipeline().answer(question)
+    except Exception as e:
+        logger.warning("RAG failed, using web search: %s", e)
+        rag = None
+
+    if rag is not None and rag.sufficient:
+        if web_future is not None:
+            if web_future.cancel():
+                speculation_ledger.refund(budget_key, WEB_SEARCH_COST_ESTIMATE)
+            else:
+                logger.info("Discarding speculative web search result")
+        return rag.answer, "our database"
+    if web_future is not None:
+        return web_future.result(), "web search"
+    return web_search_tool.invoke(question), "web search"
+
 # ------------------------------------------------------------------------------------------------
 # REACT AGENT
 # ------------------------------------------------------------------------------------------------
 from functions.fx import RAG_tool, web_search_tool
 from langgraph.prebuilt import create_react_agent
-react_agent = create_react_agent(
-    model=llm,
-    tools=[RAG_tool, web_search_tool],
-    # prompt=
-)
+
+def _build_react_agent():
+    return create_react_agent(
+        model=providers.get("llm_gemini"),
+        tools=[RAG_tool, web_search_tool],
+        # prompt=
+    )
+
+providers.register("react_agent", _build_react_agent)
+react_agent = providers.lazy("react_agent")
 
 # ------------------------------------------------------------------------------------------------
 # Feature recommendation - Based on user profile
@@ -200,10 +448,8 @@ react_agent = create_react_agent(
 
 from functions.prompts import feature_guidelines
 
-feature_recommendation_prompt = prompts.pull("feature_recommendation_prompt")
-
 def get_feature_recommendation(user_profile):
-    chain = feature_recommendation_prompt | llm
+    chain = get_prompt("feature_recommendation_prompt") | llm
     # Run the chain
     response = chain.invoke({
         "feature_guidelines": feature_guidelines,
@@ -216,8 +462,7 @@ def get_feature_recommendation(user_profile):
 # ------------------------------------------------------------------------------------------------
 
 def initial_recommendation(query, state):
-    initial_recommendation_prompt = prompts.pull("initial_recommendation_prompt")
-    chain = initial_recommendation_prompt | llm
+    chain = get_prompt("initial_recommendation_prompt") | llm
     # Run the chain
     response = chain.invoke({
         "initial_recommendation_guidelines": initial_recommendation_guidelines,
@@ -329,13 +574,12 @@ def initial_recommendation(query, state):
 # RAG Evaluation
 # ------------------------------------------------------------------------------------------------
 
-rag_evaluation_prompt = prompts.pull("rag_evaluation_prompt")
 def evaluate_rag_response(query: str, rag_response: str) -> bool:
     """
     Use LLM to evaluate if the RAG response is sufficient or if we need web search.
     Returns True if RAG response is sufficient, False if we need web search.
     """
-    evaluation_prompt = rag_evaluation_prompt.format(query=query, rag_response=rag_response)
+    evaluation_prompt = get_prompt("rag_evaluation_prompt").format(query=query, rag_response=rag_response)
     evaluation = llm.invoke(evaluation_prompt).content.strip()
     return evaluation == "SUFFICIENT"
 
@@ -344,10 +588,9 @@ def evaluate_rag_response(query: str, rag_response: str) -> bool:
 # Policy Comparison
 # ------------------------------------------------------------------------------------------------
 from my_agent.user_state import UserProfile
-comparision_template = prompts.pull("policy_comparison_template")
 def policy_comparison(state: UserProfile, policy_summaries: str):
     # Format the template and store the result
-    formatted_prompt = comparision_template.format_messages(
+    formatted_prompt = get_prompt("policy_comparison_template").format_messages(
         state=state, 
         policy_summaries=policy_summaries
     )
@@ -355,31 +598,6 @@ def policy_comparison(state: UserProfile, policy_summaries: str):
     response = llm.invoke(formatted_prompt)
     return response.content
 
-from langchain.prompts import ChatPromptTemplate
-def count_policies_compared(text: str) -> int:
-    """
-    Counts the number of distinct insurance policies being compared in the given text.
-    Returns an integer representing the count.
-    """
-    comparison_count_prompt = """
-    You are an AI assistant that analyzes insurance-related text.
-
-    Your task is to determine **how many different insurance policies are being compared** in the text below.
-
-    ### Text:
-    {text}
-
-    ### Instructions:
-    - Only count distinct policies that are explicitly mentioned or clearly compared.
-    - Do NOT include general mentions or vague references.
-    - Return ONLY the number (as an integer). Do not include any explanation or extra text.
-
-    ### Output:
-    """
-    
-    prompt = ChatPromptTemplate.from_template(comparison_count_prompt)
-    result = llm.invoke(prompt.format_prompt(text=text).to_string()).content
-    return int(result)
 
 
 # ------------------------------------------------------------------------------------------------
@@ -387,11 +605,14 @@ def count_policies_compared(text: str) -> int:
 # ------------------------------------------------------------------------------------------------
 from langgraph.types import interrupt, Command
 from langgraph.prebuilt import create_react_agent
-agent = create_react_agent(
-    model=llm,
+providers.register("persuasion_agent", lambda: create_react_agent(
+    model=providers.get("llm_gemini"),
     tools=[RAG_tool, web_search_tool]
-)
-llm_with_tools = llm.bind_tools([RAG_tool, web_search_tool])
+))
+agent = providers.lazy("persuasion_agent")
+
+providers.register("llm_with_tools", lambda: providers.get("llm_gemini").bind_tools([RAG_tool, web_search_tool]))
+llm_with_tools = providers.lazy("llm_with_tools")
 
 # # Create prompt for LLM
 persuasion_prompt = """
@@ -421,10 +642,13 @@ You can use the following tools to help you:
 """
 
 def answer_question(question: str, state: UserProfile, node_name: str) -> str:
+    from my_agent.utils.conversation_memory import ConversationMemory, advance_fold
+
+    memory_fields = advance_fold(state)
     context = {
         "user_profile": state.get_summary(),
         "recommendations": state.recommeneded_policies,
-        "conversation_history": state.messages,
+        "conversation_history": ConversationMemory.from_state(state).window(),
         "current_question": question
     }
     prompt_template = persuasion_prompt
@@ -437,14 +661,12 @@ def answer_question(question: str, state: UserProfile, node_name: str) -> str:
     response_content = response['messages'][-1].content
 
     # Add messages as strings, not dictionaries
-    state.messages.append(f"User: {question}")
-    state.messages.append(f"Assistant: {response_content}")
-
     return Command(
         goto=node_name,
-        update={
-            **state.model_dump(),
-            "agent_query": response_content,
-            "profiling_stage": node_name,
-            }
+        update=state.delta(
+            messages=[f"User: {question}", f"Assistant: {response_content}"],
+            agent_query=response_content,
+            profiling_stage=node_name,
+            **memory_fields,
+            )
     )
@@ -0,0 +1,253 @@
+# ------------------------------------------------------------------------------------------------
+# Cascade intent classifier
+# ------------------------------------------------------------------------------------------------
+# The supervisor routes every turn on a QueryResponse.query_type. Most turns are easy to place
+# ("yes", "compare Optima Secure and Elevate", a bare policy name), so they are classified
+# in-process and only ambiguous queries are escalated to the LLM:
+#
+# 1. Keyword rules: a single unambiguous intent cue decides the label.
+# 2. Nearest centroid: hashed word/char n-gram vectors compared against per-label centroids built
+#    from the labelled examples below. Accepted only with a clear score and margin.
+# 3. LLM: whatever is left goes to the structured-output classifier passed in by the caller.
+#
+# The vectors are computed locally on purpose; a remote embedding call would cost more than the
+# LLM hop it is meant to save.
+# ------------------------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import math
+import re
+from typing import Callable, Dict, List, Tuple
+
+from functions.prereq import POLICY_NAMES
+
+logger = logging.getLogger(__name__)
+
+QUERY_TYPES = (
+    "policy_recommendation_request",
+    "service_information_request",
+    "policy_information_request",
+    "insurer_information_request",
+    "policy_comparison_request",
+    "analysis_request",
+    "other",
+)
+
+HASH_BUCKETS = 1 << 18
+MIN_CENTROID_SCORE = 0.30  # cosine similarity to the best centroid
+MIN_CENTROID_MARGIN = 0.08  # gap between the best and the runner-up centroid
+
+
+# ------------------------------------------------------------------------------------------------
+# Keyword rules
+# ------------------------------------------------------------------------------------------------
+
+_ACKNOWLEDGEMENTS = {
+    "yes", "y", "yeah", "yep", "sure", "ok", "okay", "no", "n", "nope", "thanks", "thank you",
+    "hi", "hello", "hey", "bye", "done", "proceed", "skip", "quit", "stop", "cool", "great",
+}
+
+_INTENT_RULES: List[Tuple[str, "re.Pattern[str]"]] = [
+    ("policy_comparison_request", re.compile(
+        r"\b(compare|comparison|comparing|vs\.?|versus|difference between|differences between|better than|which is better)\b")),
+    ("analysis_request", re.compile(
+        r"\b(analy[sz]e|analysis|deep dive|pros and cons|evaluate|evaluation|validate|critique|in depth)\b")),
+    ("policy_recommendation_request", re.compile(
+        r"\b(recommend|recommendation|suggest|suggestion|best (policy|plan|insurance)|which (policy|plan) should"
+        r"|looking for (a |an )?(health )?(policy|plan|insurance|cover)|need (a |an )?(health )?(policy|plan|insurance|cover)"
+        r"|buy (a |an )?(health )?(policy|plan|insurance))\b")),
+    ("insurer_information_request", re.compile(
+        r"\b(claim settlement ratio|claim ratio|csr|insurers?|insurance compan(y|ies))\b")),
+    ("service_information_request", re.compile(
+        r"\b(claims?(?! (settlement )?ratio)|renew|renewal|cashless|reimbursement|portability|port my|network hospitals?"
+        r"|customer care|helpline|toll free|grievance|tpa)\b")),
+]
+
+# Words that appear in policy names but are too common to signal one on their own
+_GENERIC_NAME_TOKENS = {
+    "health", "plan", "policy", "network", "list", "plus", "the", "and", "of", "my", "care", "star",
+    "one", "max", "pro", "fit", "super", "senior", "smart", "young", "premium", "energy", "joy",
+    "protect", "classic", "gold", "elite", "lite", "heart", "rise", "active", "advantage",
+    "essential", "enhanced", "freedom", "comprehensive", "assure", "secure", "restore", "ultimate",
+    "companion", "promise", "bronze", "combo", "platinum", "pulse", "cardiac",
+}
+_INSURERS = {
+    "hdfc", "ergo", "icici", "lombard", "bajaj", "allianz", "tata", "aig", "niva", "bupa", "nivabupa",
+    "aditya", "birla", "adityabirla", "starhealth", "galaxy",
+}
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _policy_tokens() -> set:
+    tokens = set()
+    for name in POLICY_NAMES:
+        tokens.update(t for t in _tokens(name.replace("_", " ").replace("-", " ")) if len(t) > 2)
+    return tokens - _GENERIC_NAME_TOKENS - {t for i in _INSURERS for t in i.split()}
+
+
+_POLICY_TOKENS = _policy_tokens()
+
+
+def _rule_label(text: str):
+    """Return the label decided by the keyword rules, or None when they are silent or disagree."""
+    normalized = " ".join(_tokens(text))
+    if not normalized or normalized in _ACKNOWLEDGEMENTS:
+        return "other"
+
+    matched = {label for label, pattern in _INTENT_RULES if pattern.search(normalized)}
+    if len(matched) == 1:
+        return matched.pop()
+    if matched:
+        return None
+
+    words = normalized.split()
+    mentions_policy = any(w in _POLICY_TOKENS for w in words)
+    mentions_insurer = any(w in _INSURERS for w in words)
+    # A bare name ("Optima Secure", "ICICI Elevate") is a request for that policy's details
+    if len(words) <= 5 and mentions_policy:
+        return "policy_information_request"
+    if len(words) <= 4 and mentions_insurer and not mentions_policy:
+        return "insurer_information_request"
+    return None
+
+
+# ------------------------------------------------------------------------------------------------
+# Nearest-centroid model
+# ------------------------------------------------------------------------------------------------
+
+LABELLED_EXAMPLES: Dict[str, List[str]] = {
+    "policy_recommendation_request": [
+        "which health insurance should I take for my family",
+        "I want a good policy for my parents",
+        "help me choose a health plan",
+        "what plan would suit a 30 year old with diabetes",
+        "get me a cover for my wife and kids",
+        "I am looking to buy health insurance",
+        "what are good options for senior citizens",
+        "plan for a family of four under 20000 premium",
+    ],
+    "service_information_request": [
+        "how do I file a claim",
+        "what documents are needed for claim settlement",
+        "how can I renew my policy",
+        "is cashless treatment available near me",
+        "how long does reimbursement take",
+        "can I port my existing policy",
+        "how to add a family member to my policy",
+        "what is the waiting period to raise a claim after purchase",
+    ],
+    "policy_information_request": [
+        "what is the waiting period in optima secure",
+        "does care supreme cover maternity",
+        "room rent limit in activ one",
+        "tell me about reassure 2.0",
+        "what is the sum insured in medicare plus",
+        "does this policy cover pre existing diseases",
+        "what are the exclusions of the elevate plan",
+        "co payment clause in star comprehensive",
+    ],
+    "insurer_information_request": [
+        "what is the claim settlement ratio of hdfc ergo",
+        "is icici lombard a good insurer",
+        "tell me about niva bupa as a company",
+        "how many network hospitals does star health have",
+        "which insurer has the best service",
+        "is tata aig reliable",
+    ],
+    "policy_comparison_request": [
+        "compare optima secure and care supreme",
+        "which one is better elevate or reassure",
+        "difference between activ one and medicare premier",
+        "how does niva bupa aspire stack up against care supreme",
+        "side by side of these two plans",
+        "elevate vs optima secure",
+    ],
+    "analysis_request": [
+        "give me a detailed analysis of my options",
+        "is this recommendation right for me",
+        "break down the trade offs of a super top up",
+        "evaluate whether I need a higher sum insured",
+        "explain in depth how restoration benefits work across plans",
+        "validate the plan I picked",
+    ],
+    "other": [
+        "hi there",
+        "thank you so much",
+        "who are you",
+        "what can you do",
+        "tell me a joke",
+        "what is the weather today",
+    ],
+}
+
+
+def _features(text: str) -> Dict[int, float]:
+    """Hashed word unigrams/bigrams and character trigrams, L2-normalised."""
+    words = _tokens(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    vector: Dict[int, float] = {}
+    for gram in grams:
+        bucket = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little") % HASH_BUCKETS
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norm for k, v in vector.items()}
+
+
+def _build_centroids() -> Dict[str, Dict[int, float]]:
+    centroids = {}
+    for label, examples in LABELLED_EXAMPLES.items():
+        centroid: Dict[int, float] = {}
+        for example in examples:
+            for k, v in _features(example).items():
+                centroid[k] = centroid.get(k, 0.0) + v
+        norm = math.sqrt(sum(v * v for v in centroid.values())) or 1.0
+        centroids[label] = {k: v / norm for k, v in centroid.items()}
+    return centroids
+
+
+_CENTROIDS = _build_centroids()
+
+
+def _centroid_label(text: str):
+    """Return the nearest label when it clears MIN_CENTROID_SCORE and MIN_CENTROID_MARGIN."""
+    vector = _features(text)
+    scores = sorted(
+        ((sum(weight * centroid.get(k, 0.0) for k, weight in vector.items()), label)
+         for label, centroid in _CENTROIDS.items()),
+        reverse=True,
+    )
+    (best, label), (runner_up, _) = scores[0], scores[1]
+    if best >= MIN_CENTROID_SCORE and best - runner_up >= MIN_CENTROID_MARGIN:
+        return label
+    return None
+
+
+# ------------------------------------------------------------------------------------------------
+# Cascade
+# ------------------------------------------------------------------------------------------------
+
+def classify_intent(query: str, escalate: Callable[[str], str]) -> Tuple[str, str]:
+    """
+    Classify a user query into one of QUERY_TYPES.
+    Returns (query_type, stage) where stage is "rules", "centroid" or "llm"; `escalate` is only
+    called when the local stages are not confident.
+    """
+    label = _rule_label(query)
+    if label is not None:
+        stage = "rules"
+    else:
+        label = _centroid_label(query)
+        stage = "centroid"
+        if label is None:
+            label, stage = escalate(query), "llm"
+
+    logger.info("Classified query as %s (%s)", label, stage)
+    return label, stage
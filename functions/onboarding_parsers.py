@@ -0,0 +1,130 @@
+# ------------------------------------------------------------------------------------------------
+# Onboarding answer parsers
+# ------------------------------------------------------------------------------------------------
+# Onboarding answers have predictable shapes (a name, "self, spouse, daughter", "35, 32, 5", an
+# email or phone number, yes/no, a list of conditions), so they are parsed in-process. Only a
+# reply that looks like a free-form question is sent to the tool-calling LLM to decide whether
+# it should be answered instead of stored. Each parser returns None when the reply does not
+# have the expected shape, and the node then asks again as before.
+# ------------------------------------------------------------------------------------------------
+
+import re
+from typing import List, Optional
+
+_QUESTION_START = re.compile(
+    r"^\s*(what|what's|whats|how|why|which|when|where|who|whom|whose|can|could|should|would|will|"
+    r"do|does|did|is|are|was|were|tell me|explain|compare|suggest|recommend|help|i want to know|"
+    r"i need to know|is there|are there)\b",
+    re.I,
+)
+_QUESTION_WORDS = re.compile(r"\b(policy|policies|plan|plans|insurance|cover|premium|claim|waiting period|recommend)\b", re.I)
+
+_NAME_PREFIX = re.compile(r"^\s*(hi|hello|hey)?[\s,!]*(my name is|my name's|i am|i'm|im|this is|call me|it's|its|name is|name:)\s+", re.I)
+_NAME = re.compile(r"^[A-Za-z][A-Za-z .'-]{0,60}$")
+
+_LIST_SEPARATORS = re.compile(r"\s*(?:,|;|/|&|\+|\band\b|\bwith\b|\bplus\b)\s*", re.I)
+_SELF = re.compile(r"^(me|myself|i|self|just me|only me|just myself|only myself|my ?self)$", re.I)
+_MY = re.compile(r"^(my|our)\s+", re.I)
+
+_AGE_REPLY = re.compile(r"^[\d\s,;/&+.-]*(?:(?:and|years?|yrs?|y/?o|old)[\d\s,;/&+.-]*)*$", re.I)
+
+_COUNTED = re.compile(r"^(\d+|one|two|three|four|five|six)\s+(.+)$", re.I)
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+_SINGULAR = {"kids": "kid", "children": "child", "sons": "son", "daughters": "daughter", "parents": "parent",
+             "brothers": "brother", "sisters": "sister", "grandparents": "grandparent"}
+MAX_COUNTED_MEMBERS = 6
+
+_DECIMAL = re.compile(r"\d\.\d")
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# A contiguous 10-digit number, optionally with a +91 / 0 prefix ("+91 98765 43210" is accepted)
+_PHONE = re.compile(r"(?<![\d+])(?:(?:\+91|91|0)[\s-]?)?(?:\d{10}|\d{5}[\s-]\d{5})(?!\d)")
+_STRICT_PHONE = re.compile(r"(?<![\w+])(?:\+91|0)?\d{10}(?![\w])")
+
+_YES = re.compile(r"^\s*(y|yes|yeah|yep|yup|ya|haan|han|sure|true|correct|indeed|i do|we do|there are|there is)\b", re.I)
+_NO = re.compile(r"^\s*(n|no|nope|nah|none|nothing|nil|false|not really|no one|nobody|i don't|we don't|there are no|there is no)\b", re.I)
+_NONE = re.compile(r"^\s*(none|no|nil|nothing|na|n/a|nope|no conditions?|not applicable)\s*[.!]?\s*$", re.I)
+
+
+def looks_like_question(text: str) -> bool:
+    """True for replies that read like a question to Gaido rather than an answer to ours."""
+    text = (text or "").strip()
+    if not text:
+        return False
+    if "?" in text:
+        return True
+    words = len(text.split())
+    return (bool(_QUESTION_START.match(text)) and words > 3) or (bool(_QUESTION_WORDS.search(text)) and words > 6)
+
+
+def parse_name(text: str) -> Optional[str]:
+    name = _NAME_PREFIX.sub("", (text or "").strip()).strip(" .!,")
+    if not name or not _NAME.match(name) or len(name.split()) > 4:
+        return None
+    return name
+
+
+def parse_family_members(text: str) -> Optional[List[str]]:
+    """'Me, my wife and 2 kids' -> ['self', 'wife', 'kid', 'kid']."""
+    members = []
+    for part in _LIST_SEPARATORS.split((text or "").strip().lower().strip(".!")):
+        part = _MY.sub("", part.strip())
+        if not part:
+            continue
+        if _SELF.match(part):
+            part = "self"
+        count = 1
+        counted = _COUNTED.match(part)
+        if counted:
+            number = counted.group(1)
+            count = int(number) if number.isdigit() else _NUMBER_WORDS[number]
+            part = _SINGULAR.get(counted.group(2), counted.group(2))
+            if not 1 <= count <= MAX_COUNTED_MEMBERS:
+                return None
+        if len(part.split()) > 3 or any(char.isdigit() for char in part):
+            return None
+        members.extend([part] * count)
+    return members or None
+
+
+def parse_ages(text: str) -> Optional[List[int]]:
+    """'35, 32 and 5 years' -> [35, 32, 5]."""
+    text = (text or "").strip()
+    if not text or not _AGE_REPLY.match(text) or _DECIMAL.search(text):
+        return None
+    ages = [int(age) for age in re.findall(r"\d+", text)]
+    return ages or None
+
+
+def parse_contact(text: str, strict: bool = False) -> Optional[str]:
+    """
+    An email address or a 10-digit phone number (optionally +91 / 0 prefixed). With `strict`,
+    for free text that is not a contact answer, the number must be one unbroken token.
+    """
+    text = (text or "").strip()
+    email = _EMAIL.search(text)
+    if email:
+        return email.group(0)
+    phone = (_STRICT_PHONE if strict else _PHONE).search(text)
+    return phone.group(0) if phone else None
+
+
+def parse_yes_no(text: str) -> Optional[bool]:
+    text = (text or "").strip()
+    if _NO.match(text):
+        return False
+    if _YES.match(text):
+        return True
+    return None
+
+
+def parse_conditions(text: str) -> Optional[List[str]]:
+    """'Diabetes, high BP and asthma' -> ['Diabetes', 'high BP', 'asthma']; 'none' -> []."""
+    if _NONE.match(text or ""):
+        return []
+    conditions = []
+    for part in re.split(r"\s*(?:,|;|/|\band\b|\n)\s*", (text or "").strip().strip("."), flags=re.I):
+        part = part.strip()
+        if part:
+            conditions.append(part)
+    return conditions or None
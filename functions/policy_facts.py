@@ -0,0 +1,314 @@
+# ------------------------------------------------------------------------------------------------
+# Policy facts store
+# ------------------------------------------------------------------------------------------------
+# A typed per-policy facts table (waiting periods, room rent, restore, maternity, co-payment,
+# claim settlement, ...) for every RoutePolicy plan. It is built offline from each policy's
+# one-page summary plus its most relevant document chunks:
+#
+#     python -m functions.policy_facts              # new or changed policies only
+#     python -m functions.policy_facts --force      # re-extract everything
+#     python -m functions.policy_facts "CARE SUPREME" ICICI_MaxProtect
+#
+# and saved as JSON in the user cache dir (POLICY_FACTS_PATH, never the package). A copy shipped
+# at functions/policy_facts.json is used while no cache file exists. At runtime the table is
+# loaded once and queried in process, so comparison, recommendation and information nodes read
+# attributes directly and only use the LLM for wording. Policies missing from the table fall
+# back to the old LLM paths, so a missing table is logged loudly, and at startup
+# `ensure_policy_facts()` builds it in the background (GAIDO_POLICY_FACTS_AUTOBUILD=0 disables).
+# ------------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from functions.cache_dir import atomic_write_json, cache_path
+from functions.policy_gazetteer import extract_policy_mentions
+
+logger = logging.getLogger(__name__)
+
+POLICY_FACTS_PATH = os.getenv("GAIDO_POLICY_FACTS", cache_path("policy_facts.json"))
+PACKAGED_POLICY_FACTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy_facts.json")
+AUTOBUILD = os.getenv("GAIDO_POLICY_FACTS_AUTOBUILD", "1").lower() in ("1", "true", "yes")
+EXTRACTION_MAX_CONCURRENCY = 6
+EXCERPTS_PER_POLICY = 8
+# Retrieval query used to pull the chunks that state the comparable attributes
+FACTS_QUERY = (
+    "sum insured premium room rent limit ICU pre-existing disease waiting period initial waiting period "
+    "maternity newborn restore recharge benefit no claim bonus cumulative bonus co-payment deductible "
+    "claim settlement ratio network hospitals exclusions"
+)
+NOT_STATED = "Not stated"
+
+
+class PolicyAttributes(BaseModel):
+    """Comparable attributes of one policy, as stated in its documents."""
+    sum_insured: str = Field(description="Sum insured options or range")
+    premium_level: str = Field(description="How the premium is priced, e.g. 'Economical', 'High'")
+    room_rent: str = Field(description="Room rent limit or 'No limit'")
+    pre_existing_waiting_period: str = Field(description="Waiting period for pre-existing diseases")
+    maternity: str = Field(description="Maternity / newborn cover")
+    restore_benefit: str = Field(description="Restore / recharge / reset of the sum insured")
+    no_claim_bonus: str = Field(description="No-claim or cumulative bonus")
+    co_payment: str = Field(description="Co-payment or deductibles")
+    claim_settlement: str = Field(description="Claim settlement ratio or claims experience")
+    best_suited_for: str = Field(description="Who the policy suits best, in one short phrase")
+    drawbacks: str = Field(description="Main limitations, in one short phrase")
+
+
+class PolicyFacts(PolicyAttributes):
+    """PolicyAttributes plus typed values that can be filtered and scored without an LLM."""
+    insurer: str = Field(description="Insurer name")
+    ped_waiting_months: Optional[int] = Field(None, description="Pre-existing disease waiting period in months")
+    maternity_covered: Optional[bool] = Field(None, description="Whether maternity is covered (base plan or add-on)")
+    maternity_waiting_months: Optional[int] = Field(None, description="Maternity waiting period in months")
+    restore_available: Optional[bool] = Field(None, description="Whether the sum insured is restored after a claim")
+    room_rent_capped: Optional[bool] = Field(None, description="Whether room rent has a cap or sub-limit")
+    co_payment_percent: Optional[float] = Field(None, description="Mandatory co-payment in percent, 0 if none")
+    claim_settlement_ratio: Optional[float] = Field(None, description="Claim settlement ratio in percent")
+    premium_tier: Optional[str] = Field(None, description="One of 'budget', 'mid', 'premium'")
+    min_entry_age: Optional[int] = Field(None, description="Minimum entry age for adults in years")
+    max_entry_age: Optional[int] = Field(None, description="Maximum entry age in years, empty if there is none")
+    family_floater: Optional[bool] = Field(None, description="Whether a family floater option is available")
+
+
+# (attribute, label) in display order
+ATTRIBUTE_LABELS: List[Tuple[str, str]] = [
+    ("sum_insured", "Sum insured"),
+    ("premium_level", "Premium"),
+    ("room_rent", "Room rent"),
+    ("pre_existing_waiting_period", "PED waiting period"),
+    ("maternity", "Maternity"),
+    ("restore_benefit", "Restore benefit"),
+    ("no_claim_bonus", "No-claim bonus"),
+    ("co_payment", "Co-payment"),
+    ("claim_settlement", "Claim settlement"),
+    ("best_suited_for", "Best suited for"),
+    ("drawbacks", "Drawbacks"),
+]
+
+# Question wording -> attribute, for single-fact questions ("does elevate cover maternity?")
+FACT_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("room_rent", re.compile(r"room rent|room category|icu (limit|charges)", re.I)),
+    ("pre_existing_waiting_period", re.compile(r"pre[- ]?existing|\bpeds?\b", re.I)),
+    ("maternity", re.compile(r"maternity|pregnan|deliver(y|ies)|newborn", re.I)),
+    ("restore_benefit", re.compile(r"restor|recharge|reset|reload", re.I)),
+    ("no_claim_bonus", re.compile(r"no[- ]claim bonus|\bncb\b|cumulative bonus", re.I)),
+    ("co_payment", re.compile(r"co[- ]?pay|deductible", re.I)),
+    ("claim_settlement", re.compile(r"claim settlement|settlement ratio|\bcsr\b", re.I)),
+    ("sum_insured", re.compile(r"sum insured|sum assured|cover(age)? amount", re.I)),
+]
+# Questions that need reasoning over the documents, not a single stored value
+_OPEN_QUESTION = re.compile(r"\b(why|how does|explain|compare|difference|versus|vs|better|best|should i)\b", re.I)
+
+
+def _source_hash(summary: str, excerpts: str) -> str:
+    return hashlib.sha1(f"{summary}\n{excerpts}".encode("utf-8")).hexdigest()
+
+
+class PolicyFactsStore:
+    """In-process query API over the extracted policy facts."""
+
+    def __init__(self, path: str = POLICY_FACTS_PATH, fallback_path: Optional[str] = PACKAGED_POLICY_FACTS_PATH):
+        self.path = path
+        self.fallback_path = fallback_path
+        self._facts: Optional[Dict[str, PolicyFacts]] = None
+        self._source_hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, PolicyFacts]:
+        if self._facts is not None:
+            return self._facts
+        with self._lock:
+            if self._facts is not None:
+                return self._facts
+            facts, hashes = {}, {}
+            paths = [p for p in (self.path, self.fallback_path) if p]
+            for path in paths:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        saved = json.load(f)
+                    for name, entry in saved.get("policies", {}).items():
+                        hashes[name] = entry.pop("source_hash", "")
+                        facts[name] = PolicyFacts(**entry)
+                    logger.info("Loaded facts for %d policies from %s", len(facts), path)
+                    break
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError, TypeError) as e:
+                    logger.warning("Could not load policy facts from %s: %s", path, e)
+                    facts, hashes = {}, {}
+            if not facts:
+                logger.warning(
+                    "No policy facts table at %s; fact answers, comparisons and candidate scoring use the "
+                    "slower LLM paths until `python -m functions.policy_facts` has built it", " or ".join(paths)
+                )
+            self._facts, self._source_hashes = facts, hashes
+            return facts
+
+    def save(self, facts: Dict[str, PolicyFacts], source_hashes: Dict[str, str]) -> None:
+        payload = {
+            "policies": {
+                name: {**facts[name].model_dump(), "source_hash": source_hashes.get(name, "")}
+                for name in sorted(facts)
+            }
+        }
+        atomic_write_json(self.path, payload, indent=2, ensure_ascii=False)
+        with self._lock:
+            self._facts, self._source_hashes = dict(facts), dict(source_hashes)
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __contains__(self, policy_name: str) -> bool:
+        return policy_name in self._load()
+
+    def all(self) -> Dict[str, PolicyFacts]:
+        """Every stored policy; the same dict object until the table is rebuilt."""
+        return self._load()
+
+    def get(self, policy_name: str) -> Optional[PolicyFacts]:
+        return self._load().get(policy_name)
+
+    def get_many(self, policy_names: List[str]) -> Dict[str, PolicyFacts]:
+        """{policy_name: facts} for the names that have facts, in the given order."""
+        facts = self._load()
+        return {name: facts[name] for name in policy_names if name in facts}
+
+    def value(self, policy_name: str, attribute: str) -> Optional[str]:
+        """One attribute of one policy, or None when it is unknown."""
+        facts = self.get(policy_name)
+        value = getattr(facts, attribute, None) if facts else None
+        if value is None or (isinstance(value, str) and value.strip().lower() in ("", NOT_STATED.lower())):
+            return None
+        return value
+
+    def where(self, predicate: Callable[[PolicyFacts], bool]) -> List[str]:
+        """Names of the policies whose facts satisfy `predicate`."""
+        return [name for name, facts in self._load().items() if predicate(facts)]
+
+    def answer_fact(self, question: str) -> Optional[str]:
+        """
+        Answer a single-fact question ("what is the room rent limit in care supreme?") straight
+        from the table. Returns None when the question is open-ended, names no known policy,
+        asks about more than one attribute, or the fact is not stated.
+        """
+        if _OPEN_QUESTION.search(question):
+            return None
+        attributes = [attribute for attribute, pattern in FACT_PATTERNS if pattern.search(question)]
+        if len(attributes) != 1:
+            return None
+        policies = extract_policy_mentions(question).policies
+        if not policies:
+            return None
+        attribute = attributes[0]
+        label = dict(ATTRIBUTE_LABELS)[attribute]
+        facts = []
+        for name in policies:
+            value = self.value(name, attribute)
+            if value is None:
+                return None
+            facts.append((name.replace("_", " "), value))
+        return word_fact_answer(question, label, facts)
+
+
+def word_fact_answer(question: str, label: str, facts: List[Tuple[str, object]]) -> str:
+    """
+    Phrase facts looked up in the table as an answer to `question`. The LLM only rewords the
+    given values; if the call fails a fixed template is used instead.
+    """
+    from functions.prereq import llm
+    from functions.prompts import policy_fact_answer_prompt
+
+    facts_block = "\n".join(f"- {name}: {label} = {value}" for name, value in facts)
+    try:
+        return (policy_fact_answer_prompt | llm).invoke({"question": question, "facts": facts_block}).content.strip()
+    except Exception as e:
+        logger.warning("Fact wording failed, using the template: %s", e)
+        return " ".join(f"The {label.lower()} for {name} is {value}." for name, value in facts)
+
+
+policy_facts = PolicyFactsStore()
+
+
+# ------------------------------------------------------------------------------------------------
+# Offline extraction
+# ------------------------------------------------------------------------------------------------
+
+def build_policy_facts(policy_names: Optional[List[str]] = None, force: bool = False) -> Dict[str, PolicyFacts]:
+    """
+    Extract facts for `policy_names` (default: every RoutePolicy plan) and save the table.
+    Policies whose summary and excerpts are unchanged since the last build are skipped.
+    """
+    from functions.prereq import POLICY_NAMES, llm, multi_policy_search
+    from functions.prompts import policy_facts_extraction_prompt
+    from functions.summary_store import summary_store
+
+    names = list(policy_names or POLICY_NAMES)
+    existing = dict(policy_facts._load())
+    source_hashes = dict(policy_facts._source_hashes)
+
+    summaries = summary_store.get(names)
+    chunks = multi_policy_search(FACTS_QUERY, names, k=EXCERPTS_PER_POLICY)
+    inputs, pending = [], []
+    for name in names:
+        summary = summaries.get(name, "")
+        excerpts = "\n\n".join(doc.page_content for doc, _ in chunks.get(name, []))
+        if not summary and not excerpts:
+            logger.warning("No summary or documents for %s; skipping", name)
+            continue
+        digest = _source_hash(summary, excerpts)
+        if not force and name in existing and source_hashes.get(name) == digest:
+            continue
+        inputs.append({"policy_name": name, "summary": summary or NOT_STATED, "excerpts": excerpts or NOT_STATED})
+        pending.append((name, digest))
+
+    logger.info("Extracting facts for %d of %d policies", len(pending), len(names))
+    extractor = policy_facts_extraction_prompt | llm.with_structured_output(PolicyFacts)
+    results = extractor.batch(inputs, config={"max_concurrency": EXTRACTION_MAX_CONCURRENCY}, return_exceptions=True)
+    for (name, digest), result in zip(pending, results):
+        if isinstance(result, Exception) or result is None:
+            logger.warning("Fact extraction failed for %s: %s", name, result)
+            continue
+        existing[name] = result
+        source_hashes[name] = digest
+
+    policy_facts.save(existing, source_hashes)
+    return existing
+
+
+def ensure_policy_facts() -> None:
+    """Build the facts table on a background thread when none is available (see AUTOBUILD)."""
+    def build():
+        if len(policy_facts):
+            return
+        if not AUTOBUILD:
+            return
+        logger.warning("Building the policy facts table at %s in the background", policy_facts.path)
+        try:
+            built = build_policy_facts()
+            logger.info("Built facts for %d policies", len(built))
+        except Exception as e:
+            logger.error("Building the policy facts table failed: %s", e)
+
+    threading.Thread(target=build, name="policy-facts-build", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Build the structured policy facts table.")
+    parser.add_argument("policies", nargs="*", help="Policy names to (re)extract; default is every RoutePolicy plan")
+    parser.add_argument("--force", action="store_true", help="Re-extract even when the sources are unchanged")
+    args = parser.parse_args()
+    built = build_policy_facts(args.policies or None, force=args.force)
+    print(f"{len(built)} policies in {policy_facts.path}")
@@ -0,0 +1,200 @@
+# ------------------------------------------------------------------------------------------------
+# Policy gazetteer
+# ------------------------------------------------------------------------------------------------
+# Finds the exact policies (and insurers) a piece of text mentions. Every RoutePolicy name, its
+# short form without the insurer prefix and the hand-written aliases below are compiled into one
+# Aho-Corasick automaton, so a message is scanned once regardless of how many names there are.
+# Overlapping matches are resolved leftmost-longest ("care supreme senior premium" wins over
+# "care supreme"), and matches must start and end on word boundaries.
+#
+# A policy match is treated by the router as a confident decision, so derived aliases that are
+# ordinary phrases ("network list", "medicare", "my health care") are not generated, and a
+# "care ..." name is not matched inside the phrase "health care ..." / "medical care ...".
+# ------------------------------------------------------------------------------------------------
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Tuple
+
+from functions.prereq import POLICY_NAMES
+
+# Insurer prefixes stripped from catalogue names to derive the short alias
+INSURER_PREFIXES = (
+    "hdfc ergo", "hdfc", "icici", "bajaj", "tata aig", "tata", "nivabupa", "niva bupa", "starhealth",
+    "star health", "care", "adityabirla", "aditya birla", "galaxy",
+)
+# Catalogue spellings of insurers that users type as two words
+SPACED_PREFIXES = {"nivabupa": "niva bupa", "starhealth": "star health", "adityabirla": "aditya birla"}
+# Remainders that are ordinary English (or shared by several catalogue entries) and would match
+# unrelated text; those policies are only found by their full name or a hand-written alias
+GENERIC_SHORT_ALIASES = {
+    "advantage", "freedom", "comprehensive", "senior", "joy", "heart", "assure", "rise", "plus", "supreme",
+    "aspire", "medicare", "network list", "my health care",
+}
+# Leading alias words that are also part of a common phrase: an alias starting with the key is
+# not matched right after one of these words ("health care senior citizen plan" is not Care Senior)
+AMBIGUOUS_LEADING_WORDS: Dict[str, Tuple[str, ...]] = {"care": ("health", "medical")}
+
+# Hand-written aliases for names users rarely type the way the catalogue spells them
+EXTRA_ALIASES: Dict[str, List[str]] = {
+    "HDFC-optima_secure": ["optima secure", "hdfc optima secure"],
+    "HDFC_Optima_Restore": ["optima restore", "hdfc optima restore"],
+    "HDFC_Ergo_Energy_Gold": ["energy gold", "hdfc energy"],
+    "ICICI Elevate": ["elevate", "icici lombard elevate"],
+    "ICICI_MaxProtect": ["max protect", "maxprotect"],
+    "ICICI_Max_Protect_Classic": ["max protect classic"],
+    "ICICI_Health_AdvantEdge": ["health advantedge", "advantedge", "advantage edge"],
+    "ICICI_Supertopup_healthbooster": ["health booster", "healthbooster", "icici super top up"],
+    "NivaBupa_ReAssure": ["reassure", "niva bupa reassure"],
+    "ReAssure 2.0 bronze Plus": ["reassure 2.0", "reassure 2", "reassure bronze"],
+    "NivaBupa_Arogya_Sanjeevani": ["arogya sanjeevani"],
+    "AdityaBirla_activ_one": ["activ one", "activ 1"],
+    "AdityaBirla_Activ_Fit": ["activ fit"],
+    "StarHealthMediClassic": ["medi classic", "mediclassic"],
+    "StarHealth_Comprehensive": ["star comprehensive"],
+    "Star Health_Super Star": ["super star"],
+    "Star_Health_Young Star Gold Plan": ["young star"],
+    "StarHealth_Cardiac-Care": ["cardiac care"],
+    "CARE SUPREME": ["care supreme"],
+    "Galaxy_Promise - Elite": ["galaxy promise"],
+}
+
+# Insurer aliases -> display name
+INSURER_ALIASES: Dict[str, str] = {
+    "hdfc ergo": "HDFC ERGO", "hdfc": "HDFC ERGO",
+    "icici lombard": "ICICI Lombard", "icici": "ICICI Lombard",
+    "bajaj allianz": "Bajaj Allianz", "bajaj": "Bajaj Allianz",
+    "tata aig": "Tata AIG", "tata": "Tata AIG",
+    "niva bupa": "Niva Bupa", "nivabupa": "Niva Bupa",
+    "star health": "Star Health", "starhealth": "Star Health",
+    "care health": "Care Health", "care insurance": "Care Health",
+    "aditya birla": "Aditya Birla", "adityabirla": "Aditya Birla",
+    "galaxy health": "Galaxy Health",
+}
+
+
+def normalize(text: str) -> str:
+    # Keep decimal points ("reassure 2.0") but drop sentence punctuation
+    return " ".join(re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", text.lower().replace("_", " ")))
+
+
+def aliases_for(name: str) -> List[str]:
+    full = normalize(name)
+    aliases = {full}
+    for prefix in INSURER_PREFIXES:
+        if full.startswith(prefix + " "):
+            short = full[len(prefix) + 1:]
+            if short not in GENERIC_SHORT_ALIASES:
+                aliases.add(short)
+            if prefix in SPACED_PREFIXES:
+                aliases.add(f"{SPACED_PREFIXES[prefix]} {short}")
+            break
+    aliases.update(normalize(a) for a in EXTRA_ALIASES.get(name, []))
+    return sorted(aliases)
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher; `finditer` yields (start, end, pattern) for every occurrence."""
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(pattern)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for pattern in self._out[node]:
+                yield i + 1 - len(pattern), i + 1, pattern
+
+
+@dataclass
+class PolicyMentions:
+    policies: List[str] = field(default_factory=list)  # catalogue names, in order of mention
+    insurers: List[str] = field(default_factory=list)  # insurers named on their own
+
+
+class PolicyGazetteer:
+    """Extracts policy and insurer mentions from free text."""
+
+    def __init__(self, policy_names: List[str]):
+        self.aliases = {name: aliases_for(name) for name in policy_names}
+        self._policies_by_alias: Dict[str, List[str]] = {}
+        for name, aliases in self.aliases.items():
+            for alias in aliases:
+                self._policies_by_alias.setdefault(alias, []).append(name)
+        self._automaton = AhoCorasick(list(self._policies_by_alias) + list(INSURER_ALIASES))
+
+    @staticmethod
+    def _in_common_phrase(text: str, start: int, pattern: str) -> bool:
+        preceders = AMBIGUOUS_LEADING_WORDS.get(pattern.split(" ", 1)[0])
+        if not preceders or start == 0:
+            return False
+        previous = text[:start - 1].rsplit(" ", 1)[-1]
+        return previous in preceders
+
+    def _matches(self, text: str) -> List[Tuple[int, int, str]]:
+        """Leftmost-longest, non-overlapping, word-bounded matches."""
+        candidates = [
+            (start, end, pattern) for start, end, pattern in self._automaton.finditer(text)
+            if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " ")
+            and not self._in_common_phrase(text, start, pattern)
+        ]
+        candidates.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        selected, last_end = [], -1
+        for start, end, pattern in candidates:
+            if start >= last_end:
+                selected.append((start, end, pattern))
+                last_end = end
+        return selected
+
+    def extract(self, text: str) -> PolicyMentions:
+        mentions = PolicyMentions()
+        for _, _, pattern in self._matches(normalize(text)):
+            for name in self._policies_by_alias.get(pattern, []):
+                if name not in mentions.policies:
+                    mentions.policies.append(name)
+            if pattern not in self._policies_by_alias:
+                insurer = INSURER_ALIASES[pattern]
+                if insurer not in mentions.insurers:
+                    mentions.insurers.append(insurer)
+        return mentions
+
+
+policy_gazetteer = PolicyGazetteer(POLICY_NAMES)
+
+
+def extract_policy_mentions(text: str) -> PolicyMentions:
+    return policy_gazetteer.extract(text)
@@ -0,0 +1,170 @@
+# ------------------------------------------------------------------------------------------------
+# Policy Router (aliases + embeddings)
+# ------------------------------------------------------------------------------------------------
+# Resolves a question to one or more RoutePolicy names without an LLM call in the common case:
+#
+# 1. Lexical: the policy gazetteer (functions/policy_gazetteer.py) finds policy names and
+#    aliases ("optima secure", "elevate", ...) in the question; any hit decides outright.
+# 2. Embedding: the question is embedded once and compared with precomputed policy vectors.
+#    Policies above MIN_SIMILARITY and within SIMILARITY_MARGIN of the best are returned.
+# 3. LLM: below the threshold the caller's fallback (the structured-output router) is used.
+#
+# Policy vectors are stored in a cache directory (POLICY_INDEX_PATH, outside the installed
+# package so read-only deploys work) and rebuilt only when the catalogue, the aliases or the
+# embedding model change. The file is written to a temporary name and atomically replaced, so
+# workers building it at the same time never read a partial index.
+#
+# The question embedding computed for routing is kept (QUERY_EMBEDDING_CACHE_SIZE questions) and
+# handed to `multi_policy_search`, so a routed RAG question is embedded once.
+# ------------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from functions.cache_dir import atomic_write_json, cache_path
+from functions.prereq import POLICY_NAMES, embeddings
+from functions.policy_gazetteer import policy_gazetteer
+
+logger = logging.getLogger(__name__)
+
+POLICY_INDEX_PATH = os.getenv("GAIDO_POLICY_INDEX", cache_path("policy_router_index.json"))
+MIN_SIMILARITY = 0.72  # cosine similarity needed to trust the embedding match
+SIMILARITY_MARGIN = 0.03  # other policies this close to the best one are returned too
+MAX_POLICIES = 4
+ROUTE_CACHE_SIZE = 512
+QUERY_EMBEDDING_CACHE_SIZE = 256
+
+class PolicyRouter:
+    """Routes questions to catalogue policy names using aliases and a cached embedding index."""
+
+    def __init__(self, policy_names: List[str], index_path: str = POLICY_INDEX_PATH):
+        self.policy_names = list(policy_names)
+        self.index_path = index_path
+        self.aliases = {name: policy_gazetteer.aliases[name] for name in self.policy_names}
+        self._matrix: Optional[np.ndarray] = None
+        self._load_lock = threading.Lock()
+        # question -> (policies, confidence)
+        self._cache: "OrderedDict[str, Tuple[List[str], float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # question -> raw query embedding
+        self._query_vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    # --------------------------------------------------------------------------------------------
+    # Index
+    # --------------------------------------------------------------------------------------------
+
+    def _index_key(self) -> str:
+        model = getattr(embeddings, "model", type(embeddings).__name__)
+        payload = json.dumps({"model": model, "aliases": self.aliases}, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _policy_text(self, name: str) -> str:
+        return f"{name.replace('_', ' ')} health insurance policy. Also known as: {', '.join(self.aliases[name])}"
+
+    def _load_index(self) -> np.ndarray:
+        if self._matrix is not None:
+            return self._matrix
+        with self._load_lock:
+            if self._matrix is not None:
+                return self._matrix
+            key = self._index_key()
+            vectors = None
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                if saved.get("key") == key:
+                    vectors = [saved["vectors"][name] for name in self.policy_names]
+            except (OSError, ValueError, KeyError):
+                vectors = None
+
+            if vectors is None:
+                logger.info("Building policy router index at %s", self.index_path)
+                vectors = embeddings.embed_documents([self._policy_text(n) for n in self.policy_names])
+                self._save_index(key, vectors)
+
+            matrix = np.asarray(vectors, dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            self._matrix = matrix
+            return matrix
+
+    def _save_index(self, key: str, vectors: List[List[float]]) -> None:
+        try:
+            atomic_write_json(self.index_path, {"key": key, "vectors": dict(zip(self.policy_names, vectors))})
+        except OSError as e:
+            logger.warning("Could not write policy router index: %s", e)
+
+    def query_embedding(self, question: str) -> List[float]:
+        """Embedding of `question`, shared between routing and retrieval."""
+        with self._cache_lock:
+            if question in self._query_vectors:
+                self._query_vectors.move_to_end(question)
+                return self._query_vectors[question]
+        vector = embeddings.embed_query(question)
+        with self._cache_lock:
+            self._query_vectors[question] = vector
+            while len(self._query_vectors) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_vectors.popitem(last=False)
+        return vector
+
+    # --------------------------------------------------------------------------------------------
+    # Routing
+    # --------------------------------------------------------------------------------------------
+
+    def lexical_match(self, question: str) -> List[str]:
+        """Policies named in the question (aliases matched longest first)."""
+        return policy_gazetteer.extract(question).policies[:MAX_POLICIES]
+
+    def embedding_match(self, question: str) -> Tuple[List[str], float]:
+        """Policies closest to the question embedding (or [] below MIN_SIMILARITY) and the best score."""
+        matrix = self._load_index()
+        query = np.asarray(self.query_embedding(question), dtype=np.float32)
+        query /= np.linalg.norm(query) + 1e-12
+        scores = matrix @ query
+        best = float(scores.max())
+        if best < MIN_SIMILARITY:
+            return [], best
+        order = np.argsort(-scores)[:MAX_POLICIES]
+        return [self.policy_names[i] for i in order if scores[i] >= best - SIMILARITY_MARGIN], best
+
+    def route(self, question: str, fallback: Callable[[str], List[str]]) -> List[str]:
+        """Return the policies a question refers to, calling `fallback` only when unsure."""
+        with self._cache_lock:
+            if question in self._cache:
+                self._cache.move_to_end(question)
+                return list(self._cache[question][0])
+
+        # Confidence: 1.0 for an alias hit, the cosine similarity for an embedding match and 0.0
+        # when the LLM had to decide
+        policies, confidence = self.lexical_match(question), 1.0
+        stage = "aliases"
+        if not policies:
+            try:
+                (policies, confidence), stage = self.embedding_match(question), "embeddings"
+            except Exception as e:
+                logger.warning("Embedding policy routing failed: %s", e)
+                policies = []
+        if not policies:
+            policies, confidence, stage = fallback(question), 0.0, "llm"
+
+        logger.info("Routed query to %s (%s)", policies, stage)
+        with self._cache_lock:
+            self._cache[question] = (list(policies), confidence)
+            while len(self._cache) > ROUTE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return list(policies)
+
+    def confidence(self, question: str) -> Optional[float]:
+        """Confidence of the cached route for `question`, or None if it has not been routed."""
+        with self._cache_lock:
+            cached = self._cache.get(question)
+        return cached[1] if cached else None
+
+
+embedding_policy_router = PolicyRouter(POLICY_NAMES)
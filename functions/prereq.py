@@ -3,34 +3,58 @@
 from langchain_core.prompts import ChatPromptTemplate
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
+from functions import providers
 # Load environment variables from .env file
 load_dotenv()
 
+# Every client below is registered with functions.providers and built on first use; the
+# module-level names are lazy stand-ins, so importing this module does no client setup.
+
 
 # ------------------------------------------------------------------------------------------------
 # OpenAI LLM
 # ------------------------------------------------------------------------------------------------
 openai_model = "gpt-4o"
 openai_api_key = os.getenv("OPENAI_API_KEY")
-llm_openai = ChatOpenAI(temperature=0.0,api_key=openai_api_key,model=openai_model)
+
+def _build_llm_openai():
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(temperature=0.0,api_key=openai_api_key,model=openai_model)
+
+providers.register("llm_openai", _build_llm_openai)
+llm_openai = providers.lazy("llm_openai")
 
 # ------------------------------------------------------------------------------------------------
 # Gemini LLM
 # ------------------------------------------------------------------------------------------------
 gemini_model = "gemini-2.0-flash"
 gemini_api_key = os.getenv("GOOGLE_API_KEY")
-llm_gemini = ChatGoogleGenerativeAI(model=gemini_model,temperature=0.0, google_api_key=gemini_api_key, max_tokens=None)
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+
+def _build_llm_gemini():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=gemini_model,temperature=0.0, google_api_key=gemini_api_key, max_tokens=None)
+
+def _build_embeddings():
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+
+providers.register("llm_gemini", _build_llm_gemini)
+providers.register("embeddings", _build_embeddings)
+llm_gemini = providers.lazy("llm_gemini")
+embeddings = providers.lazy("embeddings")
 
 # ------------------------------------------------------------------------------------------------
 # Anthropic LLM
 # ------------------------------------------------------------------------------------------------
 anthropic_model = "claude-3-5-sonnet-20240620"
 anthropic_api_key = os.getenv("X_API_KEY")
-llm_anthropic = ChatAnthropic(temperature=0.0,api_key=anthropic_api_key,model=anthropic_model   )
+
+def _build_llm_anthropic():
+    from langchain_anthropic import ChatAnthropic
+    return ChatAnthropic(temperature=0.0,api_key=anthropic_api_key,model=anthropic_model   )
+
+providers.register("llm_anthropic", _build_llm_anthropic)
+llm_anthropic = providers.lazy("llm_anthropic")
 
 # ------------------------------------------------------------------------------------------------
 # Default LLM for all the inner workings of the project
@@ -38,7 +62,13 @@ llm_anthropic = ChatAnthropic(temperature=0.0,api_key=anthropic_api_key,model=an
 llm = llm_gemini
 
 gemini_api_key2 = os.getenv("GOOGLE_API_KEY_1")
-backup_llm = ChatGoogleGenerativeAI(model=gemini_model,temperature=0.0, google_api_key=gemini_api_key2, max_tokens=None)
+
+def _build_backup_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=gemini_model,temperature=0.0, google_api_key=gemini_api_key2, max_tokens=None)
+
+providers.register("backup_llm", _build_backup_llm)
+backup_llm = providers.lazy("backup_llm")
 
 
 from typing import Literal,List
@@ -102,41 +132,160 @@ class RoutePolicy(BaseModel):
     )
 
 
+# Every policy name the router can return, in catalogue order
+from typing import get_args
+POLICY_NAMES: List[str] = list(get_args(get_args(RoutePolicy.model_fields["policy_name"].annotation)[0]))
+
+
 # ------------------------------------------------------------------------------------------------
 # Supabase Vector Store
 # ------------------------------------------------------------------------------------------------
 
-from langchain_community.vectorstores import SupabaseVectorStore
 from langchain_core.documents import Document
-from supabase.client import Client, create_client
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 # print(SUPABASE_URL, SUPABASE_KEY)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("❌ ERROR: Supabase credentials are missing! Check your .env file.")
+def _build_supabase():
+    from supabase.client import create_client
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("❌ ERROR: Supabase credentials are missing! Check your .env file.")
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+def _build_vectorstore():
+    from langchain_community.vectorstores import SupabaseVectorStore
+    return SupabaseVectorStore(
+        embedding=providers.get("embeddings"),
+        client=providers.get("supabase"),
+        table_name="documents",
+        query_name="match_documents",
+    )
+
+providers.register("supabase", _build_supabase)
+providers.register("vectorstore", _build_vectorstore)
+supabase = providers.lazy("supabase")
+vectorstore = providers.lazy("vectorstore")
+
+# ------------------------------------------------------------------------------------------------
+# Multi-policy search
+# ------------------------------------------------------------------------------------------------
+# Searching several policies with `vectorstore.similarity_search(filter={"Policy_Name": ...})`
+# embeds the question and calls `match_documents` once per policy. `multi_policy_search` embeds
+# once and makes a single RPC that returns the top-k chunks of every requested policy.
+# The RPC has to exist in the database; create it with MULTI_POLICY_MATCH_SQL.
+
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MULTI_POLICY_QUERY_NAME = "match_documents_by_policies"
+MULTI_POLICY_MATCH_SQL = """
+create or replace function match_documents_by_policies(
+  query_embedding vector(768),
+  policy_names text[],
+  match_count_per_policy int default 5
+) returns table (content text, metadata jsonb, similarity float)
+language sql stable
+as $$
+  select content, metadata, similarity
+  from (
+    select
+      d.content,
+      d.metadata,
+      1 - (d.embedding <=> query_embedding) as similarity,
+      row_number() over (
+        partition by d.metadata->>'Policy_Name'
+        order by d.embedding <=> query_embedding
+      ) as policy_rank
+    from documents d
+    where d.metadata->>'Policy_Name' = any(policy_names)
+  ) ranked
+  where policy_rank <= match_count_per_policy
+  order by metadata->>'Policy_Name', similarity desc;
+$$;
+"""
+
+# When the function is missing the single-RPC path is skipped for this long before it is tried
+# again (it may be created while the process runs). Other RPC errors only affect the failing call.
+MULTI_POLICY_RPC_RETRY_SECONDS = float(os.getenv("GAIDO_MULTI_POLICY_RPC_RETRY", "600"))
+_multi_policy_rpc_retry_at = 0.0
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-vectorstore = SupabaseVectorStore(
-    embedding=embeddings,
-    client=supabase,
-    table_name="documents",
-    query_name="match_documents",
-)
+def _is_missing_function(error: Exception) -> bool:
+    """PostgREST reports a function that does not exist as PGRST202."""
+    code = getattr(error, "code", None)
+    return code == "PGRST202" or "PGRST202" in str(error) or "Could not find the function" in str(error)
 
-# ------------------------------------------------------------------------------------------------  
+
+def multi_policy_search(question: str, policy_names: List[str], k: int = 5,
+                        query_embedding: Optional[List[float]] = None) -> Dict[str, List[Tuple[Document, float]]]:
+    """
+    Returns {policy_name: [(document, similarity), ...]} with up to `k` chunks per policy,
+    using one embedding call (none when `query_embedding` is given) and one RPC. Policies
+    without matches map to an empty list.
+    """
+    global _multi_policy_rpc_retry_at
+    if query_embedding is None:
+        query_embedding = embeddings.embed_query(question)
+    grouped: Dict[str, List[Tuple[Document, float]]] = {policy: [] for policy in policy_names}
+
+    if time.monotonic() >= _multi_policy_rpc_retry_at:
+        try:
+            res = supabase.rpc(MULTI_POLICY_QUERY_NAME, {
+                "query_embedding": query_embedding,
+                "policy_names": list(policy_names),
+                "match_count_per_policy": k,
+            }).execute()
+            for row in res.data:
+                if not row.get("content"):
+                    continue
+                doc = Document(page_content=row["content"], metadata=row.get("metadata") or {})
+                grouped.setdefault(doc.metadata.get("Policy_Name"), []).append((doc, row.get("similarity", 0.0)))
+            return grouped
+        except Exception as e:
+            if _is_missing_function(e):
+                logger.warning("%s is not installed; using per-policy search for %.0fs",
+                               MULTI_POLICY_QUERY_NAME, MULTI_POLICY_RPC_RETRY_SECONDS)
+                _multi_policy_rpc_retry_at = time.monotonic() + MULTI_POLICY_RPC_RETRY_SECONDS
+            else:
+                logger.warning("%s RPC failed, falling back to per-policy search for this call: %s",
+                               MULTI_POLICY_QUERY_NAME, e)
+
+    # Fallback: one RPC per policy, still reusing the single query embedding
+    for policy in policy_names:
+        grouped[policy] = vectorstore.similarity_search_by_vector_with_relevance_scores(
+            query_embedding, k=k, filter={"Policy_Name": policy}
+        )
+    return grouped
+
+
+# ------------------------------------------------------------------------------------------------
 # Summaries Vector Store
 # ------------------------------------------------------------------------------------------------
 
-summaries_vectorstore = SupabaseVectorStore(
-    embedding=embeddings,
-    client=supabase,
-    table_name="one_page_summaries",
-    query_name="ops_match_documents",
-)
+def _build_summaries_vectorstore():
+    from langchain_community.vectorstores import SupabaseVectorStore
+    return SupabaseVectorStore(
+        embedding=providers.get("embeddings"),
+        client=providers.get("supabase"),
+        table_name="one_page_summaries",
+        query_name="ops_match_documents",
+    )
+
+providers.register("summaries_vectorstore", _build_summaries_vectorstore)
+summaries_vectorstore = providers.lazy("summaries_vectorstore")
+
+
+def fetch_policy_summaries(policy_names: List[str]) -> Dict[str, str]:
+    """
+    Returns {policy_name: one-page summary} for the given catalogue names, looked up by the
+    `Policy_Name` metadata key in the in-memory summary store. Names without a summary are left out.
+    """
+    from functions.summary_store import summary_store
+    return summary_store.get(list(policy_names))
 
 
 # ------------------------------------------------------------------------------------------------
@@ -163,4 +312,6 @@ class QueryResponse(BaseModel):
         )
     )
 
-
+# Shared structured classifier, built on first use like the clients above
+providers.register("query_classifier", lambda: providers.get("llm_gemini").with_structured_output(QueryResponse))
+query_classifier = providers.lazy("query_classifier")
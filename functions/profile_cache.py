@@ -0,0 +1,239 @@
+# ------------------------------------------------------------------------------------------------
+# Profile-signature cache
+# ------------------------------------------------------------------------------------------------
+# The preference questions and the LLM feature recommendation depend only on coarse profile
+# features, so users with equivalent profiles can share one generated result. A profile is
+# reduced to a bucketed signature:
+#   - family composition (self / spouse / child / parent / other, with counts),
+#   - one age band per insured member,
+#   - condition categories (chronic, cardiac, respiratory, thyroid, other, none),
+#   - the exact condition names, normalised, because the generation prompts include them and a
+#     cached answer must never mention another user's conditions,
+# and, for feature recommendations, the preference signals from functions/feature_rules.py.
+#
+# Each ProfileCache is an in-memory LRU (PROFILE_CACHE_SIZE entries) with an optional SQLite tier
+# shared across processes and restarts (GAIDO_PROFILE_CACHE_DB). Bump CACHE_VERSION when a prompt
+# changes so old entries are ignored.
+#
+# Precompute the most common buckets from the sessions in the checkpoint database with:
+#     python -m functions.profile_cache --top 50
+# ------------------------------------------------------------------------------------------------
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Optional
+
+from functions.feature_rules import profile_signals
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = "v2"
+PROFILE_CACHE_SIZE = int(os.getenv("GAIDO_PROFILE_CACHE_SIZE", "256"))
+PROFILE_CACHE_DB = os.getenv("GAIDO_PROFILE_CACHE_DB")  # unset = in-memory only
+
+AGE_BANDS = [(0, 17, "0-17"), (18, 24, "18-24"), (25, 34, "25-34"), (35, 44, "35-44"), (45, 59, "45-59"), (60, 74, "60-74")]
+
+_ROLES = [
+    ("self", re.compile(r"\b(self|me|myself|i)\b", re.I)),
+    ("spouse", re.compile(r"\b(spouse|wife|husband|partner)\b", re.I)),
+    ("child", re.compile(r"\b(kids?|child(ren)?|son|daughter|baby)\b", re.I)),
+    ("parent", re.compile(r"\b(father|mother|parents?|mom|dad|in[- ]laws?)\b", re.I)),
+]
+_CONDITIONS = [
+    ("cardiac", re.compile(r"heart|cardiac|bypass|angioplasty|stent", re.I)),
+    ("chronic", re.compile(r"diabet|sugar|\bbp\b|blood pressure|hypertension|cholesterol", re.I)),
+    ("respiratory", re.compile(r"asthma|copd|bronch", re.I)),
+    ("thyroid", re.compile(r"thyroid", re.I)),
+]
+_NONE = re.compile(r"^\s*(none|no|nil|nothing|na|n/a)?\s*$", re.I)
+
+
+def _flatten(values):
+    flat = []
+    for item in values or []:
+        flat.extend(item if isinstance(item, list) else [item])
+    return flat
+
+
+def _age_band(age: int) -> str:
+    for low, high, label in AGE_BANDS:
+        if low <= age <= high:
+            return label
+    return "75+"
+
+
+def _role(member: str) -> str:
+    return next((role for role, pattern in _ROLES if pattern.search(member)), "other")
+
+
+def _condition_categories(state) -> str:
+    categories = set()
+    for condition in _flatten(state.pre_existing_conditions):
+        if _NONE.match(str(condition)):
+            continue
+        categories.add(next((c for c, pattern in _CONDITIONS if pattern.search(str(condition))), "other"))
+    if not categories and state.has_pre_existing_conditions:
+        categories.add("unspecified")
+    return ",".join(sorted(categories)) or "none"
+
+
+def _condition_names(state) -> str:
+    names = {" ".join(str(c).lower().split()) for c in _flatten(state.pre_existing_conditions)}
+    return ",".join(sorted(name for name in names if not _NONE.match(name))) or "none"
+
+
+def profile_signature(state) -> str:
+    """Bucketed family / age / condition signature of a UserProfile, plus the exact conditions."""
+    roles = Counter(_role(str(m)) for m in _flatten(state.family_members))
+    ages = sorted(_age_band(int(a)) for a in _flatten(state.age) if str(a).isdigit())
+    family = ",".join(f"{role}x{count}" for role, count in sorted(roles.items())) or "unknown"
+    return (f"family={family}|ages={','.join(ages) or 'unknown'}|conditions={_condition_categories(state)}"
+            f"|condition_names={_condition_names(state)}")
+
+
+def feature_signature(state) -> str:
+    """profile_signature plus the preference signals the feature recommendation depends on."""
+    signals = profile_signals(state)
+    flags = sorted(name for name, value in vars(signals).items() if value is True)
+    return f"{profile_signature(state)}|budget={signals.budget or 'unknown'}|signals={','.join(flags)}"
+
+
+class ProfileCache:
+    """LRU cache of JSON-serialisable values keyed by profile signature, with an optional SQLite tier."""
+
+    def __init__(self, namespace: str, max_entries: int = PROFILE_CACHE_SIZE, db_path: Optional[str] = PROFILE_CACHE_DB):
+        self.namespace = f"{namespace}:{CACHE_VERSION}"
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = self.misses = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS profile_cache ("
+                    "namespace TEXT NOT NULL, signature TEXT NOT NULL, value TEXT NOT NULL, "
+                    "PRIMARY KEY (namespace, signature))"
+                )
+                self._db.commit()
+
+    def _remember(self, signature: str, value: Any) -> None:
+        self._memory[signature] = value
+        self._memory.move_to_end(signature)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, signature: str) -> Optional[Any]:
+        with self._lock:
+            if signature in self._memory:
+                self._memory.move_to_end(signature)
+                return self._memory[signature]
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT value FROM profile_cache WHERE namespace = ? AND signature = ?", (self.namespace, signature)
+            ).fetchone()
+            if row is None:
+                return None
+            value = json.loads(row[0])
+            self._remember(signature, value)
+            return value
+
+    def put(self, signature: str, value: Any) -> None:
+        with self._lock:
+            self._remember(signature, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO profile_cache (namespace, signature, value) VALUES (?, ?, ?)",
+                    (self.namespace, signature, json.dumps(value)),
+                )
+                self._db.commit()
+
+    def get_or_compute(self, signature: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(signature)
+        if value is not None:
+            self.hits += 1
+            logger.info("%s cache hit for %s", self.namespace, signature)
+            return value
+        self.misses += 1
+        value = compute()
+        self.put(signature, value)
+        return value
+
+
+preference_questions_cache = ProfileCache("preference_questions")
+feature_recommendation_cache = ProfileCache("feature_recommendation")
+
+
+# ------------------------------------------------------------------------------------------------
+# Warm-up from historical sessions
+# ------------------------------------------------------------------------------------------------
+
+def historical_profiles():
+    """Latest UserProfile of every thread in the checkpoint database."""
+    from my_agent.user_state import UserProfile
+    from my_agent.utils.checkpointer import CHECKPOINT_DB_PATH, DeltaSqliteSaver
+
+    conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+    saver = DeltaSqliteSaver(conn)
+    seen = set()
+    fields = set(UserProfile.model_fields)
+    for saved in saver.list(None):
+        configurable = saved.config["configurable"]
+        thread_id = configurable["thread_id"]
+        if configurable.get("checkpoint_ns") or thread_id in seen:
+            continue
+        seen.add(thread_id)
+        values = {k: v for k, v in saved.checkpoint["channel_values"].items() if k in fields}
+        try:
+            yield UserProfile(**values)
+        except Exception as e:
+            logger.debug("Skipping thread %s: %s", thread_id, e)
+
+
+def warm_up(top: int) -> None:
+    """Precompute preference questions and feature recommendations for the `top` commonest buckets."""
+    from my_agent.preferences import get_preferences_questions
+    from functions.feature_rules import recommend_features
+
+    by_profile, by_features = {}, {}
+    profile_counts, feature_counts = Counter(), Counter()
+    for state in historical_profiles():
+        if not state.family_members or not state.age:
+            continue
+        signature = profile_signature(state)
+        profile_counts[signature] += 1
+        by_profile.setdefault(signature, state)
+        if state.preferences_data:
+            signature = feature_signature(state)
+            feature_counts[signature] += 1
+            by_features.setdefault(signature, state)
+
+    for signature, count in profile_counts.most_common(top):
+        get_preferences_questions(by_profile[signature])
+        print(f"preference questions  {count:5d}  {signature}")
+    for signature, count in feature_counts.most_common(top):
+        state = by_features[signature]
+        recommend_features(state, state.get_summary())
+        print(f"feature recommendation {count:5d}  {signature}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Precompute profile-cache entries for the most common profile buckets.")
+    parser.add_argument("--top", type=int, default=50, help="Number of buckets to precompute per cache")
+    args = parser.parse_args()
+    if not PROFILE_CACHE_DB:
+        parser.error("set GAIDO_PROFILE_CACHE_DB so the warmed entries outlive this process")
+    warm_up(args.top)
@@ -0,0 +1,136 @@
+# ------------------------------------------------------------------------------------------------
+# Prompt registry
+# ------------------------------------------------------------------------------------------------
+# The LangChain hub prompts used by the agents are loaded from JSON snapshots on first use, so
+# neither import nor a request waits on the hub:
+#
+# - functions/prompt_snapshots/ holds the snapshots shipped with the code. Regenerate and commit
+#   them with:  python -m functions.prompt_registry
+# - Snapshots pulled at runtime (a prompt that is not shipped, or a background refresh) are
+#   written to the user cache dir (GAIDO_CACHE_DIR/prompt_snapshots), never into the package,
+#   and take precedence over the shipped ones.
+# - PROMPT_VERSIONS pins each prompt to a hub commit (None = whatever was latest when the
+#   snapshot was taken). A snapshot recorded for a different commit is ignored.
+# - A prompt without any snapshot is pulled from the hub once. Each prompt has its own lock, so
+#   a slow pull only blocks callers of that prompt.
+# - With GAIDO_PROMPT_REFRESH=1, unpinned prompts are re-pulled in the background after they
+#   are loaded; a newer version replaces the snapshot and is used from the next call on.
+# ------------------------------------------------------------------------------------------------
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.load import dumpd, load
+
+from functions.cache_dir import atomic_write_json, cache_path
+
+logger = logging.getLogger(__name__)
+
+PACKAGED_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_snapshots")
+SNAPSHOT_DIR = cache_path("prompt_snapshots")
+BACKGROUND_REFRESH = os.getenv("GAIDO_PROMPT_REFRESH", "").lower() in ("1", "true", "yes")
+
+PROMPT_VERSIONS: Dict[str, Optional[str]] = {
+    "policy_routing_prompt": None,
+    "rag_prompt_template": None,
+    "feature_recommendation_prompt": None,
+    "initial_recommendation_prompt": None,
+    "rag_evaluation_prompt": None,
+    "policy_comparison_template": None,
+    "final_recommendation_prompt": None,
+}
+
+_prompts: Dict[str, Any] = {}
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def _name_lock(name: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def _snapshot_path(name: str, directory: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(directory, f"{name}.json")
+
+
+def _hub_ref(name: str) -> str:
+    version = PROMPT_VERSIONS.get(name)
+    return f"{name}:{version}" if version else name
+
+
+def _read_snapshot(name: str):
+    """The runtime snapshot of `name` if there is a usable one, else the shipped one."""
+    version = PROMPT_VERSIONS.get(name)
+    for directory in (SNAPSHOT_DIR, PACKAGED_SNAPSHOT_DIR):
+        try:
+            with open(_snapshot_path(name, directory), "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if version and snapshot.get("commit") != version:
+            logger.info("Snapshot of %s in %s is for %s, pinned to %s", name, directory, snapshot.get("commit"), version)
+            continue
+        return snapshot
+    return None
+
+
+def _pull_and_snapshot(name: str, directory: str = SNAPSHOT_DIR):
+    from langchain import hub
+
+    prompt = hub.pull(_hub_ref(name))
+    commit = (getattr(prompt, "metadata", None) or {}).get("lc_hub_commit_hash")
+    snapshot = {"name": name, "commit": commit, "pulled_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "prompt": dumpd(prompt)}
+    try:
+        atomic_write_json(_snapshot_path(name, directory), snapshot, indent=2, ensure_ascii=False)
+    except OSError as e:
+        logger.warning("Could not write prompt snapshot for %s: %s", name, e)
+    return prompt, commit
+
+
+def _refresh_in_background(name: str, current_commit: Optional[str]) -> None:
+    def refresh():
+        try:
+            prompt, commit = _pull_and_snapshot(name)
+        except Exception as e:
+            logger.warning("Background refresh of %s failed: %s", name, e)
+            return
+        if commit != current_commit:
+            logger.info("Prompt %s updated to %s", name, commit)
+            _prompts[name] = prompt
+
+    threading.Thread(target=refresh, name=f"prompt-refresh-{name}", daemon=True).start()
+
+
+def get_prompt(name: str):
+    """Return the prompt template `name`, loading it from its snapshot (or the hub) on first use."""
+    prompt = _prompts.get(name)
+    if prompt is not None:
+        return prompt
+
+    with _name_lock(name):
+        if name in _prompts:
+            return _prompts[name]
+        snapshot = _read_snapshot(name)
+        if snapshot is not None:
+            prompt, commit = load(snapshot["prompt"]), snapshot.get("commit")
+            if BACKGROUND_REFRESH and not PROMPT_VERSIONS.get(name):
+                _refresh_in_background(name, commit)
+        else:
+            logger.info("No snapshot for %s, pulling from the hub", name)
+            prompt, commit = _pull_and_snapshot(name)
+        _prompts[name] = prompt
+        return prompt
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    # Writes the shipped snapshots; commit functions/prompt_snapshots/ afterwards
+    for prompt_name in PROMPT_VERSIONS:
+        _, pulled_commit = _pull_and_snapshot(prompt_name, PACKAGED_SNAPSHOT_DIR)
+        print(f"{prompt_name}: {pulled_commit}")
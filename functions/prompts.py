@@ -465,4 +465,98 @@ Use the below policies and their summaries for determining the recommendation
 ----------------------------------------     
 """
 
-# ------------------------------------------------------------------------------------------------
\ No newline at end of file
+# ------------------------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------------------------
+# Policy comparison (map-reduce)
+# ------------------------------------------------------------------------------------------------
+
+policy_attribute_extraction_prompt = ChatPromptTemplate.from_template("""
+You are extracting comparable facts from a health insurance policy summary.
+
+Policy: {policy_name}
+
+Summary:
+{summary}
+
+Fill in every field using only the summary. Keep each value short (a few words or a number with units).
+Write "Not stated" when the summary does not say.
+""")
+
+comparison_merge_prompt = ChatPromptTemplate.from_template("""
+You are GAIDO, a health insurance advisor. The user wants to compare the policies below.
+
+User profile:
+{user_profile}
+
+User request:
+{query}
+
+Policy facts (one block per policy):
+{policy_facts}
+
+Write a short comparison narrative for this user:
+- For each policy, one or two sentences on how it fits (or does not fit) the user's profile.
+- Call out the two or three differences that matter most for this user.
+- End with a clear suggestion of which policy suits them best and why.
+Do not repeat the full fact list; a comparison table is shown to the user separately.
+""")
+
+# ------------------------------------------------------------------------------------------------
+# Policy facts extraction (offline, see functions/policy_facts.py)
+# ------------------------------------------------------------------------------------------------
+
+policy_facts_extraction_prompt = ChatPromptTemplate.from_template("""
+You are building a structured facts table for a health insurance policy.
+
+Policy: {policy_name}
+
+One-page summary:
+{summary}
+
+Excerpts from the policy documents:
+{excerpts}
+
+Fill in every field using only the text above; prefer the policy documents when they disagree with the summary.
+Keep text values short (a few words or a number with units) and write "Not stated" when the text does not say.
+For the typed fields, leave the value empty when it is not stated:
+- waiting periods in months (e.g. 3 years -> 36),
+- co-payment as a percentage (0 when there is no mandatory co-payment),
+- claim settlement ratio as a percentage,
+- premium tier as "budget", "mid" or "premium",
+- entry ages in years (leave the maximum empty when there is no upper limit).
+""")
+
+# Wording for a single-fact answer looked up in the facts table (PolicyFactsStore.answer_fact)
+policy_fact_answer_prompt = ChatPromptTemplate.from_template("""
+Answer the user's question about health insurance using only the facts below.
+
+Question: {question}
+
+Facts from our policy database:
+{facts}
+
+Reply in one or two short, friendly sentences. State every value exactly as given and do not add
+anything that is not in the facts.
+""")
+
+# ------------------------------------------------------------------------------------------------
+# Final recommendation from a scored shortlist (see functions/candidate_scoring.py)
+# ------------------------------------------------------------------------------------------------
+
+shortlist_recommendation_prompt = ChatPromptTemplate.from_template("""
+You are GAIDO, a health insurance advisor. Recommend the most suitable policies for the user.
+
+User profile:
+{user_profile}
+
+Recommended features for this user:
+{feature_recommendation}
+
+Shortlisted policies, best match first, with their key facts:
+{candidates}
+
+Recommend the 3 most suitable policies, choosing only from the shortlist.
+For each one give the policy name, why it fits this user's profile and features, and its main drawback for them.
+Keep the answer concise and easy to scan, and end with which policy you would pick first and why.
+""")
@@ -0,0 +1,93 @@
+# ------------------------------------------------------------------------------------------------
+# Lazy providers
+# ------------------------------------------------------------------------------------------------
+# Clients (LLMs, embeddings, Supabase, caches, agents) are registered as factories and built on
+# first use, then shared for the rest of the process. `lazy(name)` returns a stand-in that can
+# be imported and passed around at module level; the real object is created the first time an
+# attribute is touched. `initialization_report()` lists what was built and how long it took.
+# ------------------------------------------------------------------------------------------------
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_timings: List[Tuple[str, float]] = []
+_lock = threading.RLock()
+
+
+def register(name: str, factory: Callable[[], Any]) -> None:
+    """Register the factory that builds provider `name`."""
+    _factories[name] = factory
+
+
+def get(name: str) -> Any:
+    """Return provider `name`, building it on first use."""
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _instances:
+            started = time.perf_counter()
+            _instances[name] = _factories[name]()
+            elapsed = time.perf_counter() - started
+            _timings.append((name, elapsed))
+            logger.info("Initialized %s in %.0f ms", name, elapsed * 1000)
+        return _instances[name]
+
+
+class LazyProvider:
+    """Stand-in for a registered provider; attribute access builds and forwards to the real object."""
+
+    __slots__ = ("_provider_name",)
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_provider_name", name)
+
+    def _target(self):
+        return get(object.__getattribute__(self, "_provider_name"))
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._target(), attr, value)
+
+    # isinstance() checks (Runnable coercion, BaseChatModel checks) see the real class
+    @property
+    def __class__(self):
+        return type(self._target())
+
+    def __call__(self, *args, **kwargs):
+        return self._target()(*args, **kwargs)
+
+    def __or__(self, other):
+        return self._target() | other
+
+    def __ror__(self, other):
+        return other | self._target()
+
+    def __repr__(self):
+        name = object.__getattribute__(self, "_provider_name")
+        if name in _instances:
+            return repr(_instances[name])
+        return f"<lazy provider {name!r}>"
+
+
+def lazy(name: str) -> LazyProvider:
+    return LazyProvider(name)
+
+
+def initialization_report() -> str:
+    """One line per provider built so far, in build order, plus the ones still pending."""
+    with _lock:
+        lines = [f"{name}: {elapsed * 1000:.0f} ms" for name, elapsed in _timings]
+        pending = [name for name in _factories if name not in _instances]
+    total = sum(elapsed for _, elapsed in _timings) * 1000
+    lines.append(f"total: {total:.0f} ms; not initialized: {', '.join(pending) or 'none'}")
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+# ------------------------------------------------------------------------------------------------
+# RAG sufficiency estimate
+# ------------------------------------------------------------------------------------------------
+# Decides from retrieval signals alone whether the policy documents can answer a question:
+#   - the best Cohere rerank relevance score,
+#   - the best vector similarity from the policy search,
+#   - how many of the question's content words appear in the retrieved chunks.
+# Clearly good retrievals are answered from the documents, clearly poor ones go straight to web
+# search without generating an answer, and only the gray zone in between is checked after
+# generation (answer/context overlap, then the LLM judge as a last resort).
+# ------------------------------------------------------------------------------------------------
+
+import re
+from typing import Iterable, List, Sequence
+
+SUFFICIENT_SCORE = 0.60
+INSUFFICIENT_SCORE = 0.30
+RELEVANCE_WEIGHT = 0.5
+SIMILARITY_WEIGHT = 0.3
+COVERAGE_WEIGHT = 0.2
+MIN_ANSWER_OVERLAP = 0.55  # share of answer content words found in the context
+
+SUFFICIENT = "sufficient"
+INSUFFICIENT = "insufficient"
+UNCERTAIN = "uncertain"
+
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "what", "which", "does", "have", "from", "are",
+    "about", "how", "much", "many", "there", "their", "your", "will", "can", "any", "into", "under",
+    "policy", "plan", "insurance", "health", "tell", "please", "would", "should", "also", "than",
+}
+
+# Generated answers that admit the documents did not contain the information
+_NO_ANSWER = re.compile(
+    r"(does not (mention|contain|provide|specify)|doesn't (mention|contain|provide|specify)|not (mentioned|specified|available|provided) in"
+    r"|no information|i (do not|don't) (know|have)|unable to (find|determine)|cannot (find|determine))",
+    re.IGNORECASE,
+)
+
+
+def content_words(text: str) -> set:
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def _context_words(documents: Iterable) -> set:
+    words = set()
+    for doc in documents:
+        words |= content_words(doc.page_content)
+    return words
+
+
+def retrieval_score(question: str, documents: Sequence, similarities: Sequence[float]) -> float:
+    """Weighted 0-1 score of how well the retrieved chunks match the question."""
+    if not documents:
+        return 0.0
+    relevance = max((doc.metadata.get("relevance_score", 0.0) for doc in documents), default=0.0)
+    similarity = max(similarities, default=0.0)
+    question_words = content_words(question)
+    coverage = len(question_words & _context_words(documents)) / len(question_words) if question_words else 0.0
+    return RELEVANCE_WEIGHT * relevance + SIMILARITY_WEIGHT * similarity + COVERAGE_WEIGHT * coverage
+
+
+def assess_retrieval(score: float) -> str:
+    """Classify a retrieval score as SUFFICIENT, INSUFFICIENT or UNCERTAIN (gray zone)."""
+    if score >= SUFFICIENT_SCORE:
+        return SUFFICIENT
+    if score < INSUFFICIENT_SCORE:
+        return INSUFFICIENT
+    return UNCERTAIN
+
+
+def assess_answer(answer: str, documents: Sequence) -> str:
+    """Gray-zone check on a generated answer: refusals are insufficient, grounded answers sufficient."""
+    if _NO_ANSWER.search(answer):
+        return INSUFFICIENT
+    answer_words = content_words(answer)
+    if not answer_words:
+        return INSUFFICIENT
+    overlap = len(answer_words & _context_words(documents)) / len(answer_words)
+    return SUFFICIENT if overlap >= MIN_ANSWER_OVERLAP else UNCERTAIN
+
+
+def flatten(grouped_documents: List[List]) -> List:
+    return [doc for docs in grouped_documents for doc in docs]
@@ -0,0 +1,150 @@
+# ------------------------------------------------------------------------------------------------
+# One-page summary store
+# ------------------------------------------------------------------------------------------------
+# The `one_page_summaries` table is small (one row per policy), so it is loaded into memory
+# once: contents keyed by `Policy_Name` plus a normalised NumPy embedding matrix. Lookups by
+# name and similarity search then run in-process instead of as Supabase RPCs. The snapshot is
+# refreshed in the background every SUMMARY_REFRESH_SECONDS.
+#
+# The first load is serialised: requests that arrive while `preload()` (or another request) is
+# loading wait for that load instead of starting their own. If it fails, the next lookup retries.
+# ------------------------------------------------------------------------------------------------
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from functions import providers
+from functions.prereq import embeddings
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TABLE = "one_page_summaries"
+SUMMARY_REFRESH_SECONDS = float(os.getenv("GAIDO_SUMMARY_REFRESH_SECONDS", "3600"))
+PAGE_SIZE = 1000
+
+
+def _parse_embedding(value) -> Optional[List[float]]:
+    # pgvector columns come back from PostgREST as a "[0.1,0.2,...]" string
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return [float(v) for v in value]
+
+
+class SummaryStore:
+    """Process-local copy of the one-page summaries with exact-name and similarity lookups."""
+
+    def __init__(self, client, table: str = SUMMARY_TABLE):
+        self.client = client
+        self.table = table
+        self._documents: Dict[str, Document] = {}
+        self._names: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+        self._refreshing = False
+
+    def _fetch(self):
+        rows, start = [], 0
+        while True:
+            res = (
+                self.client.table(self.table)
+                .select("content, metadata, embedding")
+                .range(start, start + PAGE_SIZE - 1)
+                .execute()
+            )
+            rows.extend(res.data)
+            if len(res.data) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    def load(self) -> None:
+        """(Re)load every summary and its embedding from Supabase."""
+        started = time.perf_counter()
+        documents, names, vectors = {}, [], []
+        for row in self._fetch():
+            metadata = row.get("metadata") or {}
+            name = metadata.get("Policy_Name")
+            if not name or not row.get("content"):
+                continue
+            documents[name] = Document(page_content=row["content"], metadata=metadata)
+            vector = _parse_embedding(row.get("embedding"))
+            if vector is not None:
+                names.append(name)
+                vectors.append(vector)
+
+        matrix = None
+        if vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        with self._lock:
+            self._documents, self._names, self._matrix = documents, names, matrix
+            self._loaded_at = time.time()
+        logger.info("Loaded %d policy summaries in %.0f ms", len(documents), (time.perf_counter() - started) * 1000)
+
+    def _ensure_fresh(self) -> None:
+        if not self._loaded_at:
+            with self._first_load_lock:
+                if not self._loaded_at:
+                    self.load()
+            return
+        if time.time() - self._loaded_at < SUMMARY_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self.load()
+            except Exception as e:
+                logger.warning("Summary refresh failed, keeping the previous snapshot: %s", e)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name="summary-refresh", daemon=True).start()
+
+    def get(self, policy_names: List[str]) -> Dict[str, str]:
+        """{policy_name: summary} for the names that have one."""
+        self._ensure_fresh()
+        documents = self._documents
+        return {name: documents[name].page_content for name in policy_names if name in documents}
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        """Brute-force cosine search over the in-memory summary embeddings."""
+        self._ensure_fresh()
+        names, matrix = self._names, self._matrix
+        if matrix is None:
+            return []
+        vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        vector /= np.linalg.norm(vector) + 1e-12
+        order = np.argsort(-(matrix @ vector))[:k]
+        return [self._documents[names[i]] for i in order]
+
+
+providers.register("summary_store", lambda: SummaryStore(providers.get("supabase")))
+summary_store = providers.lazy("summary_store")
+
+
+def preload() -> None:
+    """
+    Build the store and load its snapshot on a background thread, so importing the graph creates
+    no Supabase client and the first comparison does not wait.
+    """
+    def first_load():
+        try:
+            summary_store._ensure_fresh()
+        except Exception as e:
+            logger.warning("Summary preload failed, the first lookup will retry: %s", e)
+
+    threading.Thread(target=first_load, name="summary-preload", daemon=True).start()
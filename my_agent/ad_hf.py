@@ -25,7 +25,9 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 
 from my_agent.user_state import UserProfile
-from my_agent.onb_hf import onboarding_workflow
+from my_agent.onb_hf import onboarding_workflow, onboarding_graph
+from my_agent.utils.checkpointer import get_checkpointer
+from my_agent.utils.subgraph import subgraph_node
 # print('hi')
 from typing import Literal
 
@@ -36,18 +38,17 @@ from langgraph.types import Command
 from my_agent.user_state import UserProfile
 from functions.prereq import llm
 from langgraph.types import interrupt
-from functions.prereq import QueryResponse
-from functions.fx import RAG_tool, web_search_tool
+from functions.prereq import query_classifier
+from functions.fx import answer_policy_question
 from functions.fx import route_policy_query
-from functions.fx import evaluate_rag_response
 
-structured_llm = llm.with_structured_output(QueryResponse)
+structured_llm = query_classifier
 
 
 def policy_info_node(state: UserProfile) -> Command[Literal["onboarding_agent", "policy_info"]]:
     """
     Node that handles policy information requests using RAG and web search.
-    Uses LLM to evaluate RAG responses and fall back to web search when needed.
+    Uses retrieval scores (and the LLM judge only when unsure) to fall back to web search.
     """
     print("\n" + "="*50)
     print("POLICY INFO NODE: Processing policy information request")
@@ -58,28 +59,18 @@ def policy_info_node(state: UserProfile) -> Command[Literal["onboarding_agent",
         query_prompt = interrupt("What would you like to know about insurance policies?")
         return Command(
             goto="policy_info",
-            update={
-                **state.model_dump(),  # Include all existing state
-                "user_query": query_prompt,
-                "interaction_count": state.interaction_count + 1,
-                "user_intent_query": None,
-            }
+            update=state.delta(
+                user_query=query_prompt,
+                interaction_count=state.interaction_count + 1,
+                user_intent_query=None,
+            )
         )
 
     # Route the query to the appropriate policy
     policy_name = route_policy_query(state.user_query)
     
-    # First try RAG to get information from our database
-    rag_answer = RAG_tool.invoke(state.user_query)
-    
-    # Evaluate if RAG response is sufficient
-    if evaluate_rag_response(state.user_query, rag_answer):
-        answer = rag_answer
-        source = "our database"
-    else:
-        # If RAG response is insufficient, use web search
-        answer = web_search_tool.invoke(state.user_query)
-        source = "web search"
+    # RAG from our database, falling back to web search when the retrieval is insufficient
+    answer, source = answer_policy_question(state.user_query, state.interaction_count)
     
     # Present the information to the user
     user_response = interrupt(f"""
@@ -100,62 +91,44 @@ def policy_info_node(state: UserProfile) -> Command[Literal["onboarding_agent",
         # Ask another question about the same policy
         return Command(
             goto="policy_info",
-            update={
-                **state.model_dump(),
-                "user_query": None,  # Reset to get new query
-                "interaction_count": state.interaction_count + 1
-            }
+            update=state.delta(
+                user_query=None,  # Reset to get new query
+                interaction_count=state.interaction_count + 1
+            )
         )
     elif user_response.strip() == "2":
         # Get information about a different policy
         return Command(
             goto="policy_info",
-            update={
-                **state.model_dump(),
-                "user_query": None,  # Reset to get new query
-                "interaction_count": state.interaction_count + 1
-            }
+            update=state.delta(
+                user_query=None,  # Reset to get new query
+                interaction_count=state.interaction_count + 1
+            )
         )
     else:
         # Return to main menu
         return Command(
             goto="onboarding_agent",
-            update={
-                **state.model_dump(),
-                "user_query": None,  # Reset query
-                "interaction_count": state.interaction_count + 1
-            }
+            update=state.delta(
+                user_query=None,  # Reset query
+                interaction_count=state.interaction_count + 1
+            )
         ) 
     
 
 
 
-def onboarding_agent_node(state: UserProfile)->Command[Literal["__end__", "policy_info"]]:
-    """Wrapper for onboarding agent workflow"""
-    onboarding_graph = onboarding_workflow.compile()
-    # Run the onboarding workflow
-    updated_state = onboarding_graph.invoke(state.model_dump())
-    
-    # Create a new state that includes all existing state plus updates
-    return Command(
-        goto=END,
-        update={
-            **state.model_dump(),  # Include all existing state
-            **updated_state,  # Include all updates from onboarding
-            "onboarding_complete": True,
-            "current_workflow": "onboarding"
-        }
-    )
-
 # Create the workflow graph
 multi_agent_graph = StateGraph(UserProfile)
 
 
-multi_agent_graph.add_node("onboarding_agent", onboarding_agent_node)
+# The onboarding graph runs inside `subgraph_node`, which passes on only what it changed
+multi_agent_graph.add_node("onboarding_agent", subgraph_node(onboarding_graph))
 multi_agent_graph.add_node("policy_info", policy_info_node)
+multi_agent_graph.add_edge("onboarding_agent", END)
 
 # Set the entry point - always start with the supervisor
 multi_agent_graph.set_entry_point("onboarding_agent")
 
 # Compile the graph with state persistence
-graph_hf = multi_agent_graph.compile()
\ No newline at end of file
+graph_hf = multi_agent_graph.compile(checkpointer=get_checkpointer())
\ No newline at end of file
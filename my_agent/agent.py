@@ -64,62 +64,53 @@ from langgraph.checkpoint.memory import MemorySaver
 
 from my_agent.user_state import UserProfile
 from my_agent.supervisor_node import supervisor_node
-from my_agent.onboarding_agent import onboarding_workflow
+from my_agent.onboarding_agent import onboarding_workflow, onboarding_graph
 # print('hi')
-from my_agent.recommendation_agent import recommendation_workflow
+from my_agent.recommendation_agent import recommendation_workflow, recommendation_graph
 from typing import Literal
 from my_agent.policy_info_node import policy_info_node
 from my_agent.policy_comparison_node import policy_comparison_node
+from my_agent.utils.checkpointer import get_checkpointer
+from my_agent.utils.subgraph import subgraph_node
 
 MAX_ITERATIONS = 50  # Set a reasonable maximum number of iterations
 TIMEOUT_SECONDS = 300
 
-def onboarding_agent_node(state: UserProfile)->Command[Literal["recommendation_agent"]]:
-    """Wrapper for onboarding agent workflow"""
-    onboarding_graph = onboarding_workflow.compile()
-    # Run the onboarding workflow
-    updated_state = onboarding_graph.invoke(state.model_dump())
-    
-    # Create a new state that includes all existing state plus updates
-    return Command(
-        goto="recommendation_agent",
-        update={
-            **state.model_dump(),  # Include all existing state
-            **updated_state,  # Include all updates from onboarding
-            "onboarding_complete": True,
-            "current_workflow": "onboarding"
-        }
-    )
-
-def recommendation_agent_node(state: UserProfile)->Command[Literal["ask_gaido"]]:
-    """Wrapper for recommendation agent workflow"""
-    recommendation_graph = recommendation_workflow.compile()
-    # Run the recommendation workflow
-    updated_state = recommendation_graph.invoke(state.model_dump())
-    
-    # Create a new state that includes all existing state plus updates
-    return Command(
-        goto="ask_gaido",
-        update={
-            **state.model_dump(),  # Include all existing state
-            **updated_state,  # Include all updates from recommendation
-            "recommendation_complete": True,
-            "current_workflow": "recommendation"
-        }
-    )
-
 # Create the workflow graph
 multi_agent_graph = StateGraph(UserProfile)  # Pass the class, not an instance
 
 # Add all our nodes: supervisor, onboarding_agent, recommendation_agent
+# The onboarding and recommendation agents are compiled once at import and run inside
+# `subgraph_node`, which hands the parent only the fields and messages they changed. Their
+# interrupts and checkpoints still propagate to the parent.
 multi_agent_graph.add_node("ask_gaido", supervisor_node)
-multi_agent_graph.add_node("onboarding_agent", onboarding_agent_node)
-multi_agent_graph.add_node("recommendation_agent", recommendation_agent_node)
+multi_agent_graph.add_node("onboarding_agent", subgraph_node(onboarding_graph))
+multi_agent_graph.add_node("recommendation_agent", subgraph_node(recommendation_graph))
 multi_agent_graph.add_node("policy_info", policy_info_node)
 multi_agent_graph.add_node("policy_comparison", policy_comparison_node)
 
+# Onboarding hands over to recommendation, which returns control to the supervisor
+multi_agent_graph.add_edge("onboarding_agent", "recommendation_agent")
+multi_agent_graph.add_edge("recommendation_agent", "ask_gaido")
+
 # Set the entry point - always start with the supervisor
 multi_agent_graph.set_entry_point("ask_gaido")
 
 # Compile the graph with state persistence
-graph = multi_agent_graph.compile()
\ No newline at end of file
+graph = multi_agent_graph.compile(checkpointer=get_checkpointer())
+
+# Standalone entry points for the onboarding and recommendation agents (see langgraph.json).
+# These are separate compilations: the subgraph instances mounted above must not carry their
+# own checkpointer, they inherit the parent's.
+onboarding_agent_graph = onboarding_workflow.compile(checkpointer=get_checkpointer())
+recommendation_agent_graph = recommendation_workflow.compile(checkpointer=get_checkpointer())
+# Load the one-page policy summaries in the background so comparisons never wait on Supabase
+from functions import summary_store
+summary_store.preload()
+# Facts table for fact answers, comparisons and scoring; built in the background if missing
+from functions.policy_facts import ensure_policy_facts
+ensure_policy_facts()
+
+# Report which clients were built while the graphs were assembled (the rest are built on first use)
+from functions import providers
+logging.info("=== Client initialization ===\n%s", providers.initialization_report())
@@ -115,10 +115,9 @@ def fallback_node(
         # Return to the node where the error occurred
         return Command(
             goto=state.current_workflow,  # Return to the current workflow node
-            update={
-                **state.model_dump(),
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                interaction_count=state.interaction_count + 1,
+            )
         )
     
     # Initialize response and actions
@@ -215,9 +214,8 @@ Let's try again - could you please rephrase your question or try a different app
     # Return to the node where the error occurred
     return Command(
         goto=state.current_workflow,  # Return to the current workflow node
-        update={
-            **state.model_dump(),
-            "user_intent_query": response,
-            "interaction_count": state.interaction_count + 1,
-        }
+        update=state.delta(
+            user_intent_query=response,
+            interaction_count=state.interaction_count + 1,
+        )
     )
@@ -16,6 +16,15 @@ from langgraph.types import Command
 from my_agent.user_state import UserProfile
 
 
+def _as_chat_entry(tool_message: Dict[str, Any]) -> str:
+    """
+    Render a tool message as a chat history entry.
+    UserProfile.messages is an append-only list of strings, so handoffs add one line to it
+    instead of re-sending the whole history.
+    """
+    return f"{tool_message['role']}: {tool_message['content']}"
+
+
 def make_handoff_tool(*, agent_name: str):
     """
     Create a handoff tool that allows one agent to transfer control to another.
@@ -55,25 +64,17 @@ def make_handoff_tool(*, agent_name: str):
             "tool_call_id": tool_call_id,
         }
         
-        # Convert state to UserProfile model dump if needed
-        state_data = state.model_dump() if hasattr(state, "model_dump") else state
-        
-        # Combine with additional context if provided
-        update_data = {**state_data}
-        if context:
-            update_data.update(context)
+        # Only the additional context changes; the rest of the state is untouched
+        update_data = dict(context) if context else {}
         
-        # Add the handoff message to the state's messages
-        if "messages" in update_data:
-            update_data["messages"] = update_data["messages"] + [tool_message]
-        else:
-            update_data["messages"] = [tool_message]
+        # Append the handoff message to the state's messages
+        update_data["messages"] = [_as_chat_entry(tool_message)]
         
         return Command(
             # Navigate to target agent node in the PARENT graph
             goto=agent_name,
             graph=Command.PARENT,
-            # Pass full state with updated context
+            # Pass only the changed fields
             update=update_data
         )
 
@@ -239,14 +240,11 @@ def create_intent_handoff_tool(intent_type: str):
         if extracted_entities:
             context["extracted_entities"] = extracted_entities
         
-        # Combine with state data
-        update_data = {**state_data, **context}
+        # Only the intent context changes
+        update_data = {**context}
         
-        # Add the handoff message to messages
-        if "messages" in update_data:
-            update_data["messages"] = update_data["messages"] + [tool_message]
-        else:
-            update_data["messages"] = [tool_message]
+        # Append the handoff message to messages
+        update_data["messages"] = [_as_chat_entry(tool_message)]
         
         return Command(
             goto=target_agent,
@@ -308,10 +306,8 @@ def save_context_and_handoff(
     # Convert state to UserProfile model dump if needed
     state_data = state.model_dump() if hasattr(state, "model_dump") else state
     
-    # Combine with context to save
-    update_data = {**state_data}
-    for key, value in context_to_save.items():
-        update_data[key] = value
+    # Start from the context to save; the rest of the state is untouched
+    update_data = dict(context_to_save)
     
     # Add transfer metadata
     update_data["previous_agent"] = state_data.get("current_workflow", "unknown")
@@ -319,11 +315,8 @@ def save_context_and_handoff(
     update_data["current_workflow"] = target_agent
     update_data["interaction_count"] = state_data.get("interaction_count", 0) + 1
     
-    # Add the handoff message to messages
-    if "messages" in update_data:
-        update_data["messages"] = update_data["messages"] + [tool_message]
-    else:
-        update_data["messages"] = [tool_message]
+    # Append the handoff message to messages
+    update_data["messages"] = [_as_chat_entry(tool_message)]
     
     return Command(
         goto=target_agent,
@@ -363,21 +356,16 @@ def resume_previous_agent(
         "tool_call_id": tool_call_id,
     }
     
-    # Combine with additional context if provided
-    update_data = {**state_data}
-    if additional_context:
-        update_data.update(additional_context)
+    # Start from the additional context; the rest of the state is untouched
+    update_data = dict(additional_context) if additional_context else {}
     
     # Update workflow metadata
     update_data["current_workflow"] = previous_agent
     update_data["previous_agent"] = state_data.get("current_workflow", "unknown")
     update_data["interaction_count"] = state_data.get("interaction_count", 0) + 1
     
-    # Add the handoff message to messages
-    if "messages" in update_data:
-        update_data["messages"] = update_data["messages"] + [tool_message]
-    else:
-        update_data["messages"] = [tool_message]
+    # Append the handoff message to messages
+    update_data["messages"] = [_as_chat_entry(tool_message)]
     
     return Command(
         goto=previous_agent,
@@ -17,6 +17,7 @@ api_key = os.getenv("GOOGLE_API_KEY")
 # os.environ['LANGCHAIN_PROJECT'] = 'GAIDO-EXP'
 
 from functions.prereq import llm, embeddings
+from functions import providers
 # from functions.prereq import vectorstore
 # from functions.fx import RAG_tool
 from typing import Literal
@@ -43,7 +44,8 @@ def transfer_to_policy_info_agent():
     # as a way for LLM to signal that it needs to hand off to another agent
     # (See the paragraph above)
     return
-llm_with_tools = llm.bind_tools([transfer_to_policy_info_agent])
+providers.register("onboarding_handoff_llm", lambda: providers.get("llm_gemini").bind_tools([transfer_to_policy_info_agent]))
+llm_with_tools = providers.lazy("onboarding_handoff_llm")
 
 def intent_detection(query):
     """
@@ -126,7 +128,6 @@ def greeting_node(state: UserProfile) -> Command[Literal["personal_info"]]:
 
     
     print(response.content)
-    state.messages.append(response.content)
     return Command(
         goto="personal_info",
         update={
@@ -177,10 +178,9 @@ def personal_info_node(state: UserProfile) -> Command[Literal["personal_info","o
                     "tool_call_id": tool_call_id,
                 }
                 return Command(
-                    goto="policy_info", update={
-                        **state.model_dump(),
-                        "user_query": name,
-                    },
+                    goto="policy_info", update=state.delta(
+                        user_query=name,
+                    ),
                     graph=Command.PARENT
                 )
 
@@ -237,10 +237,9 @@ def personal_info_node(state: UserProfile) -> Command[Literal["personal_info","o
                     "tool_call_id": tool_call_id,
                 }
                 return Command(
-                    goto="policy_info", update={
-                        **state.model_dump(),
-                        "user_query": family_input,
-                    },
+                    goto="policy_info", update=state.delta(
+                        user_query=family_input,
+                    ),
                     graph=Command.PARENT
                 )
             
@@ -292,10 +291,9 @@ def personal_info_node(state: UserProfile) -> Command[Literal["personal_info","o
                     "tool_call_id": tool_call_id,
                 }
                 return Command(
-                    goto="policy_info", update={
-                        **state.model_dump(),
-                        "user_query": age_input,
-                    },
+                    goto="policy_info", update=state.delta(
+                        user_query=age_input,
+                    ),
                     graph=Command.PARENT
                 )
             
@@ -392,40 +390,38 @@ def onboarding_confirmation_node(state: UserProfile) -> Command[Literal["persona
     res = llm_with_tools.invoke(confirmation)
     if len(res.tool_calls) > 0:
         return Command(
-            goto="policy_info", update={
-                **state.model_dump(),
-                "user_query": confirmation,
-            },
+            goto="policy_info", update=state.delta(
+                user_query=confirmation,
+            ),
             graph=Command.PARENT
         )
     if confirmation.lower().strip() == 'yes':
         # If confirmed, end the process
         return Command(
             goto=END,
-            update={
-                **state.model_dump(),
-                "onboarding_confirmation_done": True,
-                "onboarding_complete": True,
-                "profiling_stage": "complete",
-                "interaction_count": state.interaction_count + 1,
-                "messages": [summary.content, "Thank you for confirming your information!"]
-            }
+            update=state.delta(
+                onboarding_confirmation_done=True,
+                onboarding_complete=True,
+                current_workflow="onboarding",
+                profiling_stage="complete",
+                interaction_count=state.interaction_count + 1,
+                messages=[summary.content, "Thank you for confirming your information!"]
+            )
         )
     else:
         # If not confirmed, reset relevant flags and restart from profile collection
         return Command(
             goto="personal_info",
-            update={
-                **state.model_dump(),
-                "personal_info_collected": False,
-                "health_info_collected": False,
-                "onboarding_confirmation_done": False,
-                "has_pre_existing_conditions": None,
-                "pre_existing_conditions": [],
-                "profiling_stage": "restart",
-                "interaction_count": state.interaction_count + 1,
-                "messages": ["Let's collect your information again to ensure everything is accurate."]
-            }
+            update=state.delta(
+                personal_info_collected=False,
+                health_info_collected=False,
+                onboarding_confirmation_done=False,
+                has_pre_existing_conditions=None,
+                pre_existing_conditions=[],
+                profiling_stage="restart",
+                interaction_count=state.interaction_count + 1,
+                messages=["Let's collect your information again to ensure everything is accurate."]
+            )
         )
     
 
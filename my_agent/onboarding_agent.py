@@ -7,6 +7,7 @@ sys.path.append(os.path.abspath(os.path.join(os.getcwd(), ".")))
 import os
 from dotenv import load_dotenv
 import random
+import logging
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,8 +28,20 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 
 from my_agent.user_state import UserProfile
+from my_agent.utils.step_memo import memo_step, resumable_node
 
 from functions.fx import answer_question, llm_with_tools
+from my_agent.profile_update import extract_onboarding_details
+from functions.onboarding_parsers import (
+    looks_like_question, parse_name, parse_family_members, parse_ages, parse_contact, parse_yes_no, parse_conditions,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def is_question(reply: str) -> bool:
+    """Only replies that read like a question are sent to the tool-calling LLM to confirm."""
+    return looks_like_question(reply) and len(llm_with_tools.invoke(reply).tool_calls) > 0
 
 
 engaging_tips = [
@@ -99,7 +112,6 @@ def greeting_node(state: UserProfile) -> Command[Literal["personal_info"]]:
 
     
     print(response.content)
-    state.messages.append(response.content)
     return Command(
         goto="personal_info",
         update={
@@ -110,6 +122,39 @@ def greeting_node(state: UserProfile) -> Command[Literal["personal_info"]]:
         }
     )
 
+def profile_fields_from_description(description: str, state: UserProfile) -> dict:
+    """UserProfile fields stated in a free-text description; unusable values are left out."""
+    try:
+        details = extract_onboarding_details(description)
+    except Exception as e:
+        logger.warning("Profile extraction failed: %s", e)
+        return {}
+
+    fields = {}
+    name = parse_name(details.name) if details.name and not state.name else None
+    if name:
+        fields["name"] = name
+    members = parse_family_members(", ".join(details.family_members or [])) or []
+    if members:
+        fields["family_members"] = members
+        # Ages only count when there is one per member
+        if details.age and len(details.age) == len(members) and all(0 <= a <= 120 for a in details.age):
+            fields["age"] = list(details.age)
+    # The description itself is only searched for an email or an unbroken phone number, so a run
+    # of ages ("34 31 66 60 10") is never taken for one
+    contact = parse_contact(details.contact_info or "") or parse_contact(description, strict=True)
+    if contact:
+        fields["contact_info"] = contact
+    if details.pre_existing_conditions:
+        fields["has_pre_existing_conditions"] = True
+        fields["pre_existing_conditions"] = list(details.pre_existing_conditions)
+    elif details.has_pre_existing_conditions is not None:
+        fields["has_pre_existing_conditions"] = details.has_pre_existing_conditions
+
+    logger.debug("Extracted fields %s from the description", sorted(fields))
+    return fields
+
+
 def personal_info_node(state: UserProfile) -> Command[Literal["health_info","personal_info"]]:
     """Collect all personal information before proceeding."""
     print(f"state: {state.model_dump()}")
@@ -131,6 +176,30 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
             }
         )
     
+    # First ask for a free-text description and fill as many fields as possible in one call;
+    # the questions below then only ask for what is still missing
+    if not state.profile_extraction_done and not state.family_members and not state.age:
+        description_query = """Before we take care of your health insurance, let's get to know you! 👋
+
+        Tell us in one message who you'd like to insure, their ages and any health conditions.
+        You can add your name and email or phone number too.
+
+        For example: "I'm Asha, me 34, wife 31, dad 66 with diabetes, asha@example.com"
+        """
+        description_query = state.agent_query + "\n" + description_query if state.agent_query else description_query
+        description = interrupt(description_query)
+        if is_question(description):
+            return answer_question(description, state, "personal_info")
+        return Command(
+            goto="personal_info",
+            update=state.delta(
+                profile_extraction_done=True,
+                profiling_stage="profile_description",
+                interaction_count=state.interaction_count + 1,
+                **profile_fields_from_description(description, state),
+            )
+        )
+
     # Otherwise, collect missing information one at a time with validators
     if not state.name:
         # Name validation
@@ -141,8 +210,7 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
             What should we call you?"""
             name_query = state.agent_query +"\n"+ name_query if state.agent_query else name_query
             name = interrupt(name_query)
-            response = llm_with_tools.invoke(name)
-            if len(response.tool_calls) > 0:
+            if is_question(name):
                 return answer_question(name, state, "personal_info")
             # Validate name (non-empty, contains only letters and spaces)
             if not name or name.isspace():
@@ -153,11 +221,11 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
                 validation_msg = interrupt("Name should not contain numbers. Please provide a valid name:")
                 continue
                 
-            # Valid name - proceed
+            # Valid name - proceed ("My name is Asha" -> "Asha")
             return Command(
                 goto="personal_info",  # Loop back to same node
                 update={
-                    "name": name,
+                    "name": parse_name(name) or name.strip(),
                     "profiling_stage": "name",
                     "interaction_count": state.interaction_count + 1
                 }
@@ -187,8 +255,7 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
             Please list all family members you'd like to insure:
             """
             family_input = interrupt(family_query)
-            response = llm_with_tools.invoke(family_input)
-            if len(response.tool_calls) > 0:
+            if is_question(family_input):
                 return answer_question(family_input, state, "personal_info")
             
             # Basic validation - non-empty response
@@ -197,8 +264,7 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
                 continue
                 
             # Convert response to list and clean up
-            family_members = [member.strip() for member in family_input.lower().replace('and', ',').split(',')]
-            family_members = [m for m in family_members if m and not m.isspace()]
+            family_members = parse_family_members(family_input)
             
             if not family_members:
                 validation_msg = interrupt("Could not understand who you want to insure. Please try again:")
@@ -228,13 +294,14 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
             Please enter the ages now:
             """
             age_input = interrupt(age_query)
-            response = llm_with_tools.invoke(age_input)
-            if len(response.tool_calls) > 0:
+            if is_question(age_input):
                 return answer_question(age_input, state, "personal_info")
             
             # Parse the ages into a list
             try:
-                ages = [int(age.strip()) for age in age_input.split(',')]
+                ages = parse_ages(age_input)
+                if ages is None:
+                    raise ValueError(age_input)
                 
                 # Validate each age
                 if len(ages) != len(state.family_members):
@@ -268,8 +335,7 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
         
         This helps us keep you updated about your insurance journey."""
         contact_info = interrupt(contact_info_query)
-        response = llm_with_tools.invoke(contact_info)
-        if len(response.tool_calls) > 0:
+        if is_question(contact_info):
             return answer_question(contact_info, state, "personal_info")
 
         # Validate contact info (must contain @ for email or be a valid phone format)
@@ -277,14 +343,9 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
             validation_msg = interrupt("Contact information cannot be empty. Please provide your email or phone number:")
             continue
             
-        # Simple email validation - contains @ and .
-        is_email = '@' in contact_info and '.' in contact_info
-        
-        # Simple phone validation - contains enough digits
-        digits_count = sum(1 for char in contact_info if char.isdigit())
-        is_phone = digits_count >= 10
-        
-        if not (is_email or is_phone):
+        # Email address, or a phone number with at least 10 digits
+        parsed_contact = parse_contact(contact_info)
+        if parsed_contact is None:
             validation_msg = interrupt("Please provide a valid email address or phone number:")
             continue
             
@@ -295,7 +356,7 @@ def personal_info_node(state: UserProfile) -> Command[Literal["health_info","per
         return Command(
             goto="health_info",  # Loop back to same node
             update={
-                "contact_info": contact_info,
+                "contact_info": parsed_contact,
                 "personal_info_collected": True,
                 "profiling_stage": "contact",
                 "interaction_count": state.interaction_count + 1
@@ -339,13 +400,14 @@ def health_info_node(state: UserProfile) -> Command[Literal["onboarding_confirma
 
         has_conditions = interrupt(pre_existing_query)
         
-        # Check for tool calls
-        response = llm_with_tools.invoke(has_conditions)
-        if len(response.tool_calls) > 0:
+        # Only question-like replies are checked for tool calls
+        if is_question(has_conditions):
             return answer_question(has_conditions, state, "health_info")
             
         # Update state based on yes/no response
-        has_pre_existing = has_conditions.lower().startswith('y')
+        has_pre_existing = parse_yes_no(has_conditions)
+        if has_pre_existing is None:
+            has_pre_existing = has_conditions.lower().startswith('y')
         
         if not has_pre_existing:
             # If no pre-existing conditions, mark as complete
@@ -384,21 +446,18 @@ def health_info_node(state: UserProfile) -> Command[Literal["onboarding_confirma
         """
         conditions = interrupt(conditions_query)
         
-        # Check for tool calls
-        response = llm_with_tools.invoke(conditions)
-        if len(response.tool_calls) > 0:
+        # Only question-like replies are checked for tool calls
+        if is_question(conditions):
             return answer_question(conditions, state, "health_info")
             
-        # Parse conditions into a list, handling empty input
-        if conditions and not conditions.isspace():
-            condition_list = [c.strip() for c in conditions.split(',') if c.strip()]
-        else:
-            condition_list = []
+        # Parse conditions into a list, handling empty input ("none" means no conditions after all)
+        condition_list = parse_conditions(conditions) or []
         
         return Command(
             goto="onboarding_confirmation",
             update={
                 "pre_existing_conditions": condition_list,
+                "has_pre_existing_conditions": bool(condition_list),
                 "health_info_collected": True,
                 "profiling_stage": "health_complete",
                 "interaction_count": state.interaction_count + 1
@@ -417,10 +476,11 @@ def health_info_node(state: UserProfile) -> Command[Literal["onboarding_confirma
 
 from langgraph.graph import StateGraph, START, END
 
+@resumable_node
 def onboarding_confirmation_node(state: UserProfile) -> Command[Literal["personal_info","__end__"]]:
     """Confirm collected information and allow corrections."""
 
-    summary = llm.invoke(f"""
+    summary = memo_step("profile_summary", llm.invoke, f"""
     Create a detailed, friendly summary of the user's information in a clear format:
     - Name: {state.name}
     - Family Members: {state.family_members}
@@ -445,30 +505,29 @@ def onboarding_confirmation_node(state: UserProfile) -> Command[Literal["persona
         # If confirmed, end the process
         return Command(
             goto=END,
-            update={
-                **state.model_dump(),
-                "onboarding_confirmation_done": True,
-                "onboarding_complete": True,
-                "profiling_stage": "complete",
-                "interaction_count": state.interaction_count + 1,
-                "messages": [summary.content, "Thank you for confirming your information!"]
-            }
+            update=state.delta(
+                onboarding_confirmation_done=True,
+                onboarding_complete=True,
+                current_workflow="onboarding",
+                profiling_stage="complete",
+                interaction_count=state.interaction_count + 1,
+                messages=[summary.content, "Thank you for confirming your information!"]
+            )
         )
     else:
         # If not confirmed, reset relevant flags and restart from profile collection
         return Command(
             goto="personal_info",
-            update={
-                **state.model_dump(),
-                "personal_info_collected": False,
-                "health_info_collected": False,
-                "onboarding_confirmation_done": False,
-                "has_pre_existing_conditions": None,
-                "pre_existing_conditions": [],
-                "profiling_stage": "restart",
-                "interaction_count": state.interaction_count + 1,
-                "messages": ["Let's collect your information again to ensure everything is accurate."]
-            }
+            update=state.delta(
+                personal_info_collected=False,
+                health_info_collected=False,
+                onboarding_confirmation_done=False,
+                has_pre_existing_conditions=None,
+                pre_existing_conditions=[],
+                profiling_stage="restart",
+                interaction_count=state.interaction_count + 1,
+                messages=["Let's collect your information again to ensure everything is accurate."]
+            )
         )
     
 onboarding_workflow = StateGraph(UserProfile)
@@ -1,38 +1,46 @@
 from typing import Literal
 from langgraph.types import Command
-from langgraph.graph import END
 from my_agent.user_state import UserProfile
-from functions.fx import policy_comparison
-from functions.prereq import llm
+from functions.comparison_engine import compare_policies
 from langgraph.types import interrupt
-from functions.prereq import summaries_vectorstore
-from functions.fx import count_policies_compared
+from functions.prereq import fetch_policy_summaries
+from functions.summary_store import summary_store
+from functions.fx import route_policy_query
+from functions.policy_gazetteer import extract_policy_mentions
+from my_agent.utils.step_memo import memo_step, resumable_node
 
+@resumable_node
 def policy_comparison_node(state: UserProfile) -> Command[Literal["ask_gaido", "policy_comparison", "policy_info"]]:
 
     
     if not state.user_intent_query:
         # If no policy summaries are provided, ask for them
         response = "I need information about the policies you'd like to compare. Could you please provide details about the policies you're interested in?"
-        state.user_intent_query = interrupt(response)
+        user_intent_query = interrupt(response)
         return Command(
             goto="policy_comparison",
-            update={
-                **state.model_dump(),
-                "current_workflow": "policy_comparison",
-                "user_intent_query": state.user_intent_query,
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                current_workflow="policy_comparison",
+                user_intent_query=user_intent_query,
+                interaction_count=state.interaction_count + 1,
+            )
         )
     
-    # Get policy summaries from the state
-    k = count_policies_compared(state.user_intent_query)
-    policy_summaries = summaries_vectorstore.similarity_search(state.user_intent_query, k=k)
-    policy_summaries = "---------------------------".join([policy_summaries[i].page_content for i in range(len(policy_summaries))])
+    # Find the policies the user named and fetch exactly their summaries; the router (aliases,
+    # embeddings, then LLM) is only consulted when no policy name is recognised
+    policies = extract_policy_mentions(state.user_intent_query).policies
+    if not policies:
+        policies = memo_step("route_policies", route_policy_query, state.user_intent_query)
+    summaries = memo_step("policy_summaries", fetch_policy_summaries, policies)
+    if not summaries:
+        docs = memo_step("similar_summaries", summary_store.similarity_search, state.user_intent_query, k=max(2, len(policies)))
+        summaries = {doc.metadata.get("Policy_Name", f"Policy {i + 1}"): doc.page_content for i, doc in enumerate(docs)}
 
 
-    # Perform policy comparison
-    comparison_result = policy_comparison(state, policy_summaries)
+    # Perform policy comparison: per-policy attribute extraction in parallel, then one merge call
+    comparison_result = memo_step(
+        "policy_comparison", compare_policies, state.get_summary(), state.user_intent_query, summaries
+    )
     
     # Format the response with comparison and follow-up prompt
     response = f"""Here's a detailed comparison of the policies:
@@ -45,32 +53,31 @@ Would you like to:
 3. Go to main menu?
 
 Please let me know how I can help further!"""
-    state.user_intent_query = interrupt(response)
+    choice = interrupt(response)
 
-    if state.user_intent_query == "3":
+    if choice == "3":
+        # Back to the main menu: clear the query so the supervisor asks for a new one
         return Command(
             goto="ask_gaido",
-            update={
-                **state.model_dump(),
-                "current_workflow": "policy_comparison",
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                current_workflow="policy_comparison",
+                user_intent_query=None,
+                interaction_count=state.interaction_count + 1,
+            )
         )
-    elif state.user_intent_query == "1":
+    elif choice == "1":
         return Command(
             goto="policy_comparison",
-            update={
-                **state.model_dump(),
-                "current_workflow": "policy_comparison",
-                "user_intent_query": None,
-            }
+            update=state.delta(
+                current_workflow="policy_comparison",
+                user_intent_query=None,
+            )
         )
-    elif state.user_intent_query == "2":
+    elif choice == "2":
         return Command(
             goto="policy_comparison",
-            update={
-                **state.model_dump(),
-                "current_workflow": "policy_info",
-                "user_intent_query": None,
-            }
+            update=state.delta(
+                current_workflow="policy_info",
+                user_intent_query=None,
+            )
         )
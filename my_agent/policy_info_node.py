@@ -3,18 +3,19 @@ from langgraph.types import Command
 from my_agent.user_state import UserProfile
 from functions.prereq import llm
 from langgraph.types import interrupt
-from functions.prereq import QueryResponse
-from functions.fx import RAG_tool, web_search_tool
+from functions.prereq import query_classifier
+from functions.fx import answer_policy_question
 from functions.fx import route_policy_query
-from functions.fx import evaluate_rag_response
+from my_agent.utils.step_memo import memo_step, resumable_node
 
-structured_llm = llm.with_structured_output(QueryResponse)
+structured_llm = query_classifier
 
 
+@resumable_node
 def policy_info_node(state: UserProfile) -> Command[Literal["ask_gaido", "policy_info"]]:
     """
     Node that handles policy information requests using RAG and web search.
-    Uses LLM to evaluate RAG responses and fall back to web search when needed.
+    Uses retrieval scores (and the LLM judge only when unsure) to fall back to web search.
     """
     print("\n" + "="*50)
     print("POLICY INFO NODE: Processing policy information request")
@@ -25,28 +26,19 @@ def policy_info_node(state: UserProfile) -> Command[Literal["ask_gaido", "policy
         query_prompt = interrupt("What would you like to know about insurance policies?")
         return Command(
             goto="policy_info",
-            update={
-                **state.model_dump(),  # Include all existing state
-                "user_query": query_prompt,
-                "interaction_count": state.interaction_count + 1,
-                "user_intent_query": None,
-            }
+            update=state.delta(
+                user_query=query_prompt,
+                interaction_count=state.interaction_count + 1,
+                user_intent_query=None,
+            )
         )
 
     # Route the query to the appropriate policy
-    policy_name = route_policy_query(state.user_query)
+    policy_name = memo_step("route_policy", route_policy_query, state.user_query)
     
-    # First try RAG to get information from our database
-    rag_answer = RAG_tool.invoke(state.user_query)
-    
-    # Evaluate if RAG response is sufficient
-    if evaluate_rag_response(state.user_query, rag_answer):
-        answer = rag_answer
-        source = "our database"
-    else:
-        # If RAG response is insufficient, use web search
-        answer = web_search_tool.invoke(state.user_query)
-        source = "web search"
+    # RAG from our database, falling back to web search when the retrieval is insufficient
+    # (optionally started speculatively alongside RAG)
+    answer, source = memo_step("policy_answer", answer_policy_question, state.user_query, state.interaction_count)
     
     # Present the information to the user
     user_response = interrupt(f"""
@@ -67,29 +59,26 @@ def policy_info_node(state: UserProfile) -> Command[Literal["ask_gaido", "policy
         # Ask another question about the same policy
         return Command(
             goto="policy_info",
-            update={
-                **state.model_dump(),
-                "user_query": None,  # Reset to get new query
-                "interaction_count": state.interaction_count + 1
-            }
+            update=state.delta(
+                user_query=None,  # Reset to get new query
+                interaction_count=state.interaction_count + 1
+            )
         )
     elif user_response.strip() == "2":
         # Get information about a different policy
         return Command(
             goto="policy_info",
-            update={
-                **state.model_dump(),
-                "user_query": None,  # Reset to get new query
-                "interaction_count": state.interaction_count + 1
-            }
+            update=state.delta(
+                user_query=None,  # Reset to get new query
+                interaction_count=state.interaction_count + 1
+            )
         )
     else:
         # Return to main menu
         return Command(
             goto="ask_gaido",
-            update={
-                **state.model_dump(),
-                "user_query": None,  # Reset query
-                "interaction_count": state.interaction_count + 1
-            }
+            update=state.delta(
+                user_query=None,  # Reset query
+                interaction_count=state.interaction_count + 1
+            )
         ) 
\ No newline at end of file
@@ -4,6 +4,7 @@ import os
 # Add the project root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(), ".")))
 from functions.prereq import llm
+from functions.profile_cache import preference_questions_cache, profile_signature
 
 from .user_state import UserProfile
 from pydantic import BaseModel, Field
@@ -29,7 +30,15 @@ class PreferenceQuestion_output(BaseModel):
     )
 
 
-def get_preferences_questions(state: UserProfile):
+def get_preferences_questions(state: UserProfile) -> PreferenceQuestion_output:
+    """Preference questions for the profile, shared by every profile in the same signature bucket."""
+    questions = preference_questions_cache.get_or_compute(
+        profile_signature(state), lambda: _generate_preferences_questions(state).key_question
+    )
+    return PreferenceQuestion_output(key_question=questions)
+
+
+def _generate_preferences_questions(state: UserProfile) -> PreferenceQuestion_output:
 
     PREFERENCES_QUESTIONS = f"""
 
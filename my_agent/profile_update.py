@@ -3,12 +3,16 @@ import sys
 # Add the project root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(), ".")))
 
+import json
+import re
+
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from .user_state import UserProfile
 import asyncio
 
 from functions.prereq import llm, llm_openai, llm_gemini, llm_anthropic
+from functions import providers
 
 # ------------------------------------------------------------------------------------------------
 # Update the user profile based on the query
@@ -52,11 +56,48 @@ class ProfileUpdate(BaseModel):
     )
 
 
+# Only these fields can be extracted, so only they are shown to the model
+PROFILE_FIELDS = ("name", "family_members", "age", "has_pre_existing_conditions", "pre_existing_conditions")
+PROFILE_PROMPT_TOKEN_BUDGET = 400  # budget for the query and current values together
+CHARS_PER_TOKEN = 4  # rough estimate for English text
+
+# Cheap pre-check that errs toward calling the LLM: only a query with none of these cues (first
+# person or third person talk, a name introduction, a relative, an age or number, a health
+# statement) is treated as a pure policy / insurer question and skips the extraction call
+_PROFILE_CONTENT = re.compile(
+    r"\d"
+    r"|\b(i|i'm|im|i've|ive|me|my|myself|mine|we|we're|us|our|he|he's|she|she's|his|her|they|their)\b"
+    r"|\b(name|call me|this is|here)\b"
+    r"|\b(wife|husband|spouse|partner|son|daughter|kids?|child(ren)?|baby|father|mother|dad|mom|mum|mummy"
+    r"|papa|parents?|in[- ]laws?|brother|sister|sibling|grand\w*|family|self|family members?)\b"
+    r"|\b(years?|yrs|aged?|old)\b"
+    r"|\b(have|having|had|suffer\w*|diagnos\w*|conditions?|disease|illness|disorder|problem|issues?|surgery"
+    r"|treatment|medication|medicine|pregnan\w*|healthy|\w+itis|diabet\w*|sugar|bp|blood pressure"
+    r"|hypertension|asthma|thyroid|cholesterol|heart|cardiac|cancer|kidney|liver)\b",
+    re.I,
+)
+
+
+def has_profile_content(query: str) -> bool:
+    return bool(query and _PROFILE_CONTENT.search(query))
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+def _current_profile(state: UserProfile) -> str:
+    return json.dumps({field: getattr(state, field) for field in PROFILE_FIELDS}, separators=(",", ":"))
+
+
 def update_profile(query: str, state: UserProfile) -> ProfileUpdate:
     """
     Extract relevant user profile updates based on information presented in the query.
     Don't hallucinate. Only extract information that is explicitly mentioned in the query, which you are sure about.
-    
+
+    The prompt carries only the five extractable fields (not the whole state) and stays within
+    PROFILE_PROMPT_TOKEN_BUDGET; queries with no profile-like content skip the call entirely.
 
     Args:
         query: The user's query string
@@ -66,48 +107,23 @@ def update_profile(query: str, state: UserProfile) -> ProfileUpdate:
         ProfileUpdate object with extracted information relevant to the query
     
     """
+    if not has_profile_content(query):
+        return ProfileUpdate()
+
+    current_profile = _current_profile(state)
+    query = _truncate(query, max(PROFILE_PROMPT_TOKEN_BUDGET - len(current_profile) // CHARS_PER_TOKEN, 100))
     profile_update_prompt = f"""
-    IMPORTANT: Only extract information that is EXPLICITLY mentioned in the query. Do not make assumptions or infer information.
-    If information is not directly stated, leave those fields as None or empty lists.
-    
+    Extract ONLY profile information EXPLICITLY stated in the query; never infer. Missing fields: null or [].
+
     Query: {query}
 
-    Task: Extract ONLY the following information if explicitly stated:
-    1. Name (exact name mentioned)
-    2. Family members (exact relationships/names mentioned)
-    3. Ages (exact numbers mentioned)
-    4. Pre-existing conditions (exact conditions mentioned)
-    5. Has pre-existing conditions (only if explicitly stated yes/no)
+    Fields: name; family_members (relationships, the user is "self"); age (one per member mentioned);
+    pre_existing_conditions; has_pre_existing_conditions (only if explicitly yes/no).
 
-    Current profile state:
-    {state.model_dump_json(indent=2)}
+    Current profile (keep consistent, do not repeat it): {current_profile}
 
-    Rules:
-    - Do not infer or assume any information
-    - Only include information directly stated in the query
-    - Use None for missing information
-    - Use empty lists for missing lists
-    - Maintain consistency with existing profile data
-    - If query is just asking for information without providing any, return empty/None values
-
-    Example outputs:
-    "I am John, 35 years old" -> 
-    {{
-        "name": "John",
-        "age": [35],
-        "family_members": ["self"],
-        "has_pre_existing_conditions": null,
-        "pre_existing_conditions": []
-    }}
-
-    "Looking for insurance" ->
-    {{
-        "name": null,
-        "age": [],
-        "family_members": [],
-        "has_pre_existing_conditions": null,
-        "pre_existing_conditions": []
-    }}
+    Example: "I am John, 35 years old" -> {{"name": "John", "age": [35], "family_members": ["self"], "has_pre_existing_conditions": null, "pre_existing_conditions": []}}
+    Example: "Looking for insurance" -> {{"name": null, "age": [], "family_members": [], "has_pre_existing_conditions": null, "pre_existing_conditions": []}}
     """
     
     # structured_llm = llm.with_structured_output(ProfileUpdate)
@@ -201,4 +217,46 @@ def update_profile(query: str, state: UserProfile) -> ProfileUpdate:
 # user_profile = UserProfile()
 # query = "Need health insurance for parents, father has diabetes"
 # update = update_profile(query, user_profile)
-# print("Test 10:", update)
\ No newline at end of file
+# print("Test 10:", update)
+
+# ------------------------------------------------------------------------------------------------
+# Single-pass extraction of an onboarding description
+# ------------------------------------------------------------------------------------------------
+
+class OnboardingDetails(ProfileUpdate):
+
+    contact_info: Optional[str] = Field(
+        description=(
+            "Email address or phone number of the user"
+        ),
+        default=None
+    )
+
+
+# Built on first use, then shared (see functions/providers.py)
+providers.register("onboarding_details_extractor", lambda: providers.get("llm_gemini").with_structured_output(OnboardingDetails))
+onboarding_details_extractor = providers.lazy("onboarding_details_extractor")
+
+
+def extract_onboarding_details(description: str) -> OnboardingDetails:
+    """
+    Fill as many onboarding fields as possible from one free-text description
+    ("me 34, wife 31, dad 66 with diabetes") in a single structured call.
+    """
+    extraction_prompt = f"""
+    Extract the health insurance profile stated in the user's message. Only use what is explicitly said.
+
+    Message: {description}
+
+    Rules:
+    - family_members: everyone to be insured, in the order mentioned; call the user "self"
+    - age: one age per family member, in the same order; leave empty unless every member's age is given
+    - has_pre_existing_conditions: true if any condition is mentioned, false only if the user says there are none, otherwise null
+    - pre_existing_conditions: the conditions mentioned (e.g. "diabetes (father)")
+    - name and contact_info (email or phone) only if given
+
+    Example: "I'm Asha, me 34, wife 31, dad 66 with diabetes" ->
+    {{"name": "Asha", "family_members": ["self", "wife", "father"], "age": [34, 31, 66],
+      "has_pre_existing_conditions": true, "pre_existing_conditions": ["diabetes (father)"], "contact_info": null}}
+    """
+    return onboarding_details_extractor.invoke(extraction_prompt)
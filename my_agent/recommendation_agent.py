@@ -18,18 +18,20 @@ from langgraph.checkpoint.memory import MemorySaver
 
 from my_agent.user_state import UserProfile
 from my_agent.preferences import get_preferences_questions
+from my_agent.utils.step_memo import memo_step, resumable_node
 
 
 # ------------------------------------------------------------------------------------------------
 # Creating custom preferences questions based on user profile 
 # ------------------------------------------------------------
 
+@resumable_node
 def preferences_node(state: UserProfile) -> Command[Literal["policy_match","preferences"]]:
     """Collect all User Preferrences before Recommending Policies"""
     
     # Initialize preferences structure if not already set
     if not hasattr(state, 'preferences_data') or not state.preferences_data:
-        questions = get_preferences_questions(state).key_question
+        questions = memo_step("preferences_questions", get_preferences_questions, state).key_question
         state.preferences_data = [
             {'question': q, 'response': None} for q in questions
         ]
@@ -84,11 +86,13 @@ def preferences_node(state: UserProfile) -> Command[Literal["policy_match","pref
 # ------------------------------------------------------------------------------------------------
 
 from functions.prompts import feature_guidelines
-from functions.fx import get_feature_recommendation
-from langchain import hub as prompts
-final_recommendation_prompt = prompts.pull("final_recommendation_prompt")
+from functions.feature_rules import recommend_features
+from functions.prompt_registry import get_prompt
+from functions.prompts import shortlist_recommendation_prompt
+from functions.candidate_scoring import score_candidates, candidate_facts
 from functions.fx import answer_question
 
+@resumable_node
 def policy_match_node(state: UserProfile)-> Command[Literal["preferences","query_handling","confirmation"]]:
     
     # """Match policies to user preferences and recommend 3 most suitable options"""
@@ -111,10 +115,20 @@ def policy_match_node(state: UserProfile)-> Command[Literal["preferences","query
     - User_Prefence Data: {[pref for pref in state.preferences_data if pref.get('response') is not None]}
     '''
     
-    feature_recommendation = get_feature_recommendation(User_Profile)
-    # Generate policy recommendations using the LLM
-    reco_prompt =final_recommendation_prompt.format(user_profile=User_Profile, feature_recommendation=feature_recommendation)
-    recommendations = llm.invoke(reco_prompt).content
+    # Persona rules from feature_guidelines; the LLM only sees profiles that match no rule
+    feature_recommendation = memo_step("feature_recommendation", recommend_features, state, User_Profile)
+    # Score every known plan locally and only show the LLM the shortlist; without a policy
+    # facts table the full-catalogue prompt is used as before
+    candidates = score_candidates(state)
+    if candidates:
+        reco_prompt = shortlist_recommendation_prompt.format(
+            user_profile=User_Profile,
+            feature_recommendation=feature_recommendation,
+            candidates=candidate_facts(candidates),
+        )
+    else:
+        reco_prompt = get_prompt("final_recommendation_prompt").format(user_profile=User_Profile, feature_recommendation=feature_recommendation)
+    recommendations = memo_step("final_recommendation", lambda prompt: llm.invoke(prompt).content, reco_prompt)
     # recommendations = recommendations.content if hasattr(recommendations, 'content') else str(recommendations)
 
     opinion = interrupt(recommendations +"\n**What would you like to do next?**\nYou can:\n  - ✅ Type **'Yes'** to proceed with these recommended policies\n  - ❓ Ask any question about the policies (recommended or any other)\n  - 🔁 Type **'Update Preferences'** if you'd like to revise your requirements\nI'm here to help you with whichever step you choose!\n")
@@ -159,6 +173,7 @@ def policy_match_node(state: UserProfile)-> Command[Literal["preferences","query
 # ------------------------------------------------------------------------------------------------
 # Creating query handling node 
 
+@resumable_node
 def query_handling_node(state: UserProfile)->Command[Literal["confirmation","query_handling"]]:
     """Handle user queries about policies using RAG_tool"""
     from langchain_core.messages import HumanMessage
@@ -199,8 +214,11 @@ def query_handling_node(state: UserProfile)->Command[Literal["confirmation","que
         
     # Invoke the RAG tool with the user's query
     
-    answer = react_agent.invoke({"messages":[HumanMessage(content=state.user_query)]})
-    answer = answer['messages'][-1].content
+    answer = memo_step(
+        "react_agent",
+        lambda query: react_agent.invoke({"messages":[HumanMessage(content=query)]})['messages'][-1].content,
+        state.user_query,
+    )
     
     # Format the response message
     response_message = f"{answer}"
@@ -263,6 +281,8 @@ def confirmation_node(state: UserProfile)->Command[Literal["__end__","preference
             goto=END,
             update={
                 "recommendation_confirmation_done": True,
+                "recommendation_complete": True,
+                "current_workflow": "recommendation",
                 "profiling_stage": "complete",
                 "interaction_count": state.interaction_count + 1
             }
@@ -3,11 +3,15 @@ from typing import Literal
 from langgraph.graph import END
 from langgraph.types import Command, interrupt
 
-from functions.prereq import llm, QueryResponse
+from functions.prereq import query_classifier
 from functions.fx import initial_recommendation
+from functions.intent_classifier import classify_intent
 from my_agent.user_state import UserProfile
 from my_agent.profile_update import update_profile
-structured_llm = llm.with_structured_output(QueryResponse)
+from my_agent.utils.step_memo import memo_step, resumable_node
+from my_agent.utils.background import background_tasks, current_thread_id
+from my_agent.utils.conversation_memory import advance_fold
+structured_llm = query_classifier
 
 # user_1 = UserProfile(
 #     name="Sudhakar",
@@ -61,6 +65,43 @@ structured_llm = llm.with_structured_output(QueryResponse)
 # - Transitions between different states
 # ============================================================================
 
+PROFILE_UPDATE_JOIN_TIMEOUT = 5.0  # seconds to wait for the profile update once the recommendation is ready
+
+
+def recommend_while_updating_profile(query: str, state: UserProfile):
+    """
+    Initial recommendation with the profile update extracted from the same query in parallel.
+    Returns (recommendation, profile fields to merge); the fields are empty when the update is
+    refused by a saturated pool or not finished within its deadline (it is then merged later).
+    """
+    thread_id = current_thread_id()
+    future = background_tasks.submit(
+        thread_id, "profile_update", update_profile, query, state, step=state.interaction_count
+    ) if thread_id else None
+    answer = initial_recommendation(query, state)
+    if future is None:
+        return answer, {}
+    profile_update = background_tasks.result(thread_id, "profile_update", timeout=PROFILE_UPDATE_JOIN_TIMEOUT)
+    return answer, state.profile_update_fields(profile_update) if profile_update else {}
+
+
+def collect_profile_update(state: UserProfile) -> dict:
+    """
+    Fields of a profile update that finished after the step that started it returned. It is only
+    merged on the supervisor turn right after that step (any node in between, e.g. onboarding,
+    bumps interaction_count), and only into fields that are still empty.
+    """
+    thread_id = current_thread_id()
+    profile_update = background_tasks.result(
+        thread_id, "profile_update", min_step=state.interaction_count - 1
+    ) if thread_id else None
+    if not profile_update:
+        return {}
+    fields = state.profile_update_fields(profile_update)
+    return {field: value for field, value in fields.items() if getattr(state, field) in (None, [])}
+
+
+@resumable_node
 def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "recommendation_agent", "__end__", "ask_gaido", "policy_info", "policy_comparison"]]:
     """Supervisor node that coordinates transitions between onboarding and recommendation agents"""
     
@@ -95,25 +136,47 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
             From finding the right coverage to understanding your options, 
             I'll help you choose the best health policy for your needs. Let's get started — your health is in good hands!'''
         
-        state.user_intent_query = interrupt(response)
+        user_intent_query = interrupt(response)
         
         
         # UPDATING CHAT HISTORY
-        state.messages.append("assistant: " + response + "user: " + state.user_intent_query)
         # update_state(state, id)
         return Command(
             goto="ask_gaido",
-            update={
-                **state.model_dump(),  # Start with current state
-                "greeting_done": True,
-            }
+            update=state.delta(
+                user_intent_query=user_intent_query,
+                messages=["assistant: " + response + "user: " + user_intent_query],
+                greeting_done=True,
+            )
         )
     
     
-    if state.user_intent_query == None:
-        state.user_intent_query = interrupt("How can I help you today?")
-        state.messages.append("assistant: How can I help you today? " + "user: " + state.user_intent_query)
-    response = structured_llm.invoke(state.user_intent_query)
+    # A profile update or conversation fold that finished after an earlier step returned is merged
+    # now (memoized, since collecting removes it from the pool and this node may be resumed), and
+    # the next fold is started if enough messages are waiting
+    late_fields = {
+        **memo_step("late_profile_update", collect_profile_update, state),
+        **memo_step("conversation_fold", advance_fold, state),
+    }
+
+    # The query and chat entries gathered in this step are returned as a delta, never written
+    # onto `state` in place, so `state.delta` can tell what changed
+    query = state.user_intent_query
+    new_messages = []
+    if query == None:
+        query = interrupt("How can I help you today?")
+        new_messages.append("assistant: How can I help you today? " + "user: " + query)
+
+    # Classify locally first and only escalate ambiguous queries to the LLM. The result is kept
+    # on the state so self-loops back to ask_gaido with the same query are not re-classified.
+    cached = state.query_classification
+    if cached and cached.get("query") == query:
+        query_type = cached["query_type"]
+    else:
+        query_type, _ = classify_intent(
+            query, lambda q: memo_step("classify_query", structured_llm.invoke, q).query_type
+        )
+    query_classification = {"query": query, "query_type": query_type}
 
     
     # ------------------------------------------------------------------------------------------------
@@ -124,62 +187,56 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
     # 3. Offers to collect more details through onboarding workflow
     # 4. Routes to appropriate next steps based on user response
     # ------------------------------------------------------------------------------------------------
-    if response.query_type == "policy_recommendation_request":
+    if query_type == "policy_recommendation_request":
       
         if state.has_missing_profile_info():
             
             
-            # Schedule profile update as a background task and continue without waiting
-            import threading
-            
-            def background_profile_update(query, user_state):
-                profile_update = update_profile(query, user_state)
-                user_state.update_state(name=profile_update.name, 
-                                      age=profile_update.age, 
-                                      family_members=profile_update.family_members, 
-                                      has_pre_existing_conditions=profile_update.has_pre_existing_conditions, 
-                                      pre_existing_conditions=profile_update.pre_existing_conditions)
-            
-            # Start the profile update in a background thread
-            threading.Thread(target=background_profile_update, 
-                           args=(state.user_intent_query, state), 
-                           daemon=True).start()
-            
-            
-            initial_reco_answer = initial_recommendation(state.user_intent_query, state)
+            # The profile update runs on the bounded background pool while the initial
+            # recommendation is generated, and the two are joined (memoized as one step, so a
+            # resume replays both). An update that is still running is merged on a later step.
+            initial_reco_answer, profile_fields = memo_step(
+                "initial_recommendation", recommend_while_updating_profile, query, state
+            )
+            profile_fields = {**late_fields, **profile_fields}
             follow_up_text = """These are just preliminary recommendations! To help me refine them and find the perfect plan for you, I'd love to learn a bit more about you."""
             proceed_question = "Would you like to proceed with more details. Type YES or NO "
             
             user_output = f"{initial_reco_answer}\n\n{follow_up_text}\n\n{proceed_question}"
             user_updates = interrupt(user_output)
             # UPDATING CHAT HISTORY
-            state.messages.append("assistant: " + user_output + "user: " + user_updates)
+            new_messages.append("assistant: " + user_output + "user: " + user_updates)
             
             
             if user_updates.lower() == "yes":
                 # update_state(state, id)
                 return Command(
             goto="onboarding_agent",
-            update={
-                **state.model_dump(),
-                "user_query": state.user_intent_query,
-                "greeting_done": state.greeting_done,
-                "recommeneded_policies": initial_reco_answer,
-                # **state.model_dump(),  # Start with current state
-                "current_workflow": "onboarding",
+            update=state.delta(
+                user_intent_query=query,
+                messages=new_messages,
+                query_classification=query_classification,
+                **profile_fields,
+                user_query=query,
+                greeting_done=state.greeting_done,
+                recommeneded_policies=initial_reco_answer,
+                current_workflow="onboarding",
                 # Additional context that might be useful for the onboarding agent
-                "interaction_count": state.interaction_count + 1,
-            }
+                interaction_count=state.interaction_count + 1,
+            )
             )
 
             else:
                 # update_state(state, id)
                 return Command(
                     goto="ask_gaido",
-                    update={
-                        **state.model_dump(),
-                        "interaction_count": state.interaction_count + 1,
-                    }
+                    update=state.delta(
+                        user_intent_query=query,
+                        messages=new_messages,
+                        query_classification=query_classification,
+                        **profile_fields,
+                        interaction_count=state.interaction_count + 1,
+                    )
                 )
 
     # ------------------------------------------------------------------------------------------------
@@ -189,16 +246,19 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
     # 2. Updates state with current workflow and user query
     # 3. Increments interaction count
     # ------------------------------------------------------------------------------------------------
-    if response.query_type == "policy_comparison_request":
+    if query_type == "policy_comparison_request":
         # update_state(state, id)
         return Command(
             goto="policy_comparison",
-            update={
-                **state.model_dump(),
-                "current_workflow": "policy_comparison",
-                "user_query": state.user_intent_query,
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                user_intent_query=query,
+                messages=new_messages,
+                query_classification=query_classification,
+                **late_fields,
+                current_workflow="policy_comparison",
+                user_query=query,
+                interaction_count=state.interaction_count + 1,
+            )
         )
      
     # ------------------------------------------------------------------------------------------------
@@ -208,16 +268,19 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
     # 2. Updates state with current workflow and user query
     # 3. Increments interaction count
     # ------------------------------------------------------------------------------------------------
-    elif response.query_type == "policy_information_request" or response.query_type == "insurer_information_request" or response.query_type == "service_information_request":
+    elif query_type == "policy_information_request" or query_type == "insurer_information_request" or query_type == "service_information_request":
         # update_state(state, id)
         return Command(
             goto="policy_info",
-            update={
-                **state.model_dump(),
-                "current_workflow": "policy_info",
-                "user_query": state.user_intent_query,
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                user_intent_query=query,
+                messages=new_messages,
+                query_classification=query_classification,
+                **late_fields,
+                current_workflow="policy_info",
+                user_query=query,
+                interaction_count=state.interaction_count + 1,
+            )
         )
     
     # ------------------------------------------------------------------------------------------------
@@ -227,16 +290,19 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
     # 2. Updates state with current workflow and user query
     # 3. Increments interaction count
     # ------------------------------------------------------------------------------------------------
-    elif response.query_type == "analysis_request":
+    elif query_type == "analysis_request":
         # update_state(state, id)
         return Command(
             goto="policy_comparison",
-            update={
-                **state.model_dump(),
-                "current_workflow": "policy_comparison",
-                "user_query": state.user_intent_query,
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                user_intent_query=query,
+                messages=new_messages,
+                query_classification=query_classification,
+                **late_fields,
+                current_workflow="policy_comparison",
+                user_query=query,
+                interaction_count=state.interaction_count + 1,
+            )
         )
 
     # ------------------------------------------------------------------------------------------------
@@ -249,11 +315,14 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
         # update_state(state, id)
         return Command(
             goto="onboarding_agent",
-            update={
-                **state.model_dump(),
-                "current_workflow": "onboarding",
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                user_intent_query=query,
+                messages=new_messages,
+                query_classification=query_classification,
+                **late_fields,
+                current_workflow="onboarding",
+                interaction_count=state.interaction_count + 1,
+            )
         )
     
     # If onboarding is complete but recommendation is not, go to recommendation agent
@@ -261,11 +330,14 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
         # update_state(state, id)
         return Command(
             goto="recommendation_agent",
-            update={
-                **state.model_dump(),
-                "current_workflow": "recommendation",
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                user_intent_query=query,
+                messages=new_messages,
+                query_classification=query_classification,
+                **late_fields,
+                current_workflow="recommendation",
+                interaction_count=state.interaction_count + 1,
+            )
         )
     
     # If both are complete, end the process
@@ -273,20 +345,26 @@ def supervisor_node(state: UserProfile)->Command[Literal["onboarding_agent", "re
         # update_state(state, id)
         return Command(
             goto=END,
-            update={
-                **state.model_dump(),
-                "current_workflow": "complete",
-                "interaction_count": state.interaction_count + 1,
-            }
+            update=state.delta(
+                user_intent_query=query,
+                messages=new_messages,
+                query_classification=query_classification,
+                **late_fields,
+                current_workflow="complete",
+                interaction_count=state.interaction_count + 1,
+            )
         )
     
     # Default case - stay in supervisor
     # update_state(state, id)
     return Command(
         goto="ask_gaido",
-        update={
-            **state.model_dump(),
-            "current_workflow": "supervisor",
-            "interaction_count": state.interaction_count + 1,
-        }
+        update=state.delta(
+            user_intent_query=query,
+            messages=new_messages,
+            query_classification=query_classification,
+            **late_fields,
+            current_workflow="supervisor",
+            interaction_count=state.interaction_count + 1,
+        )
     ) 
\ No newline at end of file
@@ -1,5 +1,16 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any
+
+
+def append_messages(existing: List[str], new: List[str]) -> List[str]:
+    """
+    Reducer for the append-only `messages` channel: nodes return only their new entries and
+    they are concatenated onto the history. Subgraphs are mounted through
+    `my_agent.utils.subgraph.subgraph_node`, which passes on just the entries they added.
+    """
+    return list(existing or []) + list(new or [])
+
+
 class UserProfile(BaseModel):
     
     # Personal info details
@@ -11,8 +22,14 @@ class UserProfile(BaseModel):
     pre_existing_conditions: List[str] = Field(default_factory=list)
     has_pre_existing_conditions: Optional[bool] = None
     user_intent_query: Optional[str] = Field(default=None)
+    # Last supervisor classification, {"query": ..., "query_type": ...}, reused while the query is unchanged
+    query_classification: Optional[Dict[str, str]] = Field(default=None)
     
-    messages: List[str] = Field(default_factory=list)
+    # Append-only channel: nodes return only the new entries and the graph concatenates them
+    messages: Annotated[List[str], append_messages] = Field(default_factory=list)
+    # Rolling summary of messages[:summarized_messages]; see my_agent/utils/conversation_memory.py
+    conversation_summary: Optional[str] = None
+    summarized_messages: int = 0
     
 
     # Preferences Collected
@@ -31,6 +48,7 @@ class UserProfile(BaseModel):
     profiling_stage: Optional[str] = None
     greeting_done: bool = False
     personal_info_collected: bool = False
+    profile_extraction_done: bool = False  # the one-shot free-text profile question was asked
     health_info_collected: bool = False
     preferences_collected: bool = False
     policy_match_done: bool = False
@@ -50,6 +68,21 @@ class UserProfile(BaseModel):
     recommendation_complete: bool = False
 
 
+    def delta(self, **updates: Any) -> Dict[str, Any]:
+        """
+        Builds a Command update containing only the fields that actually change.
+        Values equal to the current state are dropped, except for `messages`, which is
+        append-only and must be given just the new entries.
+        """
+        changes = {}
+        for key, value in updates.items():
+            if key == "messages":
+                if value:
+                    changes[key] = list(value)
+            elif key not in type(self).model_fields or getattr(self, key) != value:
+                changes[key] = value
+        return changes
+
     def has_missing_profile_info(self) -> bool:
         """
         Checks if any critical user profile information is missing.
@@ -149,6 +182,21 @@ class UserProfile(BaseModel):
             else:
                 self.pre_existing_conditions.append(pre_existing_conditions)
 
+    def profile_update_fields(self, update) -> Dict[str, Any]:
+        """
+        The fields a ProfileUpdate would change, without touching this instance; pass the result
+        to `delta` / a Command update. Extracted values replace the current ones rather than
+        extending them, so merging the same update twice cannot duplicate list entries.
+        """
+        values = {
+            "name": update.name,
+            "age": list(update.age) if update.age else None,
+            "family_members": list(update.family_members) if update.family_members else None,
+            "has_pre_existing_conditions": update.has_pre_existing_conditions,
+            "pre_existing_conditions": list(update.pre_existing_conditions) if update.pre_existing_conditions else None,
+        }
+        return {f: v for f, v in values.items() if v is not None and v != getattr(self, f)}
+
     def get_summary(self) -> str:
         """
         Returns a formatted summary of the user profile information.
@@ -220,10 +268,8 @@ class UserProfile(BaseModel):
         summary_parts.append(self.get_summary())
         
         if self.messages:
-            messages_str = "\nConversation History:\n"
-            for msg in self.messages:
-                messages_str += f"- {msg}\n"
-            summary_parts.append(messages_str)
+            from my_agent.utils.conversation_memory import ConversationMemory
+            summary_parts.append(f"\nConversation History:\n{ConversationMemory.from_state(self).window()}\n")
             
         if self.recommeneded_policies:
             reco_str = "\nRecommended Policies:\n"
@@ -0,0 +1,122 @@
+# ------------------------------------------------------------------------------------------------
+# Bounded background tasks
+# ------------------------------------------------------------------------------------------------
+# Work that a node starts but does not need right away (e.g. the supervisor's profile update)
+# runs on a shared, bounded worker pool instead of a raw thread per request:
+#
+# - At most BACKGROUND_WORKERS tasks run at once and at most BACKGROUND_MAX_PENDING are queued
+#   or running; beyond that `submit` refuses the task (backpressure) and the caller skips it.
+# - Futures are kept per (graph thread id, task name), so a later step of the same conversation
+#   can pick up a result that was not ready when the node returned.
+# - Every task has a deadline; results that are not collected by then are dropped, and expired
+#   entries are evicted on the next `submit`, so abandoned conversations do not pile up.
+# - A task can be stamped with the graph step it was started from; `result(min_step=...)` drops
+#   tasks started before that step, so a stale result is never merged into a newer state.
+#
+# Results are returned to the node, which merges them into its Command update, so no worker ever
+# mutates a graph state object.
+# ------------------------------------------------------------------------------------------------
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_WORKERS = int(os.getenv("GAIDO_BACKGROUND_WORKERS", "4"))
+BACKGROUND_MAX_PENDING = int(os.getenv("GAIDO_BACKGROUND_MAX_PENDING", "32"))
+BACKGROUND_DEADLINE = float(os.getenv("GAIDO_BACKGROUND_DEADLINE", "30"))  # seconds
+
+_MISSING = object()
+
+
+def current_thread_id() -> Optional[str]:
+    """thread_id of the graph run executing this code, or None outside a graph run."""
+    try:
+        from langgraph.config import get_config
+        thread_id = get_config().get("configurable", {}).get("thread_id")
+    except Exception:
+        return None
+    return None if thread_id is None else str(thread_id)
+
+
+class BackgroundTasks:
+    """Bounded worker pool whose futures are addressed by (thread id, task name)."""
+
+    def __init__(self, workers: int = BACKGROUND_WORKERS, max_pending: int = BACKGROUND_MAX_PENDING,
+                 deadline: float = BACKGROUND_DEADLINE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gaido-background")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.deadline = deadline
+        # (thread_id, name) -> (future, deadline timestamp, step it was started from)
+        self._tasks: Dict[Tuple[str, str], Tuple[Future, float, Optional[int]]] = {}
+        self._lock = threading.Lock()
+
+    def _evict_expired(self) -> None:
+        """Drop entries past their deadline; caller holds the lock."""
+        now = time.monotonic()
+        for key, (future, deadline, _) in list(self._tasks.items()):
+            if now >= deadline:
+                future.cancel()
+                del self._tasks[key]
+
+    def submit(self, thread_id: str, name: str, fn: Callable[..., Any], *args,
+               step: Optional[int] = None, **kwargs) -> Optional[Future]:
+        """
+        Start `fn` for the conversation, or return the task already registered under that name
+        (running, or finished but not collected yet, so its result is never thrown away).
+        `step` records the graph step the task was started from. Returns None when the pool is
+        saturated.
+        """
+        key = (thread_id, name)
+        with self._lock:
+            self._evict_expired()
+            existing = self._tasks.get(key)
+            if existing is not None:
+                return existing[0]
+            if not self._slots.acquire(blocking=False):
+                logger.warning("Background pool saturated; skipping %s for thread %s", name, thread_id)
+                return None
+            future = self._executor.submit(fn, *args, **kwargs)
+            future.add_done_callback(lambda _: self._slots.release())
+            self._tasks[key] = (future, time.monotonic() + self.deadline, step)
+            return future
+
+    def result(self, thread_id: str, name: str, timeout: float = 0.0, min_step: Optional[int] = None) -> Any:
+        """
+        The finished result of the named task, waiting up to `timeout` seconds (capped by its
+        deadline). Returns None while it is still running; finished, failed and expired tasks,
+        and tasks started before `min_step`, are forgotten.
+        """
+        key = (thread_id, name)
+        with self._lock:
+            entry = self._tasks.get(key)
+        if entry is None:
+            return None
+        future, deadline, step = entry
+        value = _MISSING
+        if time.monotonic() >= deadline:
+            future.cancel()
+            logger.warning("Background task %s for thread %s missed its deadline", name, thread_id)
+        elif min_step is not None and step is not None and step < min_step:
+            future.cancel()
+            logger.info("Dropping background task %s for thread %s started at step %s", name, thread_id, step)
+        else:
+            try:
+                value = future.result(timeout=max(0.0, min(timeout, deadline - time.monotonic())))
+            except TimeoutError:
+                if time.monotonic() < deadline:
+                    return None
+                future.cancel()
+                logger.warning("Background task %s for thread %s missed its deadline", name, thread_id)
+            except Exception as e:
+                logger.warning("Background task %s for thread %s failed: %s", name, thread_id, e)
+        with self._lock:
+            if self._tasks.get(key) is entry:
+                del self._tasks[key]
+        return None if value is _MISSING else value
+
+background_tasks = BackgroundTasks()
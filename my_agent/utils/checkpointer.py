@@ -0,0 +1,257 @@
+# ------------------------------------------------------------------------------------------------
+# Durable SQLite checkpointer
+# ------------------------------------------------------------------------------------------------
+# Optional checkpointer for running the graphs on a single box without an external database.
+# Enable it with GAIDO_CHECKPOINTER=sqlite (and optionally GAIDO_CHECKPOINT_DB=<path>).
+#
+# Snapshots are kept small in three ways:
+# 1. Values are encoded with LangGraph's msgpack serializer and zlib-compressed when large.
+# 2. Channel values are stored once per channel version in `channel_blobs`, so a checkpoint only
+#    writes the channels that changed since its parent (everything else is referenced by version).
+# 3. Append-only lists (`messages`) are stored as the new tail plus a reference to the previous
+#    version, with a full keyframe every KEYFRAME_INTERVAL versions to bound read chains.
+#
+# Note: the LangGraph API server provides its own persistence and ignores custom checkpointers,
+# so this is only used when the graphs are run directly (scripts, workers, self-hosted servers).
+# ------------------------------------------------------------------------------------------------
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINTER_BACKEND = os.getenv("GAIDO_CHECKPOINTER", "").lower()
+CHECKPOINT_DB_PATH = os.getenv("GAIDO_CHECKPOINT_DB", "gaido_checkpoints.sqlite")
+
+COMPRESSION_THRESHOLD = 512  # bytes; smaller payloads are not worth compressing
+COMPRESSION_LEVEL = 6
+KEYFRAME_INTERVAL = 16  # append deltas before a full copy of a list channel is stored
+WRITE_CACHE_SIZE = 1024  # threads whose latest channel values are kept for delta encoding
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """msgpack serializer that zlib-compresses payloads above COMPRESSION_THRESHOLD."""
+
+    SUFFIX = "+zlib"
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        if len(data) >= COMPRESSION_THRESHOLD:
+            return type_ + self.SUFFIX, zlib.compress(data, COMPRESSION_LEVEL)
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(self.SUFFIX):
+            type_, payload = type_[: -len(self.SUFFIX)], zlib.decompress(payload)
+        return super().loads_typed((type_, payload))
+
+
+class DeltaSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that stores channel values separately from checkpoints and only when they change.
+
+    The checkpoint row keeps `channel_versions`; values are rebuilt from `channel_blobs` on read.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, serde=None) -> None:
+        super().__init__(conn, serde=serde or CompressedSerializer())
+        # (thread_id, checkpoint_ns) -> {channel: (version, value, chain_length)}
+        self._last_written: "OrderedDict[Tuple[str, str], Dict[str, Tuple[str, Any, int]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS channel_blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                base_version TEXT,
+                type TEXT,
+                blob BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            """
+        )
+
+    # --------------------------------------------------------------------------------------------
+    # Writes
+    # --------------------------------------------------------------------------------------------
+
+    def _encode_channel(self, scope, channel: str, version: str, value: Any):
+        """Return (kind, base_version, type, blob) for a new channel version."""
+        with self._cache_lock:
+            previous = self._last_written.get(scope, {}).get(channel)
+
+        if (
+            previous is not None
+            and isinstance(value, list)
+            and isinstance(previous[1], list)
+            and previous[2] < KEYFRAME_INTERVAL
+            and len(value) >= len(previous[1])
+            and value[: len(previous[1])] == previous[1]
+        ):
+            type_, blob = self.serde.dumps_typed(value[len(previous[1]):])
+            return "append", previous[0], type_, blob, previous[2] + 1
+
+        type_, blob = self.serde.dumps_typed(value)
+        return "full", None, type_, blob, 0
+
+    def _remember(self, scope, channel: str, version: str, value: Any, chain: int) -> None:
+        with self._cache_lock:
+            channels = self._last_written.setdefault(scope, {})
+            channels[channel] = (version, list(value) if isinstance(value, list) else value, chain)
+            self._last_written.move_to_end(scope)
+            while len(self._last_written) > WRITE_CACHE_SIZE:
+                self._last_written.popitem(last=False)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        scope = (thread_id, checkpoint_ns)
+        values = checkpoint.get("channel_values", {})
+
+        rows = []
+        remembered = []
+        for channel, version in new_versions.items():
+            if channel not in values:
+                continue
+            kind, base, type_, blob, chain = self._encode_channel(scope, channel, str(version), values[channel])
+            rows.append((thread_id, checkpoint_ns, channel, str(version), kind, base, type_, blob))
+            remembered.append((channel, str(version), values[channel], chain))
+
+        with self.cursor() as cur:
+            cur.executemany(
+                "INSERT OR REPLACE INTO channel_blobs (thread_id, checkpoint_ns, channel, version, kind, base_version, type, blob) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        for channel, version, value, chain in remembered:
+            self._remember(scope, channel, version, value, chain)
+
+        stripped = {**checkpoint, "channel_values": {}}
+        return super().put(config, stripped, metadata, new_versions)
+
+    # --------------------------------------------------------------------------------------------
+    # Reads
+    # --------------------------------------------------------------------------------------------
+
+    def _load_channel(self, cur, thread_id: str, checkpoint_ns: str, channel: str, version: str):
+        tails = []
+        while True:
+            cur.execute(
+                "SELECT kind, base_version, type, blob FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, version),
+            )
+            row = cur.fetchone()
+            if row is None:
+                return None, False
+            kind, base_version, type_, blob = row
+            value = self.serde.loads_typed((type_, blob))
+            if kind != "append":
+                break
+            tails.append(value)
+            version = base_version
+
+        for tail in reversed(tails):
+            value = value + tail
+        return value, True
+
+    def _with_channel_values(self, cur, saved: Optional[CheckpointTuple]) -> Optional[CheckpointTuple]:
+        if saved is None:
+            return None
+        configurable = saved.config["configurable"]
+        thread_id, checkpoint_ns = str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+        values = dict(saved.checkpoint.get("channel_values") or {})
+        for channel, version in saved.checkpoint.get("channel_versions", {}).items():
+            if channel in values:
+                continue
+            value, found = self._load_channel(cur, thread_id, checkpoint_ns, channel, str(version))
+            if found:
+                values[channel] = value
+        saved.checkpoint["channel_values"] = values
+        return saved
+
+    def get_tuple(self, config):
+        saved = super().get_tuple(config)
+        with self.cursor(transaction=False) as cur:
+            return self._with_channel_values(cur, saved)
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator[CheckpointTuple]:
+        # The parent generator holds the connection lock while it iterates, so drain it first
+        saved_tuples = list(super().list(config, filter=filter, before=before, limit=limit))
+        for saved in saved_tuples:
+            with self.cursor(transaction=False) as cur:
+                saved = self._with_channel_values(cur, saved)
+            yield saved
+
+    def get_delta_channel_history(self, *, config, channels):
+        # The SqliteSaver fast path reads values inline from checkpoint blobs, which this saver
+        # strips; the generic parent-chain walk goes through get_tuple and sees the real values.
+        return BaseCheckpointSaver.get_delta_channel_history(self, config=config, channels=channels)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM channel_blobs WHERE thread_id = ?", (str(thread_id),))
+        with self._cache_lock:
+            for scope in [s for s in self._last_written if s[0] == str(thread_id)]:
+                del self._last_written[scope]
+
+    # --------------------------------------------------------------------------------------------
+    # Async API (runs the sync implementation in a worker thread)
+    # --------------------------------------------------------------------------------------------
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = ""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_checkpointer: Optional[DeltaSqliteSaver] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """
+    Return the shared checkpointer selected by GAIDO_CHECKPOINTER, or None to let the runtime
+    (e.g. the LangGraph API server) provide persistence.
+    """
+    global _checkpointer
+    if CHECKPOINTER_BACKEND != "sqlite":
+        return None
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+            _checkpointer = DeltaSqliteSaver(conn)
+            _checkpointer.setup()
+            logger.info("Using SQLite checkpointer at %s", os.path.abspath(CHECKPOINT_DB_PATH))
+        return _checkpointer
@@ -0,0 +1,165 @@
+# ------------------------------------------------------------------------------------------------
+# Conversation memory
+# ------------------------------------------------------------------------------------------------
+# `UserProfile.messages` grows by one or two entries per turn. Prompt builders should not paste
+# it verbatim; they call `ConversationMemory.from_state(state).window(max_tokens)`, which returns
+# the running summary of older turns followed by as many recent entries as fit the budget.
+#
+# Older entries are folded into `UserProfile.conversation_summary` incrementally: once
+# FOLD_BATCH entries have piled up beyond the last KEEP_ENTRIES, one small LLM call merges just
+# those entries into the existing summary, and `summarized_messages` records how many leading
+# entries the summary covers. Token counts are computed with tiktoken and cached per entry.
+# The summary call runs on the shared background pool (my_agent/utils/background.py). Every
+# supervisor turn (and answer_question) first collects a finished fold, then starts the next one
+# if needed; nothing waits for it, and a fold that is not finished yet is merged on a later turn.
+# ------------------------------------------------------------------------------------------------
+
+import functools
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from my_agent.utils.background import background_tasks, current_thread_id
+
+logger = logging.getLogger(__name__)
+
+KEEP_ENTRIES = int(os.getenv("GAIDO_MEMORY_KEEP_ENTRIES", "8"))  # newest entries never folded
+FOLD_BATCH = int(os.getenv("GAIDO_MEMORY_FOLD_BATCH", "6"))  # fold once this many are waiting
+DEFAULT_WINDOW_TOKENS = int(os.getenv("GAIDO_MEMORY_WINDOW_TOKENS", "1500"))
+SUMMARY_MAX_TOKENS = 300
+FOLD_ENTRY_MAX_TOKENS = 200  # each folded entry is clipped to this before summarising
+TOKEN_ENCODING = "cl100k_base"
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:  # tiktoken missing or its encoding files unavailable
+            logger.warning("tiktoken unavailable, estimating tokens from characters: %s", e)
+            _encoding = False
+    return _encoding
+
+
+@functools.lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def clip_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + "..."
+    return text[: max_tokens * 4] + "..."
+
+
+class ConversationMemory:
+    """Running summary plus the not-yet-summarised tail of the conversation."""
+
+    def __init__(self, messages: List[str], summary: Optional[str] = None, summarized: int = 0):
+        self.messages = messages
+        self.summary = summary
+        self.summarized = min(summarized, len(messages))
+
+    @classmethod
+    def from_state(cls, state) -> "ConversationMemory":
+        return cls(state.messages, state.conversation_summary, state.summarized_messages)
+
+    @property
+    def recent(self) -> List[str]:
+        return self.messages[self.summarized:]
+
+    def window(self, max_tokens: int = DEFAULT_WINDOW_TOKENS) -> str:
+        """The summary and the newest entries that fit in `max_tokens`, oldest first."""
+        parts, used = [], 0
+        if self.summary:
+            summary = clip_tokens(self.summary, max_tokens // 2)
+            used = count_tokens(summary)
+        selected = []
+        for entry in reversed(self.recent):
+            cost = count_tokens(entry) + 1
+            if used + cost > max_tokens:
+                break
+            selected.append(entry)
+            used += cost
+        omitted = len(self.recent) - len(selected)
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if omitted:
+            parts.append(f"({omitted} earlier messages omitted)")
+        parts.extend(f"- {entry}" for entry in reversed(selected))
+        return "\n".join(parts)
+
+    def needs_fold(self) -> bool:
+        return len(self.recent) >= KEEP_ENTRIES + FOLD_BATCH
+
+    def fold(self, summarize: Callable[[Optional[str], List[str]], str]) -> Dict[str, Any]:
+        """State fields after folding everything but the newest KEEP_ENTRIES into the summary."""
+        to_fold = self.recent[:-KEEP_ENTRIES]
+        clipped = [clip_tokens(entry, FOLD_ENTRY_MAX_TOKENS) for entry in to_fold]
+        summary = clip_tokens(summarize(self.summary, clipped), SUMMARY_MAX_TOKENS)
+        return {"conversation_summary": summary, "summarized_messages": self.summarized + len(to_fold)}
+
+
+def summarize_conversation(summary: Optional[str], entries: List[str]) -> str:
+    from functions.prereq import llm
+
+    conversation = "\n".join(f"- {entry}" for entry in entries)
+    return llm.invoke(f"""
+    Update the running summary of a health insurance conversation with the new messages below.
+    Keep facts about the user (family, ages, conditions, budget, preferences), policies discussed
+    or recommended, and open questions. At most {SUMMARY_MAX_TOKENS // 2} words, plain sentences.
+
+    Current summary: {summary or "None"}
+
+    New messages:
+    {conversation}
+    """).content.strip()
+
+
+def fold_conversation(state) -> Dict[str, Any]:
+    """Fields to add to a Command update when enough entries are waiting to be summarised, else {}."""
+    memory = ConversationMemory.from_state(state)
+    if not memory.needs_fold():
+        return {}
+    try:
+        return memory.fold(summarize_conversation)
+    except Exception as e:
+        logger.warning("Conversation summary update failed, keeping the previous one: %s", e)
+        return {}
+
+
+def start_fold(state) -> None:
+    """Fold the backlog on the background pool when enough entries are waiting."""
+    thread_id = current_thread_id()
+    if thread_id and ConversationMemory.from_state(state).needs_fold():
+        background_tasks.submit(thread_id, "conversation_fold", fold_conversation, state)
+
+
+def collect_fold(state, timeout: float = 0.0) -> Dict[str, Any]:
+    """Fields of a finished fold to merge into the Command update; {} if none is ready."""
+    thread_id = current_thread_id()
+    fields = background_tasks.result(thread_id, "conversation_fold", timeout=timeout) if thread_id else None
+    # A fold started from an older state is only useful if it covers more than the current summary
+    if not fields or fields["summarized_messages"] <= state.summarized_messages:
+        return {}
+    return fields
+
+
+def advance_fold(state) -> Dict[str, Any]:
+    """
+    Collect a finished fold, then start the next one from the state it produces. Returns the
+    collected fields for the node's Command update ({} when none was ready).
+    """
+    fields = collect_fold(state)
+    start_fold(state.model_copy(update=fields) if fields else state)
+    return fields
@@ -0,0 +1,111 @@
+# ------------------------------------------------------------------------------------------------
+# Step memo for interrupt-driven nodes
+# ------------------------------------------------------------------------------------------------
+# LangGraph re-executes a node from the top when it is resumed after an `interrupt()`. Any LLM
+# call made before the interrupt is therefore paid twice, and because the models are not fully
+# deterministic the answer shown to the user can differ from the one the graph later stores.
+#
+# `memo_step` records the result of an expensive call per (thread, node, step) and replays it
+# when the node is resumed. `resumable_node` wraps a node so its records are dropped once the
+# node finishes without interrupting, which keeps later visits to the same node (self-loops)
+# from reusing stale answers.
+# ------------------------------------------------------------------------------------------------
+
+import functools
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_MEMO_ENTRIES = 2048
+
+_memo: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _node_scope() -> Optional[Tuple[str, str]]:
+    """Return (thread_id, node) for the node currently executing, or None outside a graph run."""
+    try:
+        from langgraph.config import get_config
+        config = get_config()
+    except Exception:
+        return None
+
+    configurable = config.get("configurable", {})
+    thread_id = configurable.get("thread_id")
+    if thread_id is None:
+        return None
+    node = configurable.get("checkpoint_ns") or config.get("metadata", {}).get("langgraph_node", "")
+    # Drop the task id suffix so the scope survives across resumes of the same node
+    node = "|".join(part.split(":")[0] for part in str(node).split("|"))
+    return str(thread_id), node
+
+
+def _fingerprint(args: tuple, kwargs: dict) -> str:
+    payload = repr(args) + repr(sorted(kwargs.items()))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def memo_step(step: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run `fn(*args, **kwargs)` once per thread/node/step and replay the recorded result on resume.
+
+    The key includes a fingerprint of the arguments, so a node that loops back to itself with a
+    new query computes a fresh answer. Outside a graph run (no thread_id) the call is not memoized.
+    """
+    scope = _node_scope()
+    if scope is None:
+        return fn(*args, **kwargs)
+
+    key = (scope[0], scope[1], f"{step}:{_fingerprint(args, kwargs)}")
+    with _lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            logger.info("Replaying memoized step %s for node %s", step, scope[1])
+            return _memo[key]
+
+    result = fn(*args, **kwargs)
+
+    with _lock:
+        _memo[key] = result
+        while len(_memo) > MAX_MEMO_ENTRIES:
+            _memo.popitem(last=False)
+    return result
+
+
+def clear_node_memo(thread_id: str, node: str) -> None:
+    """Forget every recorded step for the given thread and node."""
+    with _lock:
+        for key in [k for k in _memo if k[0] == thread_id and k[1] == node]:
+            del _memo[key]
+
+
+def resumable_node(node_fn: Callable) -> Callable:
+    """
+    Decorator for nodes that call `interrupt()` after expensive work.
+
+    Memo records survive an interrupt (so the resumed run replays them) and are cleared when the
+    node returns normally or fails with a real error.
+    """
+    from langgraph.errors import GraphInterrupt
+
+    @functools.wraps(node_fn)
+    def wrapper(state, *args, **kwargs):
+        try:
+            result = node_fn(state, *args, **kwargs)
+        except GraphInterrupt:
+            raise
+        except BaseException:
+            scope = _node_scope()
+            if scope is not None:
+                clear_node_memo(*scope)
+            raise
+        scope = _node_scope()
+        if scope is not None:
+            clear_node_memo(*scope)
+        return result
+
+    return wrapper
@@ -0,0 +1,36 @@
+# ------------------------------------------------------------------------------------------------
+# Subgraphs mounted as nodes
+# ------------------------------------------------------------------------------------------------
+# A compiled subgraph added directly with `add_node` hands its whole final state back to the
+# parent, so the parent's `messages` reducer would receive the full history again and append it
+# a second time. `subgraph_node` wraps the subgraph in a plain node that invokes it and returns
+# only what changed: the appended tail of `messages` and the other fields that differ. The
+# subgraph still runs inside the parent's task, so its interrupts and checkpoints propagate.
+# ------------------------------------------------------------------------------------------------
+
+from typing import Any, Callable, Dict
+
+
+def subgraph_output_delta(state, output: Dict[str, Any]) -> Dict[str, Any]:
+    """Update for the parent graph from a subgraph's final state: changed fields and new messages."""
+    model_fields = type(state).model_fields
+    updates = {key: value for key, value in output.items() if key in model_fields and key != "messages"}
+    delta = state.delta(**updates)
+    messages = list(output.get("messages") or [])
+    if messages[:len(state.messages)] != list(state.messages):
+        raise ValueError("Subgraph output does not extend the parent's message history")
+    tail = messages[len(state.messages):]
+    if tail:
+        delta["messages"] = tail
+    return delta
+
+
+def subgraph_node(subgraph) -> Callable:
+    """Node that runs the compiled `subgraph` on the parent state and returns only its delta."""
+
+    def run(state, config):
+        output = subgraph.invoke(state, config)
+        return subgraph_output_delta(state, output)
+
+    run.__name__ = f"{getattr(subgraph, 'name', 'subgraph')}_node"
+    return run
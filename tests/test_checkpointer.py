@@ -0,0 +1,83 @@
+import sqlite3
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Command, interrupt
+
+from my_agent.user_state import UserProfile
+from my_agent.utils.checkpointer import KEYFRAME_INTERVAL, CompressedSerializer, DeltaSqliteSaver
+
+
+def _saver(path):
+    saver = DeltaSqliteSaver(sqlite3.connect(str(path), check_same_thread=False))
+    saver.setup()
+    return saver
+
+
+def _chat_graph(saver):
+    def chat(state: UserProfile):
+        reply = interrupt("next?")
+        return {
+            "messages": [f"User: {reply}", f"Gaido: noted {reply}"],
+            "interaction_count": state.interaction_count + 1,
+        }
+
+    workflow = StateGraph(UserProfile)
+    workflow.add_node("chat", chat)
+    workflow.add_edge(START, "chat")
+    workflow.add_edge("chat", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def test_compressed_serializer_round_trip():
+    serde = CompressedSerializer()
+    small, large = {"a": 1}, {"text": "policy " * 500}
+    assert not serde.dumps_typed(small)[0].endswith(CompressedSerializer.SUFFIX)
+    assert serde.dumps_typed(large)[0].endswith(CompressedSerializer.SUFFIX)
+    assert serde.loads_typed(serde.dumps_typed(small)) == small
+    assert serde.loads_typed(serde.dumps_typed(large)) == large
+
+
+def test_state_round_trips_through_a_fresh_saver(tmp_path):
+    db = tmp_path / "checkpoints.sqlite"
+    graph = _chat_graph(_saver(db))
+    config = {"configurable": {"thread_id": "round-trip"}}
+    turns = KEYFRAME_INTERVAL + 4
+    for turn in range(turns):
+        graph.invoke({"name": "Asha"}, config)
+        graph.invoke(Command(resume=f"turn {turn}"), config)
+    expected = graph.get_state(config).values
+
+    # A new saver has no write cache, so every value is rebuilt from the stored blobs
+    reopened = _chat_graph(_saver(db))
+    values = reopened.get_state(config).values
+    assert values == expected
+    assert values["interaction_count"] == turns
+    assert values["messages"][-1] == f"Gaido: noted turn {turns - 1}"
+    assert len(values["messages"]) == 2 * turns
+
+    kinds = {kind for (kind,) in sqlite3.connect(str(db)).execute(
+        "SELECT kind FROM channel_blobs WHERE channel = 'messages'"
+    )}
+    assert kinds == {"full", "append"}
+
+
+def test_interrupted_thread_resumes_from_a_fresh_saver(tmp_path):
+    db = tmp_path / "checkpoints.sqlite"
+    config = {"configurable": {"thread_id": "resume"}}
+    assert "__interrupt__" in _chat_graph(_saver(db)).invoke({"messages": ["Gaido: hello"]}, config)
+
+    result = _chat_graph(_saver(db)).invoke(Command(resume="hi"), config)
+    assert result["messages"] == ["Gaido: hello", "User: hi", "Gaido: noted hi"]
+
+
+def test_delete_thread_removes_channel_blobs(tmp_path):
+    db = tmp_path / "checkpoints.sqlite"
+    saver = _saver(db)
+    graph = _chat_graph(saver)
+    config = {"configurable": {"thread_id": "gone"}}
+    graph.invoke({"name": "Asha"}, config)
+
+    saver.delete_thread("gone")
+    assert saver.get_tuple(config) is None
+    count = sqlite3.connect(str(db)).execute("SELECT COUNT(*) FROM channel_blobs").fetchone()[0]
+    assert count == 0
@@ -0,0 +1,84 @@
+import pytest
+
+from functions.onboarding_parsers import (
+    looks_like_question, parse_ages, parse_conditions, parse_contact, parse_family_members, parse_name, parse_yes_no,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("My name is Riya Sharma", "Riya Sharma"),
+    ("hi, I'm Arjun!", "Arjun"),
+    ("what does a waiting period mean and why does it matter", None),
+])
+def test_parse_name(text, expected):
+    assert parse_name(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Me, my wife and daughter", ["self", "wife", "daughter"]),
+    ("self, spouse, 2 kids", ["self", "spouse", "kid", "kid"]),
+    ("me and two children", ["self", "child", "child"]),
+    ("mom and dad", ["mom", "dad"]),
+    ("10 kids", None),
+    ("", None),
+])
+def test_parse_family_members(text, expected):
+    assert parse_family_members(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("35, 32 and 5 years", [35, 32, 5]),
+    ("34 31 66", [34, 31, 66]),
+    ("35.5, 30", None),
+    ("thirty five", None),
+])
+def test_parse_ages(text, expected):
+    assert parse_ages(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("riya@example.com", "riya@example.com"),
+    ("you can reach me at 9876543210", "9876543210"),
+    ("+91 98765 43210", "+91 98765 43210"),
+    ("ages are 34 31 66 60 10", None),
+    ("12345", None),
+])
+def test_parse_contact(text, expected):
+    assert parse_contact(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("yes", True), ("Yeah, my father has diabetes", True), ("no", False), ("none", False), ("maybe", None),
+])
+def test_parse_yes_no(text, expected):
+    assert parse_yes_no(text) is expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Diabetes, high BP and asthma", ["Diabetes", "high BP", "asthma"]),
+    ("none", []),
+    ("Nil.", []),
+    ("", None),
+])
+def test_parse_conditions(text, expected):
+    assert parse_conditions(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("What is the waiting period for diabetes?", True),
+    ("can you explain what co-payment means", True),
+    ("35, 32", False),
+    ("yes", False),
+])
+def test_looks_like_question(text, expected):
+    assert looks_like_question(text) is expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("me 34, wife 31, dad 66 60 10, reach me at asha@example.com", "asha@example.com"),
+    ("me 34 wife 31 dad 66 60 10", None),
+    ("98765 43210", None),
+    ("my number is +919876543210", "+919876543210"),
+])
+def test_parse_contact_strict(text, expected):
+    assert parse_contact(text, strict=True) == expected
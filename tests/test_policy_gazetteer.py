@@ -0,0 +1,46 @@
+import pytest
+
+from functions.policy_gazetteer import PolicyGazetteer, aliases_for, extract_policy_mentions
+
+
+@pytest.mark.parametrize("text", [
+    "good coverage for my health care costs",
+    "best health care senior citizen plan",
+    "Is my hospital in the network list?",
+    "does this cover medicare expenses",
+    "I want supreme coverage for my family",
+    "I aspire to get a family floater",
+])
+def test_generic_phrases_do_not_match_a_policy(text):
+    assert extract_policy_mentions(text).policies == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Compare Care Supreme and Optima Secure", ["CARE SUPREME", "HDFC-optima_secure"]),
+    ("care supreme senior premium room rent", ["Care Supreme Senior Premium"]),
+    ("care senior vs care supreme", ["Care Senior", "CARE SUPREME"]),
+    ("tell me about tata aig medicare", ["Tata_Aig_Medicare"]),
+    ("Bajaj my health care waiting period", ["Bajaj_My Health Care"]),
+    ("star health network list", ["Star_Health_Network_List"]),
+    ("niva bupa aspire", ["NivaBupa_Aspire"]),
+    ("ReAssure 2.0 bronze plus", ["ReAssure 2.0 bronze Plus"]),
+])
+def test_named_policies_are_found(text, expected):
+    assert extract_policy_mentions(text).policies == expected
+
+
+def test_insurer_mentions_are_reported_separately():
+    mentions = extract_policy_mentions("Is HDFC ERGO better than Star Health?")
+    assert mentions.policies == []
+    assert mentions.insurers == ["HDFC ERGO", "Star Health"]
+
+
+def test_generic_short_aliases_are_not_generated():
+    assert "network list" not in aliases_for("Care_Network_List")
+    assert "medicare" not in aliases_for("Tata_Aig_Medicare")
+    assert "my health care" not in aliases_for("Bajaj_My Health Care")
+
+
+def test_matches_are_word_bounded():
+    gazetteer = PolicyGazetteer(["CARE SUPREME"])
+    assert gazetteer.extract("care supremely good").policies == []
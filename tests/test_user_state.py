@@ -0,0 +1,66 @@
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Command, interrupt
+
+from my_agent.user_state import UserProfile, append_messages
+from my_agent.utils.subgraph import subgraph_node
+
+
+def test_append_messages_concatenates():
+    assert append_messages(["a"], ["b", "c"]) == ["a", "b", "c"]
+    assert append_messages(None, ["a"]) == ["a"]
+    assert append_messages(["a"], None) == ["a"]
+
+
+def test_append_messages_keeps_entries_that_repeat_the_history():
+    assert append_messages(["x"], ["x"]) == ["x", "x"]
+    assert append_messages(["x"], ["x", "y"]) == ["x", "x", "y"]
+
+
+def test_delta_drops_unchanged_fields_and_keeps_new_messages():
+    state = UserProfile(name="Asha", messages=["hi"])
+    assert state.delta(name="Asha", budget_range="High", messages=["hello"]) == {
+        "budget_range": "High",
+        "messages": ["hello"],
+    }
+
+
+def _parent_graph(sub_node):
+    def greet(state: UserProfile):
+        return {"messages": ["x"]}
+
+    sub = StateGraph(UserProfile)
+    sub.add_node("ask", sub_node)
+    sub.add_edge(START, "ask")
+    sub.add_edge("ask", END)
+
+    parent = StateGraph(UserProfile)
+    parent.add_node("greet", greet)
+    parent.add_node("sub", subgraph_node(sub.compile()))
+    parent.add_edge(START, "greet")
+    parent.add_edge("greet", "sub")
+    parent.add_edge("sub", END)
+    return parent.compile(checkpointer=MemorySaver())
+
+
+def test_subgraph_node_passes_on_only_new_messages():
+    def repeat(state: UserProfile):
+        return {"messages": ["x"], "name": "Asha"}
+
+    graph = _parent_graph(repeat)
+    result = graph.invoke({}, {"configurable": {"thread_id": "repeat"}})
+    assert result["messages"] == ["x", "x"]
+    assert result["name"] == "Asha"
+
+
+def test_subgraph_node_resumes_after_interrupt():
+    def ask_name(state: UserProfile):
+        name = interrupt("What is your name?")
+        return {"messages": [f"Name: {name}"], "name": name}
+
+    graph = _parent_graph(ask_name)
+    config = {"configurable": {"thread_id": "resume"}}
+    assert "__interrupt__" in graph.invoke({}, config)
+    result = graph.invoke(Command(resume="Asha"), config)
+    assert result["messages"] == ["x", "Name: Asha"]
+    assert result["name"] == "Asha"